@@ -0,0 +1,107 @@
+"""
+Benchmark: Lambda cold-start (init) time per service.
+
+For every service, starts a fresh interpreter in the service directory, imports
+lambda_function the way the Lambda runtime does and reports the wall-clock
+import time plus the modules with the highest self time according to
+`python -X importtime`.
+No database is needed; connections are opened lazily.
+
+Usage:
+
+    python backend/benchmarks/bench_cold_start.py --runs 5
+    python backend/benchmarks/bench_cold_start.py --service user-service --max-ms 800
+
+Each result is printed as one JSON line. With --max-ms the script exits
+non-zero if any service's median init time exceeds the budget, so it can
+gate CI against regressions.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SERVICES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "services")
+
+PROBE = (
+    "import time; start = time.perf_counter(); import lambda_function; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def list_services():
+    """
+    Return the names of all service directories that have a Lambda entry point.
+    """
+    return sorted(
+        name for name in os.listdir(SERVICES_DIR)
+        if os.path.isfile(os.path.join(SERVICES_DIR, name, "lambda_function.py"))
+    )
+
+
+def measure(service, runs, top):
+    """
+    Import lambda_function in `runs` fresh interpreters and summarise.
+
+    Returns:
+    - Dictionary with median/min/max init time in ms and the costliest imports.
+    """
+    cwd = os.path.join(SERVICES_DIR, service)
+    timings = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE], cwd=cwd, capture_output=True, text=True, check=True
+        )
+        timings.append(float(out.stdout.strip().splitlines()[-1]) * 1000)
+
+    profile = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import lambda_function"],
+        cwd=cwd, capture_output=True, text=True, check=True
+    )
+    modules = []
+    for line in profile.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time: <self us> | <cumulative us> | <module>"
+        fields = line[len("import time:"):].split("|")
+        modules.append((int(fields[0]), fields[2].strip()))
+    modules.sort(reverse=True)
+
+    return {
+        "service": service,
+        "runs": runs,
+        "median_ms": round(statistics.median(timings), 1),
+        "min_ms": round(min(timings), 1),
+        "max_ms": round(max(timings), 1),
+        "costliest_imports": [
+            {"module": name, "self_ms": round(us / 1000, 1)} for us, name in modules[:top]
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--service", action="append",
+                        help="Service to measure (repeatable); defaults to all")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=5, help="Costliest imports to list")
+    parser.add_argument("--max-ms", type=float, help="Fail if a median exceeds this budget")
+    args = parser.parse_args()
+
+    over_budget = []
+    for service in args.service or list_services():
+        result = measure(service, args.runs, args.top)
+        print(json.dumps(result))
+        if args.max_ms is not None and result["median_ms"] > args.max_ms:
+            over_budget.append(service)
+
+    if over_budget:
+        print(f"Init time over {args.max_ms} ms: {', '.join(over_budget)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
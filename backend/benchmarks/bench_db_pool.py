@@ -0,0 +1,110 @@
+"""
+Benchmark: per-request psycopg2.connect versus the pooled connection layer.
+
+Runs the same point query from a number of worker threads, once opening and
+closing a connection per request (the old get_db behaviour) and once checking
+connections out of a service's ConnectionPool, then reports requests/sec and
+latency percentiles for both.
+
+Usage (against a local Postgres, using the usual DB_* environment variables):
+
+    DB_HOST=localhost DB_NAME=quickbooks DB_USER=postgres DB_PASSWORD=postgres \
+        python backend/benchmarks/bench_db_pool.py --threads 16 --requests 5000
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+SERVICES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "services")
+
+
+def percentile(samples, pct):
+    """
+    Return the pct-th percentile of an already sorted list of samples.
+    """
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+    return samples[index]
+
+
+def run(label, threads, requests, acquire, release, query):
+    """
+    Drive `requests` checkouts spread over `threads` workers.
+
+    Returns:
+    - Dictionary with throughput and latency percentiles in milliseconds.
+    """
+    latencies = []
+    lock = threading.Lock()
+    per_thread = requests // threads
+
+    def worker():
+        local = []
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            conn = acquire()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(query)
+                cursor.fetchall()
+                cursor.close()
+                conn.commit()
+            finally:
+                release(conn)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "mode": label,
+        "requests": len(latencies),
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--service", default="transaction-service",
+                        help="Service whose app.database module is benchmarked")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--query", default="SELECT 1;")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.join(SERVICES_DIR, args.service))
+    from app import database
+
+    results = [
+        run("connect-per-request", args.threads, args.requests,
+            database._connect, lambda conn: conn.close(), args.query),
+    ]
+    pool = database.ConnectionPool(min_size=args.threads, max_size=args.threads)
+    pool.warm()
+    results.append(run("pooled", args.threads, args.requests,
+                       pool.getconn, pool.putconn, args.query))
+    pool.closeall()
+
+    for result in results:
+        print(json.dumps(result))
+    print(json.dumps({"pool_stats": pool.stats()}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,470 @@
+"""
+Benchmark: mixed-workload load test of every service's HTTP endpoints.
+
+For each service the script applies its migrations (`python -m app.migrate`)
+to a local Postgres, seeds empty tables with generate_dataset.py at --scale
+(200k rows per fact table by default), starts the FastAPI app
+under uvicorn and drives a weighted mix of writes, point reads, statement
+generation, reconciliation and report requests from --concurrency keep-alive
+clients for --duration seconds. Throughput, error count and p50/p95/p99
+latency are reported per endpoint and per service.
+
+Usage (against a scratch Postgres, using the usual DB_* environment variables):
+
+    DB_HOST=localhost DB_NAME=quickbooks DB_USER=postgres DB_PASSWORD=postgres \
+        python backend/benchmarks/bench_endpoints.py --duration 30 --output results.jsonl
+    python backend/benchmarks/bench_endpoints.py --service banking-service \
+        --compare results.jsonl
+
+Each result is printed as one JSON line tagged with the git commit, and also
+written to --output. With --compare, every endpoint line carries the relative
+change of throughput and p95 against the matching line of an earlier run.
+"""
+
+import argparse
+import collections
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+
+import psycopg2
+
+import generate_dataset
+
+SERVICES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "services")
+
+# Dependencies first: account-service's transactions table references accounts.
+SERVICES = [
+    "ledger-service", "account-service", "transaction-service", "banking-service",
+    "payroll-service", "inventory-service", "audit-service", "reporting-service",
+    "integration-service", "tax-service", "data-quality-service", "user-service",
+]
+
+# Tables generate_dataset.py does not cover, seeded while empty. Executed with
+# parameters, so literal modulo operators are written as %%.
+SEED = {
+    "reports": """
+        INSERT INTO reports (report_type, status, completed_at, file_path)
+        SELECT 'balance_sheet', 'Completed', NOW(), '/reports/seed_' || g || '.pdf'
+        FROM generate_series(1, %(count)s) g;
+    """,
+    "integrations": """
+        INSERT INTO integrations (name, api_key, api_secret, endpoint_url, last_synced)
+        SELECT 'Seed integration ' || g, 'key', 'secret', 'http://localhost/sync', NOW()
+        FROM generate_series(1, %(count)s) g;
+    """,
+    "data_quality_issues": """
+        INSERT INTO data_quality_issues (issue_type, description, resolved)
+        SELECT 'missing_field', 'Seeded issue ' || g, g %% 4 = 0
+        FROM generate_series(1, %(count)s) g;
+    """,
+}
+
+Request = collections.namedtuple("Request", ["method", "path", "body", "headers"], defaults=(None, None))
+
+
+def _json(method, path, body=None, headers=None):
+    headers = dict(headers or {})
+    if body is not None:
+        headers["Content-Type"] = "application/json"
+        body = json.dumps(body)
+    return Request(method, path, body, headers)
+
+
+def _user_setup(port, ctx):
+    """
+    Register benchmark users and log one of them in for GET /users/me.
+    """
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    suffix = f"{os.getpid()}{int(time.time())}"
+    for index in range(5):
+        send(conn, _json("POST", "/register", {
+            "email": f"bench{index}.{suffix}@example.com", "full_name": "Bench", "password": "secret"
+        }))
+    ctx["email"] = f"bench0.{suffix}@example.com"
+    status, body = send(conn, Request(
+        "POST", "/login",
+        urllib.parse.urlencode({"username": ctx["email"], "password": "secret"}),
+        {"Content-Type": "application/x-www-form-urlencoded"}
+    ))
+    ctx["token"] = json.loads(body).get("access_token", "") if status == 200 else ""
+    conn.close()
+
+
+# Description words of generate_dataset.py's transactions, from rare to common.
+SEARCH_TERMS = ["Hooli+Globex", "%22Stark+Industries%22", "Rent", "Customer+-payment"]
+
+# service -> (setup, [(endpoint, weight, request factory)])
+# Request factories take (rng, ctx); ctx maps table names to their highest id,
+# plus whatever the setup function stores.
+WORKLOADS = {
+    "ledger-service": (None, [
+        ("POST /accounts/", 1, lambda rng, ctx: _json("POST", "/accounts/", {
+            "name": f"Bench account {rng.getrandbits(64)}", "type": "Asset", "balance": 0.0})),
+        ("GET /accounts/{account_id}", 8, lambda rng, ctx: _json(
+            "GET", f"/accounts/{rng.randint(1, ctx['accounts'])}")),
+        ("PUT /accounts/{account_id}", 1, lambda rng, ctx: _json(
+            "PUT", f"/accounts/{rng.randint(1, ctx['accounts'])}", {"balance": rng.uniform(0, 1e5)})),
+    ]),
+    "account-service": (None, [
+        ("GET /financial_statements/balance_sheet/", 1, lambda rng, ctx: _json(
+            "GET", "/financial_statements/balance_sheet/")),
+        ("GET /financial_statements/income_statement/", 1, lambda rng, ctx: _json(
+            "GET", "/financial_statements/income_statement/")),
+        ("GET /financial_statements/income_statement/?start_date&end_date", 1, lambda rng, ctx: _json(
+            "GET", "/financial_statements/income_statement/?start_date={0}-01-01&end_date={0}-12-31".format(
+                rng.randint(2023, 2024)))),
+        ("GET /financial_statements/trial_balance/", 1, lambda rng, ctx: _json(
+            "GET", "/financial_statements/trial_balance/")),
+    ]),
+    "transaction-service": (None, [
+        ("POST /transactions/", 3, lambda rng, ctx: _json("POST", "/transactions/", {
+            "description": "Bench transaction", "amount": round(rng.uniform(1, 500), 2),
+            "account_id": rng.randint(1, ctx["accounts"]),
+            "transaction_type": rng.choice(["Debit", "Credit"])})),
+        ("GET /transactions/", 2, lambda rng, ctx: _json(
+            "GET", f"/transactions/?account_id={rng.randint(1, ctx['accounts'])}&limit=50")),
+        ("GET /transactions/{transaction_id}", 6, lambda rng, ctx: _json(
+            "GET", f"/transactions/{rng.randint(1, ctx['transactions'])}")),
+        ("GET /transactions/search", 1, lambda rng, ctx: _json(
+            "GET", f"/transactions/search?q={rng.choice(SEARCH_TERMS)}&limit=20")),
+        ("GET /transactions/search?match=substring", 1, lambda rng, ctx: _json(
+            "GET", f"/transactions/search?q=%23{rng.randint(1, ctx['transactions'])}&match=substring&limit=20")),
+        ("POST /transactions/batch_get", 1, lambda rng, ctx: _json("POST", "/transactions/batch_get", {
+            "ids": [rng.randint(1, ctx["transactions"]) for _ in range(100)]})),
+        ("PUT /transactions/{transaction_id}", 1, lambda rng, ctx: _json(
+            "PUT", f"/transactions/{rng.randint(1, ctx['transactions'])}",
+            {"amount": round(rng.uniform(1, 500), 2)})),
+    ]),
+    "banking-service": (None, [
+        ("POST /bank_transactions/", 3, lambda rng, ctx: _json("POST", "/bank_transactions/", {
+            "bank_account_id": rng.randint(1, ctx["bank_accounts"]), "description": "Bench",
+            "amount": round(rng.uniform(1, 500), 2),
+            "transaction_type": rng.choice(["Debit", "Credit"])})),
+        ("GET /bank_accounts/{account_id}", 6, lambda rng, ctx: _json(
+            "GET", f"/bank_accounts/{rng.randint(1, ctx['bank_accounts'])}")),
+        ("POST /reconcile/", 1, lambda rng, ctx: _json(
+            "POST", f"/reconcile/?account_id={rng.randint(1, ctx['bank_accounts'])}")),
+    ]),
+    "payroll-service": (None, [
+        ("POST /payroll/", 2, lambda rng, ctx: _json("POST", "/payroll/", {
+            "employee_id": rng.randint(1, ctx["employees"]), "pay_date": "2024-01-31"})),
+        ("GET /employees/{employee_id}", 4, lambda rng, ctx: _json(
+            "GET", f"/employees/{rng.randint(1, ctx['employees'])}")),
+        ("GET /payroll/{payroll_id}", 4, lambda rng, ctx: _json(
+            "GET", f"/payroll/{rng.randint(1, ctx['payroll_records'])}")),
+    ]),
+    "inventory-service": (None, [
+        ("POST /items/", 1, lambda rng, ctx: _json("POST", "/items/", {
+            "name": f"Bench item {rng.getrandbits(64)}", "price": 9.99, "quantity": 10})),
+        ("GET /items/{item_id}", 7, lambda rng, ctx: _json(
+            "GET", f"/items/{rng.randint(1, ctx['inventory_items'])}")),
+        ("PUT /items/{item_id}", 2, lambda rng, ctx: _json(
+            "PUT", f"/items/{rng.randint(1, ctx['inventory_items'])}", {"quantity": rng.randint(0, 500)})),
+    ]),
+    "audit-service": (None, [
+        ("POST /audit_logs/", 5, lambda rng, ctx: _json("POST", "/audit_logs/", {
+            "user_id": rng.randint(1, 500), "action": "bench", "details": "web"})),
+        ("GET /audit_logs/{log_id}", 4, lambda rng, ctx: _json(
+            "GET", f"/audit_logs/{rng.randint(1, ctx['audit_logs'])}")),
+        ("GET /audit_logs/", 1, lambda rng, ctx: _json(
+            "GET", f"/audit_logs/?skip={rng.randint(0, 1000)}&limit=100")),
+    ]),
+    "reporting-service": (None, [
+        ("POST /reports/", 1, lambda rng, ctx: _json("POST", "/reports/", {
+            "report_type": rng.choice(["balance_sheet", "income_statement"])})),
+        ("GET /reports/{report_id}", 9, lambda rng, ctx: _json(
+            "GET", f"/reports/{rng.randint(1, ctx['reports'])}")),
+    ]),
+    "integration-service": (None, [
+        ("POST /integrations/", 1, lambda rng, ctx: _json("POST", "/integrations/", {
+            "name": f"Bench integration {rng.getrandbits(64)}", "endpoint_url": "http://localhost/sync",
+            "api_key": "key", "api_secret": "secret"})),
+        ("GET /integrations/{integration_id}", 9, lambda rng, ctx: _json(
+            "GET", f"/integrations/{rng.randint(1, ctx['integrations'])}")),
+    ]),
+    "tax-service": (None, [
+        ("POST /calculate_tax/", 6, lambda rng, ctx: _json("POST", "/calculate_tax/", {
+            "income": rng.uniform(2e4, 2e5), "deductions": rng.uniform(0, 2e4)})),
+        ("POST /file_tax_return/", 4, lambda rng, ctx: _json("POST", "/file_tax_return/", {
+            "user_id": rng.randint(1, 500), "filing_year": 2023,
+            "income": rng.uniform(2e4, 2e5), "deductions": rng.uniform(0, 2e4)})),
+    ]),
+    "data-quality-service": (None, [
+        ("POST /validate_data/", 8, lambda rng, ctx: _json("POST", "/validate_data/", {
+            "field_name": rng.choice(["email", "amount"]), "value": rng.choice(["a@b.com", "12.5"])})),
+        ("GET /data_quality_report/", 2, lambda rng, ctx: _json("GET", "/data_quality_report/")),
+    ]),
+    "user-service": (_user_setup, [
+        ("POST /login", 2, lambda rng, ctx: Request(
+            "POST", "/login", urllib.parse.urlencode({"username": ctx["email"], "password": "secret"}),
+            {"Content-Type": "application/x-www-form-urlencoded"})),
+        ("GET /users/me", 8, lambda rng, ctx: _json(
+            "GET", "/users/me", headers={"Authorization": f"Bearer {ctx['token']}"})),
+    ]),
+}
+
+
+def percentile(samples, pct):
+    """
+    Return the pct-th percentile of an already sorted list of samples.
+    """
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+    return samples[index]
+
+
+def db_env():
+    return {name: value for name, value in os.environ.items() if name.startswith("DB_")}
+
+
+def git_commit():
+    out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SERVICES_DIR,
+                         capture_output=True, text=True)
+    return out.stdout.strip() or None
+
+
+def _table_exists(cursor, table):
+    cursor.execute("SELECT to_regclass(%s);", (table,))
+    return cursor.fetchone()[0] is not None
+
+
+def prepare_database(services, scale, seed):
+    """
+    Apply each service's migrations and seed every empty table.
+
+    Empty tables covered by generate_dataset.py are filled by it at `scale`;
+    the rest come from SEED.
+
+    Returns:
+    - Dictionary mapping each existing table to its highest id.
+    """
+    for service in services:
+        subprocess.run([sys.executable, "-m", "app.migrate"], cwd=os.path.join(SERVICES_DIR, service),
+                       check=True, capture_output=True)
+    conn = psycopg2.connect(
+        host=os.environ.get("DB_HOST"),
+        port=int(os.environ.get("DB_PORT", 5432)),
+        database=os.environ.get("DB_NAME"),
+        user=os.environ.get("DB_USER"),
+        password=os.environ.get("DB_PASSWORD")
+    )
+    cursor = conn.cursor()
+    try:
+        empty = []
+        for table in list(generate_dataset.TABLES) + list(SEED):
+            if _table_exists(cursor, table):
+                cursor.execute(f"SELECT NOT EXISTS (SELECT 1 FROM {table});")
+                if cursor.fetchone()[0]:
+                    empty.append(table)
+        conn.commit()
+        generated = [
+            table for table in generate_dataset.TABLES
+            if table in empty and _table_exists(cursor, generate_dataset.PARENTS.get(table, table))
+        ]
+        if generated:
+            generate_dataset.generate(conn, scale=scale, seed=seed, tables=generated)
+        for table, statement in SEED.items():
+            if table in empty:
+                cursor.execute(statement, {"count": max(1, int(2000 * scale))})
+                cursor.execute(f"ANALYZE {table};")
+        conn.commit()
+
+        max_ids = {}
+        for table in list(generate_dataset.TABLES) + list(SEED):
+            if _table_exists(cursor, table):
+                cursor.execute(f"SELECT COALESCE(MAX(id), 1) FROM {table};")
+                max_ids[table] = cursor.fetchone()[0]
+        conn.commit()
+        return max_ids
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_service(service, port, workers):
+    """
+    Start a service under uvicorn and wait until it answers GET /metrics.
+    """
+    env = dict(os.environ, LOG_SAMPLE_RATE="0")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=os.path.join(SERVICES_DIR, service), env=env
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{service} exited with {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/metrics")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{service} did not start on port {port}")
+
+
+def send(conn, request):
+    """
+    Send one request on a keep-alive connection and return (status, body).
+    """
+    conn.request(request.method, request.path, body=request.body, headers=request.headers or {})
+    response = conn.getresponse()
+    return response.status, response.read()
+
+
+def drive(port, operations, ctx, duration, concurrency, seed):
+    """
+    Run the weighted operation mix from `concurrency` clients for `duration` seconds.
+
+    Returns:
+    - (elapsed seconds, {endpoint: [latencies]}, {endpoint: error count})
+    """
+    names = [name for name, _, _ in operations]
+    weights = [weight for _, weight, _ in operations]
+    factories = {name: factory for name, _, factory in operations}
+    latencies = collections.defaultdict(list)
+    errors = collections.Counter()
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client(index):
+        rng = random.Random(seed * 1000 + index)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local = collections.defaultdict(list)
+        local_errors = collections.Counter()
+        while time.monotonic() < stop_at:
+            name = rng.choices(names, weights)[0]
+            request = factories[name](rng, ctx)
+            start = time.perf_counter()
+            try:
+                status, _ = send(conn, request)
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                status = None
+            local[name].append(time.perf_counter() - start)
+            if status is None or status >= 400:
+                local_errors[name] += 1
+        conn.close()
+        with lock:
+            for name, samples in local.items():
+                latencies[name].extend(samples)
+            errors.update(local_errors)
+
+    clients = [threading.Thread(target=client, args=(index,)) for index in range(concurrency)]
+    started = time.monotonic()
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    return time.monotonic() - started, latencies, errors
+
+
+def summarise(base, samples, errors, elapsed):
+    samples = sorted(samples)
+    return dict(
+        base,
+        requests=len(samples),
+        errors=errors,
+        requests_per_sec=round(len(samples) / elapsed, 1),
+        p50_ms=round(percentile(samples, 50) * 1000, 3),
+        p95_ms=round(percentile(samples, 95) * 1000, 3),
+        p99_ms=round(percentile(samples, 99) * 1000, 3),
+    )
+
+
+def load_baseline(path):
+    baseline = {}
+    with open(path) as handle:
+        for line in handle:
+            result = json.loads(line)
+            baseline[(result["service"], result["endpoint"])] = result
+    return baseline
+
+
+def compare(result, baseline):
+    previous = baseline.get((result["service"], result["endpoint"]))
+    if not previous:
+        return result
+    for field in ("requests_per_sec", "p95_ms"):
+        if previous[field]:
+            result[f"{field}_change_pct"] = round((result[field] / previous[field] - 1) * 100, 1)
+    result["baseline_commit"] = previous.get("commit")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--service", action="append", help="Service to run (repeatable); defaults to all")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of load per service")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent keep-alive clients")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes per service")
+    parser.add_argument("--scale", type=float, default=0.2,
+                        help="generate_dataset.py scale factor for seeding empty tables")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the dataset and request mix")
+    parser.add_argument("--output", help="Also write the JSON lines to this file")
+    parser.add_argument("--compare", help="JSON lines from an earlier run to compare against")
+    args = parser.parse_args()
+
+    services = args.service or SERVICES
+    baseline = load_baseline(args.compare) if args.compare else {}
+    commit = git_commit()
+    max_ids = prepare_database(services, args.scale, args.seed)
+
+    output = open(args.output, "w") if args.output else None
+    try:
+        for service in services:
+            setup, operations = WORKLOADS[service]
+            port = free_port()
+            process = start_service(service, port, args.workers)
+            try:
+                ctx = collections.defaultdict(lambda: 1, max_ids)
+                if setup:
+                    setup(port, ctx)
+                elapsed, latencies, errors = drive(port, operations, ctx, args.duration,
+                                                   args.concurrency, args.seed)
+            finally:
+                process.terminate()
+                process.wait()
+
+            base = {"commit": commit, "service": service, "concurrency": args.concurrency}
+            results = [
+                compare(summarise(dict(base, endpoint=name), latencies[name], errors[name], elapsed), baseline)
+                for name, _, _ in operations
+            ]
+            results.append(compare(summarise(
+                dict(base, endpoint="*"),
+                [sample for samples in latencies.values() for sample in samples],
+                sum(errors.values()), elapsed
+            ), baseline))
+            for result in results:
+                line = json.dumps(result)
+                print(line)
+                if output:
+                    output.write(line + "\n")
+    finally:
+        if output:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Benchmark: one commit per created transaction versus group commit.
+
+Creates transactions from a number of worker threads, once through
+crud.create_transaction (one INSERT and one commit each, the default write
+mode) and once through transaction-service's GroupCommitter
+(TRANSACTION_WRITE_MODE=grouped), then reports rows/sec, commits/sec and
+latency percentiles for both. Commits are counted from pg_stat_database, so
+they include every commit the database performed during the run.
+
+Usage (against a migrated scratch database with rows in accounts, using the
+usual DB_* environment variables):
+
+    DB_HOST=localhost DB_NAME=quickbooks DB_USER=postgres DB_PASSWORD=postgres \
+        python backend/benchmarks/bench_group_commit.py --threads 64 --requests 20000
+
+The rows it creates are left in place.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+SERVICES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "services")
+
+
+def percentile(samples, pct):
+    """
+    Return the pct-th percentile of an already sorted list of samples.
+    """
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+    return samples[index]
+
+
+def commits(database):
+    """
+    Committed transactions of the current database so far.
+    """
+    conn = database.dedicated_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT pg_stat_clear_snapshot();")
+        cursor.execute("SELECT xact_commit FROM pg_stat_database WHERE datname = current_database();")
+        value = cursor.fetchone()[0]
+        cursor.close()
+        conn.commit()
+        return value
+    finally:
+        conn.close()
+
+
+def run(label, threads, requests, create, database):
+    """
+    Drive `requests` creates spread over `threads` workers.
+
+    Returns:
+    - Dictionary with throughput and latency percentiles in milliseconds.
+    """
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    per_thread = requests // threads
+
+    def worker(index):
+        local = []
+        for n in range(per_thread):
+            start = time.perf_counter()
+            try:
+                create(index * per_thread + n)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    # Let pg_stat_database catch up with earlier activity before the baseline.
+    time.sleep(1)
+    commits_before = commits(database)
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    time.sleep(1)
+    committed = commits(database) - commits_before
+
+    latencies.sort()
+    return {
+        "mode": label,
+        "rows": len(latencies),
+        "errors": len(errors),
+        "rows_per_sec": round(len(latencies) / elapsed, 1),
+        "commits_per_sec": round(committed / elapsed, 1),
+        "rows_per_commit": round(len(latencies) / committed, 2) if committed else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--window-ms", type=float, default=2.0, help="Group commit window")
+    parser.add_argument("--max-rows", type=int, default=100, help="Largest group")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.join(SERVICES_DIR, "transaction-service"))
+    from app import crud, database, group_commit, schemas
+
+    pool = database.get_pool()
+    conn = pool.getconn()
+    cursor = conn.cursor()
+    cursor.execute("SELECT id FROM accounts ORDER BY id LIMIT 1000;")
+    accounts = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    pool.putconn(conn)
+    if not accounts:
+        parser.error("accounts is empty; load it first, e.g. with generate_dataset.py --tables accounts")
+
+    def transaction(n):
+        return schemas.TransactionCreate(description=f"Group commit bench {n}", amount=1.0 + n % 500,
+                                         account_id=accounts[n % len(accounts)],
+                                         transaction_type="Credit" if n % 2 else "Debit")
+
+    def direct(n):
+        db = database.get_connection()
+        try:
+            crud.create_transaction(db, transaction(n))
+        finally:
+            database.release_connection(db)
+
+    committer = group_commit.GroupCommitter(window=args.window_ms / 1000.0, max_rows=args.max_rows)
+    results = [
+        run("direct", args.threads, args.requests, direct, database),
+        run("grouped", args.threads, args.requests, lambda n: committer.submit(transaction(n)), database),
+    ]
+    for result in results:
+        print(json.dumps(result))
+    print(json.dumps({"group_commit": committer.stats(), "pool_stats": pool.stats()}))
+
+
+if __name__ == "__main__":
+    main()
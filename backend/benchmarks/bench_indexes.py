@@ -0,0 +1,195 @@
+"""
+Benchmark: query plans before and after the index migrations.
+
+Creates the accounts, transactions, bank_transactions, audit_logs and
+payroll_records tables in a scratch schema, fills them with --rows rows each
+(one million by default) using server-side generate_series, and runs the
+statement, reconciliation and lookup queries under EXPLAIN (ANALYZE, BUFFERS)
+once with only the table DDL applied and once after every service's later
+migrations (indexes, and transaction-service's monthly partitioning). The
+migrations are read from each service's models.MIGRATIONS, so the benchmark
+always measures what `python -m app.migrate` would build.
+
+Usage (against a scratch Postgres, using the usual DB_* environment variables):
+
+    DB_HOST=localhost DB_NAME=quickbooks DB_USER=postgres DB_PASSWORD=postgres \
+        python backend/benchmarks/bench_indexes.py --rows 1000000
+
+Each result is printed as one JSON line. The scratch schema is dropped at the
+end unless --keep is given.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import psycopg2
+
+SERVICES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "services")
+SERVICES = ["account-service", "transaction-service", "banking-service", "audit-service", "payroll-service"]
+SCHEMA = "bench_indexes"
+TABLES = "accounts, transactions, bank_accounts, bank_transactions, audit_logs, employees, payroll_records"
+
+DUMP_MIGRATIONS = (
+    "import json; from app import models; "
+    "print(json.dumps([[m.version, m.statements] for m in models.MIGRATIONS]))"
+)
+
+# Executed with parameters, so literal modulo operators are written as %%.
+LOAD = [
+    """
+    INSERT INTO accounts (name, type, balance)
+    SELECT 'Account ' || g,
+           (ARRAY['Asset', 'Liability', 'Equity', 'Revenue', 'Expense'])[1 + g %% 5],
+           (g %% 1000) * 10.5
+    FROM generate_series(1, %(accounts)s) g;
+    """,
+    """
+    INSERT INTO transactions (account_id, description, amount, date, transaction_type)
+    SELECT 1 + g %% %(accounts)s, 'Transaction ' || g, (g %% 5000) / 10.0,
+           TIMESTAMP '2020-01-01' + (g %% 1461) * INTERVAL '1 day',
+           CASE WHEN g %% 2 = 0 THEN 'Credit' ELSE 'Debit' END
+    FROM generate_series(1, %(rows)s) g;
+    """,
+    """
+    INSERT INTO bank_accounts (account_name, account_number, balance)
+    SELECT 'Bank account ' || g, 'ACC' || g, 0 FROM generate_series(1, %(accounts)s) g;
+    """,
+    """
+    INSERT INTO bank_transactions (bank_account_id, description, amount, date, transaction_type)
+    SELECT 1 + g %% %(accounts)s, 'Bank transaction ' || g, (g %% 5000) / 10.0,
+           TIMESTAMP '2020-01-01' + (g %% 1461) * INTERVAL '1 day',
+           CASE WHEN g %% 3 = 0 THEN 'Debit' ELSE 'Credit' END
+    FROM generate_series(1, %(rows)s) g;
+    """,
+    """
+    INSERT INTO audit_logs (user_id, action, timestamp, details)
+    SELECT g %% 500, 'action ' || g %% 20, TIMESTAMP '2020-01-01' + g * INTERVAL '1 minute', 'web'
+    FROM generate_series(1, %(rows)s) g;
+    """,
+    """
+    INSERT INTO employees (full_name, email, position, salary, date_hired)
+    SELECT 'Employee ' || g, 'employee' || g || '@example.com', 'Staff', 50000, DATE '2020-01-01'
+    FROM generate_series(1, %(accounts)s) g;
+    """,
+    """
+    INSERT INTO payroll_records (employee_id, pay_date, gross_pay, net_pay, deductions, taxes)
+    SELECT 1 + g %% %(accounts)s, DATE '2020-01-01' + g %% 1461, 4000, 3000, 200, 800
+    FROM generate_series(1, %(rows)s) g;
+    """,
+]
+
+QUERIES = {
+    "balance_sheet_assets": "SELECT SUM(balance) FROM accounts WHERE type = 'Asset';",
+    "income_statement_revenues": """
+        SELECT SUM(amount) FROM transactions t
+        JOIN accounts a ON t.account_id = a.id
+        WHERE a.type = 'Revenue' AND t.transaction_type = 'Credit';
+    """,
+    "transactions_for_account": """
+        SELECT id, amount, date FROM transactions
+        WHERE account_id = 42 ORDER BY date DESC LIMIT 50;
+    """,
+    "transactions_last_week": """
+        SELECT COUNT(*), SUM(amount) FROM transactions
+        WHERE date >= TIMESTAMP '2023-12-25' AND date < TIMESTAMP '2024-01-01';
+    """,
+    "reconcile_bank_account": """
+        SELECT amount, transaction_type FROM bank_transactions WHERE bank_account_id = 42;
+    """,
+    "recent_audit_logs": """
+        SELECT id, user_id, action, timestamp, details
+        FROM audit_logs ORDER BY timestamp DESC OFFSET 0 LIMIT 100;
+    """,
+    "payroll_for_employee": "SELECT * FROM payroll_records WHERE employee_id = 42;",
+}
+
+
+def load_migrations(service):
+    """
+    Return {version: statements} from a service's models.MIGRATIONS.
+    """
+    out = subprocess.run(
+        [sys.executable, "-c", DUMP_MIGRATIONS],
+        cwd=os.path.join(SERVICES_DIR, service), capture_output=True, text=True, check=True
+    )
+    return {version: statements for version, statements in json.loads(out.stdout)}
+
+
+def explain(cursor, sql):
+    """
+    Run a query under EXPLAIN (ANALYZE, BUFFERS) and summarise the plan.
+    """
+    cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql.strip().rstrip(';')}")
+    plan = cursor.fetchone()[0][0]
+    nodes = []
+
+    def walk(node):
+        label = node["Node Type"]
+        if "Index Name" in node:
+            label += f" using {node['Index Name']}"
+        nodes.append(label)
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan["Plan"])
+    return {
+        "execution_ms": round(plan["Execution Time"], 3),
+        "shared_hit": plan["Plan"].get("Shared Hit Blocks", 0),
+        "shared_read": plan["Plan"].get("Shared Read Blocks", 0),
+        "plan": nodes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows per fact table")
+    parser.add_argument("--accounts", type=int, default=1000, help="Rows per dimension table")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per query; the fastest is reported")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch schema")
+    args = parser.parse_args()
+
+    migrations = {service: load_migrations(service) for service in SERVICES}
+
+    conn = psycopg2.connect(
+        host=os.environ.get("DB_HOST"),
+        port=int(os.environ.get("DB_PORT", 5432)),
+        database=os.environ.get("DB_NAME"),
+        user=os.environ.get("DB_USER"),
+        password=os.environ.get("DB_PASSWORD")
+    )
+    conn.autocommit = True
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA};")
+        cursor.execute(f"SET search_path TO {SCHEMA};")
+        for service in SERVICES:
+            for statement in migrations[service][1]:
+                cursor.execute(statement)
+        for statement in LOAD:
+            cursor.execute(statement, {"rows": args.rows, "accounts": args.accounts})
+        cursor.execute(f"VACUUM ANALYZE {TABLES};")
+
+        for phase in ("before", "after"):
+            if phase == "after":
+                for service in SERVICES:
+                    for version, statements in sorted(migrations[service].items()):
+                        if version > 1:
+                            for statement in statements:
+                                cursor.execute(statement)
+                cursor.execute(f"VACUUM ANALYZE {TABLES};")
+            for name, sql in QUERIES.items():
+                runs = [explain(cursor, sql) for _ in range(args.runs)]
+                best = min(runs, key=lambda run: run["execution_ms"])
+                print(json.dumps({"query": name, "phase": phase, "rows": args.rows, **best}))
+    finally:
+        if not args.keep:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;")
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+"""
+Synthetic accounting dataset generator for scale testing.
+
+Fills accounts, transactions, bank_accounts, bank_transactions, employees,
+payroll_records, inventory_items and audit_logs with realistically skewed data:
+
+- a few hot accounts (Zipf-distributed) receive most of the postings,
+- postings cluster around month end,
+- amounts, salaries and prices are log-normal.
+
+Rows are produced lazily and streamed into COPY ... FROM STDIN in batches of
+--batch-size rows, so memory stays flat at any scale. Every table draws from
+its own generator seeded from --seed, so the same seed and scale always
+produce the same rows. Explicit ids are loaded and the id sequences are moved
+past them afterwards.
+
+Usage (using the usual DB_* environment variables):
+
+    python backend/benchmarks/generate_dataset.py --migrate --truncate --scale 1
+    python backend/benchmarks/generate_dataset.py --tables transactions,audit_logs --scale 5
+
+At scale 1 the fact tables (transactions, bank_transactions, audit_logs) get
+one million rows each. One JSON line per table reports rows and load rate.
+"""
+
+import argparse
+import bisect
+import collections
+import datetime
+import itertools
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+
+SERVICES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "services")
+
+ACCOUNT_TYPES = ["Asset", "Liability", "Equity", "Revenue", "Expense"]
+ACCOUNT_TYPE_WEIGHTS = [30, 15, 5, 20, 30]
+CREDIT_NORMAL = {"Liability", "Equity", "Revenue"}
+COUNTERPARTIES = ["Acme Supplies", "Northwind", "Globex", "Initech", "Umbrella", "Stark Industries",
+                  "Wayne Enterprises", "Hooli", "Payroll", "Rent", "Utilities", "Customer payment"]
+FIRST_NAMES = ["Ada", "Grace", "Alan", "Edsger", "Barbara", "Donald", "Margaret", "Ken", "Linus", "Frances"]
+LAST_NAMES = ["Lovelace", "Hopper", "Turing", "Dijkstra", "Liskov", "Knuth", "Hamilton", "Thompson",
+              "Torvalds", "Allen"]
+POSITIONS = ["Accountant", "Clerk", "Engineer", "Manager", "Analyst", "Sales"]
+AUDIT_ACTIONS = ["login", "logout", "create_transaction", "update_transaction", "delete_transaction",
+                 "reconcile", "export", "view_report"]
+MAX_AMOUNT = 9_999_999.99
+
+
+def zipf_cum_weights(count, exponent=1.1):
+    """
+    Cumulative weights for a Zipf distribution over `count` ranks.
+    """
+    return list(itertools.accumulate(1.0 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+def hot_picker(rng, ids):
+    """
+    Return a function picking ids with Zipf skew; which ids are hot is itself random.
+    """
+    ids = list(ids)
+    rng.shuffle(ids)
+    cum_weights = zipf_cum_weights(len(ids))
+    total = cum_weights[-1]
+    return lambda: ids[min(bisect.bisect(cum_weights, rng.random() * total), len(ids) - 1)]
+
+
+def amount(rng, mu=4.0, sigma=1.2):
+    return round(min(rng.lognormvariate(mu, sigma), MAX_AMOUNT), 2)
+
+
+def posting_time(rng, start, months):
+    """
+    Pick a timestamp in one of `months` months after `start`, a third of them in the last three days.
+    """
+    month = rng.randrange(months)
+    first = datetime.datetime(start.year + (start.month - 1 + month) // 12,
+                              (start.month - 1 + month) % 12 + 1, 1)
+    following = datetime.datetime(first.year + first.month // 12, first.month % 12 + 1, 1)
+    days = (following - first).days
+    day = rng.randrange(days - 3, days) if rng.random() < 0.33 else rng.randrange(days)
+    return first + datetime.timedelta(days=day, seconds=rng.randrange(8 * 3600, 18 * 3600))
+
+
+def gen_accounts(rng, ctx, first_id, count):
+    for account_id in range(first_id, first_id + count):
+        account_type = rng.choices(ACCOUNT_TYPES, ACCOUNT_TYPE_WEIGHTS)[0]
+        yield account_id, f"{account_type} account {account_id}", account_type, 0
+
+
+def _postings(rng, ctx, first_id, count, parent):
+    pick = hot_picker(rng, ctx[parent])
+    types = ctx.get(f"{parent}_types", {})
+    for row_id in range(first_id, first_id + count):
+        parent_id = pick()
+        credit_normal = types.get(parent_id) in CREDIT_NORMAL
+        credit = (rng.random() < 0.85) == credit_normal
+        yield (row_id, parent_id, f"{rng.choice(COUNTERPARTIES)} #{row_id}", amount(rng),
+               posting_time(rng, ctx["start"], ctx["months"]), "Credit" if credit else "Debit")
+
+
+def gen_transactions(rng, ctx, first_id, count):
+    return _postings(rng, ctx, first_id, count, "accounts")
+
+
+def gen_bank_accounts(rng, ctx, first_id, count):
+    for account_id in range(first_id, first_id + count):
+        yield account_id, f"Operating account {account_id}", f"{ctx['seed'] % 100:02d}{account_id:010d}", 0
+
+
+def gen_bank_transactions(rng, ctx, first_id, count):
+    return _postings(rng, ctx, first_id, count, "bank_accounts")
+
+
+def gen_employees(rng, ctx, first_id, count):
+    for employee_id in range(first_id, first_id + count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        hired = ctx["start"].date() - datetime.timedelta(days=rng.randrange(0, 3650))
+        yield (employee_id, f"{first} {last}", f"{first}.{last}.{employee_id}@example.com".lower(),
+               rng.choice(POSITIONS), round(min(rng.lognormvariate(11.0, 0.35), MAX_AMOUNT), 2), hired)
+
+
+def gen_payroll_records(rng, ctx, first_id, count):
+    """
+    Semi-monthly pay runs for every employee over the dataset period; `count` is ignored.
+    """
+    record_id = first_id
+    for month in range(ctx["months"]):
+        year = ctx["start"].year + (ctx["start"].month - 1 + month) // 12
+        month_number = (ctx["start"].month - 1 + month) % 12 + 1
+        month_end = (datetime.date(year + month_number // 12, month_number % 12 + 1, 1)
+                     - datetime.timedelta(days=1))
+        for pay_date in (datetime.date(year, month_number, 15), month_end):
+            for employee_id, salary in ctx["employees_salaries"]:
+                gross = round(float(salary) / 24, 2)
+                taxes = round(gross * rng.uniform(0.15, 0.3), 2)
+                deductions = round(gross * rng.uniform(0.02, 0.08), 2)
+                yield record_id, employee_id, pay_date, gross, round(gross - taxes - deductions, 2), deductions, taxes
+                record_id += 1
+
+
+def gen_inventory_items(rng, ctx, first_id, count):
+    for item_id in range(first_id, first_id + count):
+        quantity = min(int(rng.expovariate(1 / 40)), 100000)
+        yield item_id, f"Item {item_id}", f"SKU-{item_id:08d}", quantity, amount(rng, 3.0, 1.0)
+
+
+def gen_audit_logs(rng, ctx, first_id, count):
+    pick_user = hot_picker(rng, range(1, ctx["users"] + 1))
+    for log_id in range(first_id, first_id + count):
+        yield (log_id, pick_user(), rng.choice(AUDIT_ACTIONS),
+               posting_time(rng, ctx["start"], ctx["months"]), rng.choice(["web", "mobile", "api"]))
+
+
+Table = collections.namedtuple("Table", ["columns", "rows_at_scale_1", "generate", "service"])
+
+# Parents before children; `service` owns the table's migrations.
+TABLES = collections.OrderedDict([
+    ("accounts", Table("id, name, type, balance", 1_000, gen_accounts, "ledger-service")),
+    ("transactions", Table("id, account_id, description, amount, date, transaction_type",
+                           1_000_000, gen_transactions, "transaction-service")),
+    ("bank_accounts", Table("id, account_name, account_number, balance", 200, gen_bank_accounts,
+                            "banking-service")),
+    ("bank_transactions", Table("id, bank_account_id, description, amount, date, transaction_type",
+                                1_000_000, gen_bank_transactions, "banking-service")),
+    ("employees", Table("id, full_name, email, position, salary, date_hired", 2_000, gen_employees,
+                        "payroll-service")),
+    ("payroll_records", Table("id, employee_id, pay_date, gross_pay, net_pay, deductions, taxes",
+                              None, gen_payroll_records, "payroll-service")),
+    ("inventory_items", Table("id, name, description, quantity, price", 50_000, gen_inventory_items,
+                              "inventory-service")),
+    ("audit_logs", Table("id, user_id, action, timestamp, details", 1_000_000, gen_audit_logs,
+                         "audit-service")),
+])
+
+# Tables whose rows reference another table's ids.
+PARENTS = {
+    "transactions": "accounts",
+    "bank_transactions": "bank_accounts",
+    "payroll_records": "employees",
+}
+
+# Balance recomputed after the postings of a parent table are loaded.
+BALANCE_UPDATES = {
+    "transactions": ("accounts", "account_id"),
+    "bank_transactions": ("bank_accounts", "bank_account_id"),
+}
+
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=" ")
+    return str(value)
+
+
+class CopyStream:
+    """
+    File-like object producing COPY text-format lines on demand from a row iterator.
+    """
+
+    def __init__(self, rows):
+        self._rows = rows
+        self._pending = ""
+        self.rows = 0
+
+    def read(self, size=-1):
+        chunks = [self._pending]
+        length = len(self._pending)
+        if size < 0 or length < size:
+            for row in self._rows:
+                line = "\t".join(_copy_value(value) for value in row) + "\n"
+                chunks.append(line)
+                length += len(line)
+                self.rows += 1
+                if 0 <= size <= length:
+                    break
+        data = "".join(chunks)
+        if size < 0 or len(data) <= size:
+            self._pending = ""
+            return data
+        self._pending = data[size:]
+        return data[:size]
+
+
+def _parent_context(cursor, ctx, name):
+    """
+    Load the ids (and whatever else the generators need) of tables `name` references.
+    """
+    if name == "transactions":
+        cursor.execute("SELECT id, type FROM accounts;")
+        rows = cursor.fetchall()
+        ctx["accounts"] = [row[0] for row in rows]
+        ctx["accounts_types"] = dict(rows)
+    elif name == "bank_transactions":
+        cursor.execute("SELECT id FROM bank_accounts;")
+        ctx["bank_accounts"] = [row[0] for row in cursor.fetchall()]
+    elif name == "payroll_records":
+        cursor.execute("SELECT id, salary FROM employees ORDER BY id;")
+        ctx["employees_salaries"] = cursor.fetchall()
+    for parent in ("accounts", "bank_accounts"):
+        if parent in ctx and not ctx[parent]:
+            raise RuntimeError(f"{name} needs rows in {parent}; generate it first")
+
+
+def _create_partitions(cursor, ctx):
+    """
+    Create the monthly transactions partitions covering the generated period, when partitioned.
+    """
+    cursor.execute("SELECT to_regprocedure('create_transaction_partitions(date, date)') IS NOT NULL;")
+    if cursor.fetchone()[0]:
+        start = ctx["start"]
+        last = datetime.datetime(start.year + (start.month - 1 + ctx["months"]) // 12,
+                                 (start.month - 1 + ctx["months"]) % 12 + 1, 1)
+        cursor.execute("SELECT create_transaction_partitions(%s, %s);", (start.date(), last.date()))
+
+
+def generate_table(conn, name, count, ctx, batch_size):
+    """
+    Stream `count` generated rows into a table with one COPY per batch.
+
+    Returns:
+    - Number of rows loaded.
+    """
+    table = TABLES[name]
+    cursor = conn.cursor()
+    try:
+        _parent_context(cursor, ctx, name)
+        if name == "transactions":
+            _create_partitions(cursor, ctx)
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {name};")
+        first_id = cursor.fetchone()[0] + 1
+        rng = random.Random(f"{ctx['seed']}:{name}")
+        rows = table.generate(rng, ctx, first_id, count)
+        loaded = 0
+        while True:
+            stream = CopyStream(itertools.islice(rows, batch_size))
+            cursor.copy_expert(f"COPY {name} ({table.columns}) FROM STDIN", stream)
+            conn.commit()
+            loaded += stream.rows
+            if stream.rows < batch_size:
+                break
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), GREATEST(MAX(id), 1)) FROM {name};"
+        )
+        if name in BALANCE_UPDATES:
+            parent, column = BALANCE_UPDATES[name]
+            cursor.execute(f"""
+                UPDATE {parent} p SET balance = s.balance
+                FROM (
+                    SELECT {column} AS id,
+                           SUM(CASE WHEN transaction_type = 'Credit' THEN amount ELSE -amount END) AS balance
+                    FROM {name} GROUP BY {column}
+                ) s
+                WHERE p.id = s.id;
+            """)
+        conn.commit()
+        cursor.execute(f"ANALYZE {name};")
+        conn.commit()
+        return loaded
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def generate(conn, scale=1.0, seed=42, tables=None, batch_size=100_000, months=24,
+             start=datetime.datetime(2023, 1, 1), users=500):
+    """
+    Generate the dataset into existing tables.
+
+    Parameters:
+    - conn: psycopg2 connection.
+    - scale: Multiplier applied to every table's row count.
+    - seed: Base random seed.
+    - tables: Table names to fill (default: all, in dependency order).
+    - batch_size: Rows per COPY batch.
+    - months: Length of the period postings and pay runs cover.
+    - start: First day of that period.
+    - users: Number of distinct audit log users.
+
+    Returns:
+    - List of per-table result dictionaries.
+    """
+    ctx = {"seed": seed, "months": months, "start": start, "users": users}
+    results = []
+    for name in TABLES:
+        if tables is not None and name not in tables:
+            continue
+        rows_at_scale_1 = TABLES[name].rows_at_scale_1
+        count = max(1, int(math.ceil(rows_at_scale_1 * scale))) if rows_at_scale_1 else None
+        started = time.perf_counter()
+        loaded = generate_table(conn, name, count, ctx, batch_size)
+        elapsed = time.perf_counter() - started
+        results.append({"table": name, "rows": loaded, "seconds": round(elapsed, 2),
+                        "rows_per_sec": round(loaded / elapsed) if elapsed else None})
+    return results
+
+
+def main():
+    import psycopg2
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", type=float, default=1.0, help="Row count multiplier")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tables", help=f"Comma-separated subset of: {', '.join(TABLES)}")
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--migrate", action="store_true", help="Apply the owning services' migrations first")
+    parser.add_argument("--truncate", action="store_true", help="Empty the selected tables first")
+    args = parser.parse_args()
+
+    tables = args.tables.split(",") if args.tables else list(TABLES)
+    unknown = set(tables) - set(TABLES)
+    if unknown:
+        parser.error(f"unknown tables: {', '.join(sorted(unknown))}")
+
+    if args.migrate:
+        for service in dict.fromkeys(TABLES[name].service for name in TABLES):
+            subprocess.run([sys.executable, "-m", "app.migrate"], cwd=os.path.join(SERVICES_DIR, service),
+                           check=True)
+
+    conn = psycopg2.connect(
+        host=os.environ.get("DB_HOST"),
+        port=int(os.environ.get("DB_PORT", 5432)),
+        database=os.environ.get("DB_NAME"),
+        user=os.environ.get("DB_USER"),
+        password=os.environ.get("DB_PASSWORD")
+    )
+    try:
+        if args.truncate:
+            cursor = conn.cursor()
+            cursor.execute(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY CASCADE;")
+            conn.commit()
+            cursor.close()
+        for result in generate(conn, args.scale, args.seed, tables, args.batch_size, args.months):
+            print(json.dumps(result))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
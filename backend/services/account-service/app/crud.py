@@ -2,75 +2,255 @@
 CRUD operations and data aggregation for the Accounting Service using direct AWS RDS PostgreSQL connection.
 """
 
-from . import schemas
+from . import schemas, utils
 import logging
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# Accounts fetched per round trip while streaming the trial balance.
+TRIAL_BALANCE_BATCH_SIZE = 5000
 
-def generate_balance_sheet(db):
+# Statements computed by this process, keyed on the ledger version.
+statement_cache = utils.VersionedCache()
+
+
+def ledger_version(db):
+    """
+    Return the current ledger version, which every committed write to accounts or
+    transactions increases.
+    """
+    cursor = db.cursor()
+    try:
+        cursor.execute("SELECT SUM(version) FROM ledger_version;")
+        return cursor.fetchone()[0] or 0
+    finally:
+        cursor.close()
+
+
+def generate_balance_sheet(db, version=None):
     """
     Generate the balance sheet by calculating total assets, liabilities, and equity.
 
+    Served from the per-process cache while the ledger version is unchanged;
+    otherwise all three totals are computed in one GROUP BY pass, together
+    with the version they correspond to.
+
+    Parameters:
+    - version: Ledger version the caller has just read; read here when omitted.
+
     Returns:
     - BalanceSheet schema.
     """
+    if version is None:
+        version = ledger_version(db)
+    cached = statement_cache.get("balance_sheet", version)
+    if cached is not None:
+        return cached
     cursor = db.cursor()
     try:
-        # Calculate assets
-        cursor.execute("SELECT SUM(balance) FROM accounts WHERE type = 'Asset';")
-        assets = cursor.fetchone()[0] or 0.0
-
-        # Calculate liabilities
-        cursor.execute("SELECT SUM(balance) FROM accounts WHERE type = 'Liability';")
-        liabilities = cursor.fetchone()[0] or 0.0
-
-        # Calculate equity
-        cursor.execute("SELECT SUM(balance) FROM accounts WHERE type = 'Equity';")
-        equity = cursor.fetchone()[0] or 0.0
-
-        balance_sheet = schemas.BalanceSheet(
-            assets=assets,
-            liabilities=liabilities,
-            equity=equity
-        )
-        return balance_sheet
+        cursor.execute("""
+            SELECT v.version, a.type, a.total
+            FROM (SELECT SUM(version) AS version FROM ledger_version) v
+            LEFT JOIN (
+                SELECT type, SUM(balance) AS total FROM accounts
+                WHERE type IN ('Asset', 'Liability', 'Equity') GROUP BY type
+            ) a ON TRUE;
+        """)
+        rows = cursor.fetchall()
     finally:
         cursor.close()
+    totals = {row[1]: row[2] for row in rows if row[1] is not None}
+    balance_sheet = schemas.BalanceSheet(
+        assets=totals.get("Asset") or 0.0,
+        liabilities=totals.get("Liability") or 0.0,
+        equity=totals.get("Equity") or 0.0
+    )
+    statement_cache.put("balance_sheet", rows[0][0] or 0, balance_sheet)
+    return balance_sheet
 
 
-def generate_income_statement(db):
+def generate_income_statement(db, start_date=None, end_date=None):
     """
     Generate the income statement by calculating total revenues and expenses.
 
+    Reads the daily_account_totals rollup maintained by transaction-service,
+    so a period costs one row per account and day rather than a scan of its
+    transactions.
+
+    Parameters:
+    - start_date, end_date: Optional period; both days inclusive.
+
     Returns:
     - IncomeStatement schema.
     """
+    conditions = ["a.type IN ('Revenue', 'Expense')"]
+    params = []
+    if start_date is not None:
+        conditions.append("d.day >= %s")
+        params.append(start_date)
+    if end_date is not None:
+        conditions.append("d.day <= %s")
+        params.append(end_date)
     cursor = db.cursor()
     try:
-        # Calculate revenues
-        cursor.execute("""
-            SELECT SUM(amount) FROM transactions t
-            JOIN accounts a ON t.account_id = a.id
-            WHERE a.type = 'Revenue' AND t.transaction_type = 'Credit';
-        """)
-        revenues = cursor.fetchone()[0] or 0.0
+        cursor.execute(f"""
+            SELECT COALESCE(SUM(d.credit_total) FILTER (WHERE a.type = 'Revenue'), 0),
+                   COALESCE(SUM(d.debit_total) FILTER (WHERE a.type = 'Expense'), 0)
+            FROM daily_account_totals d
+            JOIN accounts a ON a.id = d.account_id
+            WHERE {" AND ".join(conditions)};
+        """, params)
+        revenues, expenses = cursor.fetchone()
+    finally:
+        cursor.close()
+    return schemas.IncomeStatement(
+        revenues=revenues,
+        expenses=expenses,
+        net_income=utils.calculate_net_income(revenues, expenses)
+    )
 
-        # Calculate expenses
-        cursor.execute("""
-            SELECT SUM(amount) FROM transactions t
-            JOIN accounts a ON t.account_id = a.id
-            WHERE a.type = 'Expense' AND t.transaction_type = 'Debit';
-        """)
-        expenses = cursor.fetchone()[0] or 0.0
 
-        net_income = revenues - expenses
+# Account types of the comparative statement, in row order of its arrays.
+COMPARATIVE_TYPES = ["Asset", "Liability", "Equity", "Revenue", "Expense"]
+
+# Rows with period 0 carry the current balance per type; the others carry each
+# period's credits and debits and the net credits posted after its end, which
+# rewind the current balance to the balance as of that end.
+COMPARATIVE_SQL = """
+    WITH periods AS (
+        SELECT * FROM unnest(%s::date[], %s::date[]) WITH ORDINALITY AS p(start_date, end_date, n)
+    )
+    SELECT 0, type, COALESCE(SUM(balance), 0), 0, 0, 0 FROM accounts
+    WHERE type IN ('Asset', 'Liability', 'Equity')
+    GROUP BY type
+    UNION ALL
+    SELECT p.n, a.type, 0,
+           COALESCE(SUM(d.credit_total) FILTER (WHERE d.day BETWEEN p.start_date AND p.end_date), 0),
+           COALESCE(SUM(d.debit_total) FILTER (WHERE d.day BETWEEN p.start_date AND p.end_date), 0),
+           COALESCE(SUM(d.credit_total - d.debit_total) FILTER (WHERE d.day > p.end_date), 0)
+    FROM periods p
+    JOIN daily_account_totals d ON d.day >= p.start_date
+    JOIN accounts a ON a.id = d.account_id
+    WHERE a.type IN ('Asset', 'Liability', 'Equity', 'Revenue', 'Expense')
+    GROUP BY p.n, a.type;
+"""
+
+
+def generate_comparative_statements(db, periods):
+    """
+    Generate the balance sheet and income statement for several periods at once.
+
+    Every period comes from one grouped query over the daily_account_totals
+    rollup; the statement lines and their period-over-period changes are then
+    computed on NumPy arrays.
 
-        income_statement = schemas.IncomeStatement(
-            revenues=revenues,
-            expenses=expenses,
-            net_income=net_income
-        )
-        return income_statement
+    Parameters:
+    - periods: List of StatementPeriod schemas, in column order.
+
+    Returns:
+    - ComparativeStatements schema.
+    """
+    cursor = db.cursor()
+    try:
+        cursor.execute(COMPARATIVE_SQL, (
+            [period.start_date for period in periods], [period.end_date for period in periods]
+        ))
+        rows = cursor.fetchall()
     finally:
         cursor.close()
+
+    # (period, type index, balance, credits, debits, net credits after the period)
+    type_index = {account_type: index for index, account_type in enumerate(COMPARATIVE_TYPES)}
+    data = np.array([(row[0], type_index[row[1]], *row[2:]) for row in rows], dtype=float).reshape(-1, 6)
+    current = data[data[:, 0] == 0]
+    activity = data[data[:, 0] > 0]
+    balances = np.zeros(len(COMPARATIVE_TYPES))
+    balances[current[:, 1].astype(int)] = current[:, 2]
+    credits, debits, later = (np.zeros((len(COMPARATIVE_TYPES), len(periods))) for _ in range(3))
+    cells = (activity[:, 1].astype(int), activity[:, 0].astype(int) - 1)
+    credits[cells], debits[cells], later[cells] = activity[:, 3], activity[:, 4], activity[:, 5]
+
+    balance_sheet = balances[:3, None] - later[:3]
+    revenues, expenses = credits[3], debits[4]
+    income_statement = np.vstack([revenues, expenses, revenues - expenses])
+
+    def lines(names, values):
+        change, change_percent = utils.period_changes(values)
+        return [
+            schemas.ComparativeLine(name=name, values=utils.to_column(values[i]),
+                                    change=utils.to_column(change[i]),
+                                    change_percent=utils.to_column(change_percent[i]))
+            for i, name in enumerate(names)
+        ]
+
+    return schemas.ComparativeStatements(
+        periods=periods,
+        balance_sheet=lines(["assets", "liabilities", "equity"], balance_sheet),
+        income_statement=lines(["revenues", "expenses", "net_income"], income_statement)
+    )
+
+
+def iter_trial_balance_batches(db, as_of=None, batch_size=TRIAL_BALANCE_BATCH_SIZE):
+    """
+    Stream per-account debit and credit totals in account order through a server-side cursor.
+
+    The totals are summed from the daily_account_totals rollup in one grouped
+    aggregate over its (account_id, day) covering index, which yields each
+    account as soon as its days are read, so only one batch is held in memory.
+    Every account is listed; one with no activity up to as_of has zero totals.
+    The connection stays inside a read-only transaction until the iterator is
+    exhausted or closed.
+
+    Parameters:
+    - as_of: Last day included; every day when omitted.
+    - batch_size: Rows fetched per round trip (the cursor's itersize).
+
+    Returns:
+    - Iterator of lists of (account id, name, type, debit total, credit total) rows.
+    """
+    where = "WHERE day <= %s" if as_of is not None else ""
+    cursor = db.cursor(name="trial_balance")
+    cursor.itersize = batch_size
+    try:
+        cursor.execute(f"""
+            SELECT a.id, a.name, a.type, COALESCE(t.debit_total, 0), COALESCE(t.credit_total, 0)
+            FROM accounts a
+            LEFT JOIN (
+                SELECT account_id, SUM(debit_total) AS debit_total, SUM(credit_total) AS credit_total
+                FROM daily_account_totals {where}
+                GROUP BY account_id
+            ) t ON t.account_id = a.id
+            ORDER BY a.id;
+        """, [as_of] if as_of is not None else [])
+        while True:
+            rows = cursor.fetchmany(cursor.itersize)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+        db.rollback()
+
+
+def generate_trial_balance(db, as_of=None):
+    """
+    Generate the trial balance as of a day.
+
+    Parameters:
+    - as_of: Last day included; every day when omitted.
+
+    Returns:
+    - TrialBalance schema.
+    """
+    lines = [
+        schemas.TrialBalanceLine(account_id=row[0], name=row[1], type=row[2],
+                                 debit_total=row[3], credit_total=row[4])
+        for rows in iter_trial_balance_batches(db, as_of) for row in rows
+    ]
+    return schemas.TrialBalance(
+        as_of=as_of,
+        accounts=lines,
+        total_debits=sum(line.debit_total for line in lines),
+        total_credits=sum(line.credit_total for line in lines)
+    )
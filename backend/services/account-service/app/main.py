@@ -5,11 +5,11 @@ This module initializes the FastAPI app and defines the endpoints for managing f
 such as balance sheets and income statements.
 """
 
-from fastapi import FastAPI, Depends, HTTPException, status
-from . import schemas, crud, utils
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from . import schemas, crud, utils, database, instrumentation
+import datetime
 import logging
-import psycopg2
-import os
 
 # Initialize FastAPI app
 app = FastAPI(title="Accounting Service", description="Financial statements management endpoints")
@@ -23,29 +23,59 @@ def get_db():
     """
     Dependency to get a database connection.
     """
-    conn = psycopg2.connect(
-        host=os.environ.get("DB_HOST"),
-        port=int(os.environ.get("DB_PORT", 5432)),
-        database=os.environ.get("DB_NAME"),
-        user=os.environ.get("DB_USER"),
-        password=os.environ.get("DB_PASSWORD")
-    )
+    db = database.get_connection()
     try:
-        yield conn
+        yield db
     finally:
-        conn.close()
+        database.release_connection(db)
+
+
+@app.on_event("startup")
+def warm_up():
+    """
+    Pre-open pooled database connections once per container.
+    """
+    database.warm_pool()
+
+
+# Per-route metrics on GET /metrics and the slow query log on GET /admin/slow_queries.
+instrumentation.install(app, gauges=database.pool_gauges, explain_connect=database.dedicated_connection)
+
+
+def _revalidate(request: Request, db, name):
+    """
+    Tag a statement with the current ledger version and check the client's copy.
+
+    Only the ledger version is read, so a current copy is confirmed without
+    touching the aggregates. The version is read before the statement is
+    computed, so a statement is never older than its ETag claims.
+
+    Returns:
+    - (ledger version, ETag and Cache-Control headers, whether If-None-Match
+      names the current ETag).
+    """
+    version = crud.ledger_version(db)
+    etag = utils.statement_etag(name, version, request.query_params.multi_items())
+    headers = {"ETag": etag, "Cache-Control": utils.STATEMENT_CACHE_CONTROL}
+    return version, headers, utils.etag_matches(request.headers.get("if-none-match"), etag)
 
 
 @app.get("/financial_statements/balance_sheet/", response_model=schemas.BalanceSheet)
-def get_balance_sheet(db=Depends(get_db)):
+def get_balance_sheet(request: Request, response: Response, db=Depends(get_db)):
     """
     Retrieve the balance sheet.
 
+    Answers 304 Not Modified when If-None-Match carries the current ETag.
+
     Returns:
     - BalanceSheet schema containing assets, liabilities, and equity.
     """
     try:
-        balance_sheet = crud.generate_balance_sheet(db)
+        version, headers, not_modified = _revalidate(request, db, "balance_sheet")
+        if not_modified:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+        balance_sheet = crud.generate_balance_sheet(db, version)
         return balance_sheet
     except Exception as e:
         logger.exception("Error generating balance sheet")
@@ -53,16 +83,95 @@ def get_balance_sheet(db=Depends(get_db)):
 
 
 @app.get("/financial_statements/income_statement/", response_model=schemas.IncomeStatement)
-def get_income_statement(db=Depends(get_db)):
+def get_income_statement(request: Request, response: Response, start_date: datetime.date = None,
+                         end_date: datetime.date = None, db=Depends(get_db)):
     """
-    Retrieve the income statement.
+    Retrieve the income statement, optionally for a period.
+
+    Answers 304 Not Modified when If-None-Match carries the current ETag.
+
+    Parameters:
+    - start_date, end_date: Period covered; both days inclusive. Either may be omitted.
 
     Returns:
     - IncomeStatement schema containing revenues and expenses.
     """
+    if start_date is not None and end_date is not None and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
     try:
-        income_statement = crud.generate_income_statement(db)
+        _, headers, not_modified = _revalidate(request, db, "income_statement")
+        if not_modified:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+        income_statement = crud.generate_income_statement(db, start_date, end_date)
         return income_statement
     except Exception as e:
         logger.exception("Error generating income statement")
         raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/financial_statements/comparative/", response_model=schemas.ComparativeStatements)
+def get_comparative_statements(request: schemas.ComparativeStatementRequest, db=Depends(get_db)):
+    """
+    Retrieve the balance sheet and income statement for several periods side by side,
+    e.g. consecutive months or the same quarter of consecutive years.
+
+    Parameters:
+    - request: ComparativeStatementRequest schema with 1 to utils.MAX_COMPARATIVE_PERIODS periods.
+
+    Returns:
+    - ComparativeStatements schema with one value per period on every line, and
+      each period's change from the previous one.
+    """
+    if not 1 <= len(request.periods) <= utils.MAX_COMPARATIVE_PERIODS:
+        raise HTTPException(status_code=400,
+                            detail=f"Between 1 and {utils.MAX_COMPARATIVE_PERIODS} periods are required")
+    if any(period.start_date > period.end_date for period in request.periods):
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    try:
+        return crud.generate_comparative_statements(db, request.periods)
+    except Exception as e:
+        logger.exception("Error generating comparative statements")
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/financial_statements/trial_balance/", response_model=schemas.TrialBalance)
+def get_trial_balance(request: Request, response: Response, as_of: datetime.date = None,
+                      format: str = Query("json", pattern="^(json|csv)$"), db=Depends(get_db)):
+    """
+    Retrieve per-account debit and credit totals as of a day.
+
+    Answers 304 Not Modified when If-None-Match carries the current ETag.
+
+    Parameters:
+    - as_of: Last day included; every day when omitted.
+    - format: "json", or "csv" to stream the accounts one batch at a time,
+      ending with a "Total" row, for very large charts of accounts.
+
+    Returns:
+    - TrialBalance schema, or a streaming CSV download.
+    """
+    try:
+        _, headers, not_modified = _revalidate(request, db, "trial_balance")
+        if not_modified:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        if format == "json":
+            response.headers.update(headers)
+            return crud.generate_trial_balance(db, as_of)
+    except Exception as e:
+        logger.exception("Error generating trial balance")
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def stream():
+        # The stream outlives the request handler, so it holds its own connection,
+        # taken only once the body is actually iterated.
+        stream_db = database.get_connection()
+        try:
+            yield from utils.trial_balance_csv_chunks(crud.iter_trial_balance_batches(stream_db, as_of))
+        finally:
+            database.release_connection(stream_db)
+
+    filename = f"trial_balance_{as_of.isoformat()}.csv" if as_of else "trial_balance.csv"
+    return StreamingResponse(stream(), media_type="text/csv", headers={
+        "Content-Disposition": f'attachment; filename="{filename}"', **headers
+    })
@@ -4,6 +4,8 @@ Database models for the Accounting Service.
 Defines SQL statements for creating the accounts and transactions tables.
 """
 
+from .migrate import Migration
+
 accounts_table_creation = """
 CREATE TABLE IF NOT EXISTS accounts (
     id SERIAL PRIMARY KEY,
@@ -23,3 +25,52 @@ CREATE TABLE IF NOT EXISTS transactions (
     transaction_type VARCHAR(10) NOT NULL  -- 'Debit' or 'Credit'
 );
 """
+
+accounts_type_index_creation = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_accounts_type
+ON accounts (type) INCLUDE (id, balance);
+"""
+
+# Ledger version counter, bumped by every statement that writes accounts and
+# read by the statement caches. It is split across 16 rows, picked by backend
+# pid, so concurrent writers rarely wait on each other's row lock; the version
+# is the sum. Being ordinary table data, a bump is only visible once its write
+# has committed.
+ledger_version_table_creation = """
+CREATE TABLE IF NOT EXISTS ledger_version (
+    shard SMALLINT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+INSERT INTO ledger_version (shard) SELECT generate_series(0, 15) ON CONFLICT DO NOTHING;
+"""
+
+ledger_version_function_creation = """
+CREATE OR REPLACE FUNCTION bump_ledger_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE ledger_version SET version = version + 1 WHERE shard = pg_backend_pid() % 16;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+accounts_ledger_version_trigger_creation = """
+DROP TRIGGER IF EXISTS accounts_bump_ledger_version ON accounts;
+CREATE TRIGGER accounts_bump_ledger_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON accounts
+FOR EACH STATEMENT EXECUTE FUNCTION bump_ledger_version();
+"""
+
+SERVICE = "account-service"
+
+# Applied in order by `python -m app.migrate`; never edit a released migration, add a new one.
+MIGRATIONS = [
+    Migration(1, "create tables", [accounts_table_creation, transactions_table_creation]),
+    # Built without blocking writes, for the balance sheet and income statement queries.
+    # The transactions indexes are owned by transaction-service, which partitions the table.
+    Migration(2, "add indexes", [accounts_type_index_creation], transactional=False),
+    Migration(3, "ledger version counter", [
+        ledger_version_table_creation,
+        ledger_version_function_creation,
+        accounts_ledger_version_trigger_creation,
+    ]),
+]
@@ -0,0 +1,163 @@
+"""
+Low-overhead request logging for the AWS Lambda handlers.
+
+Every invocation gets one compact summary line. Full event and response
+payloads are only serialised for a sampled fraction of invocations (and for
+server errors), are capped in size, and log records are handed to a
+background thread through a QueueHandler so handler I/O stays off the request
+path. The message itself is still formatted on the calling thread, by
+QueueHandler.prepare().
+
+Lambda freezes the container as soon as the handler returns, so handlers call
+flush() before returning; otherwise records of an invocation (including 500
+tracebacks) could be lost or only written during a later one.
+
+Configuration (environment variables):
+- LOG_SAMPLE_RATE: Fraction of invocations whose payloads are logged (default 0.01).
+- LOG_MAX_PAYLOAD_BYTES: Maximum logged size of each payload (default 2048).
+- LOG_ASYNC: Emit records from a background thread (default true).
+- LOG_FLUSH_TIMEOUT_MS: Longest flush() waits at the end of an invocation (default 200).
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+import time
+
+SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", 0.01))
+MAX_PAYLOAD_BYTES = int(os.environ.get("LOG_MAX_PAYLOAD_BYTES", 2048))
+ASYNC = os.environ.get("LOG_ASYNC", "true").lower() == "true"
+
+# Seconds flush() waits for the listener to catch up. Every invocation pays
+# for it when the log destination stalls, so it is kept short.
+FLUSH_TIMEOUT = float(os.environ.get("LOG_FLUSH_TIMEOUT_MS", 200)) / 1000
+
+_listener = None
+
+
+class _FlushMarker:
+    """
+    Queue item the listener acknowledges instead of emitting, once every
+    record queued before it has been handled.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class _Listener(logging.handlers.QueueListener):
+    def handle(self, record):
+        if isinstance(record, _FlushMarker):
+            for handler in self.handlers:
+                handler.flush()
+            record.done.set()
+            return
+        super().handle(record)
+
+
+def configure():
+    """
+    Route root logger output through a QueueHandler drained by a listener thread.
+
+    The handlers already attached to the root logger (the Lambda runtime's, or
+    the one added by logging.basicConfig) are moved behind the queue. Calling
+    this more than once is a no-op.
+    """
+    global _listener
+    if not ASYNC or _listener is not None:
+        return
+    root = logging.getLogger()
+    handlers = root.handlers[:] or [logging.StreamHandler()]
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    log_queue = queue.SimpleQueue()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    _listener = _Listener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def flush(timeout=None):
+    """
+    Wait until every record logged so far has been written by the listener thread.
+
+    Parameters:
+    - timeout: Seconds to wait at most (defaults to FLUSH_TIMEOUT).
+
+    Returns:
+    - False if the wait timed out, True otherwise (including when logging is synchronous).
+    """
+    if _listener is None:
+        return True
+    marker = _FlushMarker()
+    _listener.queue.put_nowait(marker)
+    return marker.done.wait(FLUSH_TIMEOUT if timeout is None else timeout)
+
+
+def should_sample():
+    """
+    Decide whether this invocation's payloads should be logged.
+    """
+    return SAMPLE_RATE >= 1 or (SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE)
+
+
+def truncate_payload(payload, limit=None):
+    """
+    Serialise a payload for logging, capped at `limit` characters.
+
+    Large request/response bodies are sliced before serialisation so the cost
+    stays bounded regardless of payload size.
+
+    Parameters:
+    - payload: Event/response dictionary or string.
+    - limit: Maximum number of characters (defaults to LOG_MAX_PAYLOAD_BYTES).
+
+    Returns:
+    - The (possibly truncated) string representation.
+    """
+    limit = MAX_PAYLOAD_BYTES if limit is None else limit
+    if isinstance(payload, dict) and isinstance(payload.get("body"), str) and len(payload["body"]) > limit:
+        payload = dict(payload, body=payload["body"][:limit])
+    text = payload if isinstance(payload, str) else json.dumps(payload, default=str)
+    if len(text) > limit:
+        return f"{text[:limit]}...<truncated {len(text) - limit} chars>"
+    return text
+
+
+def _route(event):
+    """
+    Extract method and path from an API Gateway (REST or HTTP API) or ALB event.
+    """
+    if not isinstance(event, dict):
+        return "-", "-"
+    http = event.get("requestContext", {}).get("http", {})
+    method = event.get("httpMethod") or http.get("method") or "-"
+    path = event.get("path") or event.get("rawPath") or http.get("path") or "-"
+    return method, path
+
+
+def log_invocation(logger, event, response, started, sampled):
+    """
+    Log one summary line for an invocation, plus payloads when sampled or failed.
+
+    Parameters:
+    - logger: Logger to write to.
+    - event: The Lambda event.
+    - response: The response returned to Lambda.
+    - started: time.perf_counter() value taken when the invocation began.
+    - sampled: Result of should_sample() for this invocation.
+    """
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    status_code = response.get("statusCode") if isinstance(response, dict) else None
+    method, path = _route(event)
+    logger.info("%s %s -> %s in %.1f ms", method, path, status_code,
+                (time.perf_counter() - started) * 1000)
+    if sampled or (isinstance(status_code, int) and status_code >= 500):
+        logger.info("Received event: %s", truncate_payload(event))
+        logger.info("Response: %s", truncate_payload(response))
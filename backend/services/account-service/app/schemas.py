@@ -3,7 +3,8 @@ Pydantic schemas for data validation and serialization.
 """
 
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
+import datetime
 
 
 class Account(BaseModel):
@@ -50,3 +51,63 @@ class IncomeStatement(BaseModel):
     revenues: float
     expenses: float
     net_income: float
+
+
+class StatementPeriod(BaseModel):
+    """
+    Schema representing one column of a comparative statement; both days inclusive.
+    """
+    start_date: datetime.date
+    end_date: datetime.date
+    label: Optional[str] = None
+
+
+class ComparativeStatementRequest(BaseModel):
+    """
+    Schema for requesting statements over several periods.
+    """
+    periods: List[StatementPeriod]
+
+
+class ComparativeLine(BaseModel):
+    """
+    Schema representing one statement line across periods.
+
+    change and change_percent compare each period with the one before it, so
+    their first entry is None, as is any percentage against a zero amount.
+    """
+    name: str
+    values: List[float]
+    change: List[Optional[float]]
+    change_percent: List[Optional[float]]
+
+
+class ComparativeStatements(BaseModel):
+    """
+    Schema representing the balance sheet (as of each period end) and the
+    income statement (over each period) side by side.
+    """
+    periods: List[StatementPeriod]
+    balance_sheet: List[ComparativeLine]
+    income_statement: List[ComparativeLine]
+
+
+class TrialBalanceLine(BaseModel):
+    """
+    Schema representing one account of the trial balance.
+    """
+    account_id: int
+    name: str
+    type: str
+    debit_total: float
+    credit_total: float
+
+
+class TrialBalance(BaseModel):
+    """
+    Schema representing the trial balance.
+    """
+    as_of: Optional[datetime.date] = None
+    accounts: List[TrialBalanceLine]
+    total_debits: float
+    total_credits: float
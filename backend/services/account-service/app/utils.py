@@ -2,6 +2,22 @@
 Utility functions for the Accounting Service.
 """
 
+import csv
+import hashlib
+import io
+import numpy as np
+import os
+import threading
+
+# Cache-Control of the statement endpoints. Shared caches (API Gateway, a CDN)
+# may serve a statement for max-age seconds, then revalidate it with its ETag.
+STATEMENT_CACHE_CONTROL = os.environ.get("STATEMENT_CACHE_CONTROL", "public, max-age=5, must-revalidate")
+
+TRIAL_BALANCE_FIELDS = ["account_id", "name", "type", "debit_total", "credit_total"]
+
+# Most periods one comparative statement request may cover.
+MAX_COMPARATIVE_PERIODS = 36
+
 
 def calculate_net_income(revenues: float, expenses: float) -> float:
     """
@@ -15,3 +31,120 @@ def calculate_net_income(revenues: float, expenses: float) -> float:
     - Net income.
     """
     return revenues - expenses
+
+
+def period_changes(values):
+    """
+    Compare every period of a statement with the previous one.
+
+    Parameters:
+    - values: Array of shape (lines, periods).
+
+    Returns:
+    - (change, change_percent) arrays of the same shape; NaN where there is
+      no previous period or it is zero.
+    """
+    values = np.asarray(values, dtype=float)
+    change = np.full_like(values, np.nan)
+    change_percent = np.full_like(values, np.nan)
+    previous = values[:, :-1]
+    change[:, 1:] = values[:, 1:] - previous
+    np.divide(change[:, 1:] * 100, np.abs(previous), out=change_percent[:, 1:], where=previous != 0)
+    return change, change_percent
+
+
+def to_column(values):
+    """
+    Round an array to cents and turn it into a list, with None for NaN.
+    """
+    return np.where(np.isnan(values), None, np.round(values, 2)).tolist()
+
+
+def trial_balance_csv_chunks(batches):
+    """
+    Encode batches of trial balance rows as CSV, one chunk per batch.
+
+    A header row comes first and a "Total" row with the column sums last.
+
+    Parameters:
+    - batches: Iterator of row lists from crud.iter_trial_balance_batches().
+
+    Returns:
+    - Iterator of bytes.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(TRIAL_BALANCE_FIELDS)
+    total_debits = total_credits = 0
+    for rows in batches:
+        writer.writerows(rows)
+        total_debits += sum(row[3] for row in rows)
+        total_credits += sum(row[4] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    writer.writerow(["", "Total", "", total_debits, total_credits])
+    yield buffer.getvalue().encode("utf-8")
+
+
+def statement_etag(name, version, query_params):
+    """
+    Build the strong ETag of a statement.
+
+    Parameters:
+    - name: Statement name.
+    - version: Ledger version the statement is at least as new as.
+    - query_params: Request query parameters, as (name, value) pairs.
+
+    Returns:
+    - Quoted ETag value.
+    """
+    params = hashlib.sha256(repr(sorted(query_params)).encode()).hexdigest()[:16]
+    return f'"{name}-{version}-{params}"'
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Whether an If-None-Match header names the given ETag (or is "*").
+    """
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    # If-None-Match uses weak comparison, so a W/ prefix is ignored.
+    return any(candidate == "*" or candidate.replace("W/", "", 1) == etag for candidate in candidates)
+
+
+class VersionedCache:
+    """
+    Per-process cache of computed statements, each tagged with the ledger
+    version it was computed at.
+
+    An entry is served only while the ledger version is unchanged, so a write
+    anywhere invalidates it without any cross-process messaging.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, name, version):
+        """
+        Return the value cached under `name` for exactly `version`, or None.
+        """
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        return None
+
+    def put(self, name, version, value):
+        """
+        Cache a value computed at `version`, unless a newer one is already cached.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry[0] <= version:
+                self._entries[name] = (version, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
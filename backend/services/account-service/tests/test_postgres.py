@@ -0,0 +1,98 @@
+"""
+Test cases run against a real PostgreSQL database.
+
+They apply the service's migrations in a scratch schema and check what the
+statement queries actually return. They are skipped unless TEST_DB_NAME
+names a database the DB_HOST/DB_PORT/DB_USER/DB_PASSWORD credentials can
+create schemas in; the schema is dropped afterwards.
+"""
+
+from app import crud, migrate, models, schemas
+import datetime
+import os
+import psycopg2
+import pytest
+
+pytestmark = pytest.mark.skipif(not os.environ.get("TEST_DB_NAME"), reason="TEST_DB_NAME is not set")
+
+SCHEMA = f"account_service_test_{os.getpid()}"
+
+
+def _connect():
+    return psycopg2.connect(
+        host=os.environ.get("DB_HOST"),
+        port=int(os.environ.get("DB_PORT", 5432)),
+        database=os.environ.get("TEST_DB_NAME"),
+        user=os.environ.get("DB_USER"),
+        password=os.environ.get("DB_PASSWORD"),
+        options=f"-c search_path={SCHEMA}"
+    )
+
+
+@pytest.fixture(scope="module")
+def migrated():
+    conn = _connect()
+    cursor = conn.cursor()
+    cursor.execute(f'CREATE SCHEMA "{SCHEMA}";')
+    conn.commit()
+    try:
+        migrate.apply_migrations(conn, models.SERVICE, models.MIGRATIONS)
+        # daily_account_totals belongs to transaction-service; this is the
+        # table as its migration 8 leaves it.
+        cursor.execute("""
+            CREATE TABLE daily_account_totals (
+                account_id INTEGER NOT NULL, day DATE NOT NULL,
+                debit_total NUMERIC(14, 2) NOT NULL DEFAULT 0, credit_total NUMERIC(14, 2) NOT NULL DEFAULT 0,
+                transaction_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (account_id, day)
+            );
+        """)
+        conn.commit()
+        yield conn
+    finally:
+        conn.rollback()
+        cursor.execute(f'DROP SCHEMA "{SCHEMA}" CASCADE;')
+        conn.commit()
+        conn.close()
+
+
+@pytest.fixture
+def db(migrated):
+    cursor = migrated.cursor()
+    cursor.execute("TRUNCATE accounts, transactions, daily_account_totals RESTART IDENTITY;")
+    cursor.execute("""
+        INSERT INTO accounts (name, type) VALUES ('Cash', 'Asset'), ('Unused', 'Asset'), ('Sales', 'Revenue');
+        INSERT INTO daily_account_totals (account_id, day, debit_total, credit_total, transaction_count) VALUES
+            (1, '2024-01-05', 300, 0, 1), (3, '2024-01-05', 0, 300, 1), (3, '2024-02-01', 0, 50, 1);
+    """)
+    migrated.commit()
+    yield migrated
+    migrated.rollback()
+
+
+def _totals(trial_balance):
+    return [(line.name, line.debit_total, line.credit_total) for line in trial_balance.accounts]
+
+
+def test_trial_balance_lists_accounts_without_activity(db):
+    assert _totals(crud.generate_trial_balance(db)) == [
+        ("Cash", 300.0, 0.0), ("Unused", 0.0, 0.0), ("Sales", 0.0, 350.0)
+    ]
+    # Days after as_of are left out, but their accounts are still listed.
+    assert _totals(crud.generate_trial_balance(db, datetime.date(2024, 1, 31))) == [
+        ("Cash", 300.0, 0.0), ("Unused", 0.0, 0.0), ("Sales", 0.0, 300.0)
+    ]
+    assert _totals(crud.generate_trial_balance(db, datetime.date(2023, 12, 31))) == [
+        ("Cash", 0.0, 0.0), ("Unused", 0.0, 0.0), ("Sales", 0.0, 0.0)
+    ]
+
+
+def test_comparative_statements_treat_null_balances_as_zero(db):
+    cursor = db.cursor()
+    cursor.execute("INSERT INTO accounts (name, type, balance) VALUES ('Capital', 'Equity', NULL);")
+    cursor.close()
+    db.commit()
+    period = schemas.StatementPeriod(start_date=datetime.date(2024, 1, 1), end_date=datetime.date(2024, 1, 31))
+    result = crud.generate_comparative_statements(db, [period, period])
+    equity = next(line for line in result.balance_sheet if line.name == "equity")
+    assert (equity.values, equity.change) == ([0.0, 0.0], [None, 0.0])
@@ -0,0 +1,280 @@
+"""
+Test cases for the financial statement queries.
+"""
+
+from app import crud, schemas, utils
+from decimal import Decimal
+from app.main import app, get_db, get_trial_balance
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+import datetime
+import pytest
+
+
+class FakeCursor:
+    def __init__(self, db, name=None):
+        self.db = db
+        self.name = name
+        self.rows = []
+        self.itersize = 2000
+
+    def execute(self, sql, params=None):
+        self.db.statements.append(sql)
+        self.db.params.append(params)
+        if "trial_balance" == self.name:
+            self.rows = list(self.db.trial_balance)
+        elif "WITH periods" in sql:
+            self.rows = self.db.comparative
+        elif "daily_account_totals" in sql:
+            self.rows = [self.db.income]
+        elif "GROUP BY type" in sql:
+            self.rows = [(self.db.version, account_type, total) for account_type, total in self.db.totals.items()]
+            if not self.rows:
+                self.rows = [(self.db.version, None, None)]
+        else:
+            self.rows = [(self.db.version,)]
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeDB:
+    def __init__(self, totals=None, version=1, income=(0, 0), comparative=(), trial_balance=()):
+        self.totals = totals or {}
+        self.version = version
+        self.income = income
+        self.comparative = list(comparative)
+        self.trial_balance = list(trial_balance)
+        self.statements = []
+        self.params = []
+        self.rollbacks = 0
+
+    def cursor(self, name=None):
+        return FakeCursor(self, name)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def setup_function():
+    crud.statement_cache.clear()
+
+
+def test_balance_sheet_uses_one_grouped_aggregate():
+    db = FakeDB({"Asset": 500.0, "Liability": 200.0, "Equity": 300.0})
+    sheet = crud.generate_balance_sheet(db)
+    assert (sheet.assets, sheet.liabilities, sheet.equity) == (500.0, 200.0, 300.0)
+    assert sum("SUM(balance)" in sql for sql in db.statements) == 1
+
+
+def test_balance_sheet_is_cached_until_the_ledger_version_changes():
+    db = FakeDB({"Asset": 500.0})
+    crud.generate_balance_sheet(db)
+    db.totals["Asset"] = 900.0
+    db.statements.clear()
+
+    assert crud.generate_balance_sheet(db).assets == 500.0
+    assert not any("SUM(balance)" in sql for sql in db.statements)
+
+    db.version += 1
+    assert crud.generate_balance_sheet(db).assets == 900.0
+
+
+def test_balance_sheet_of_empty_ledger():
+    sheet = crud.generate_balance_sheet(FakeDB({}, version=None))
+    assert (sheet.assets, sheet.liabilities, sheet.equity) == (0.0, 0.0, 0.0)
+
+
+def test_income_statement_reads_the_daily_rollup_for_a_period():
+    db = FakeDB(income=(1200, 700))
+    statement = crud.generate_income_statement(db, datetime.date(2024, 1, 1), datetime.date(2024, 12, 31))
+    assert (statement.revenues, statement.expenses, statement.net_income) == (1200.0, 700.0, 500.0)
+    assert "FROM daily_account_totals" in db.statements[0]
+    assert "transactions t" not in db.statements[0]
+    assert db.params[0] == [datetime.date(2024, 1, 1), datetime.date(2024, 12, 31)]
+
+
+def test_income_statement_without_period_covers_every_day():
+    db = FakeDB(income=(0, 0))
+    crud.generate_income_statement(db)
+    assert "d.day" not in db.statements[0]
+    assert db.params[0] == []
+
+
+def test_income_statement_rejects_inverted_period():
+    app.dependency_overrides[get_db] = FakeDB
+    try:
+        response = TestClient(app).get("/financial_statements/income_statement/",
+                                       params={"start_date": "2024-02-01", "end_date": "2024-01-01"})
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 400
+
+
+def test_comparative_statements_from_one_query():
+    periods = [schemas.StatementPeriod(start_date=datetime.date(2024, month, 1),
+                                       end_date=datetime.date(2024, month, 28)) for month in (1, 2, 3)]
+    db = FakeDB(comparative=[
+        (0, "Asset", Decimal("1000.00"), 0, 0, 0),
+        (0, "Equity", Decimal("400.00"), 0, 0, 0),
+        # Revenue of 100, 150 and 0; assets rise by the net credits posted after each period.
+        (1, "Revenue", 0, Decimal("100.00"), 0, Decimal("150.00")),
+        (2, "Revenue", 0, Decimal("150.00"), 0, 0),
+        (1, "Expense", 0, 0, Decimal("40.00"), 0),
+        (3, "Expense", 0, 0, Decimal("60.00"), 0),
+        (1, "Asset", 0, 0, 0, Decimal("300.00")),
+        (2, "Asset", 0, 0, 0, Decimal("100.00")),
+    ])
+    result = crud.generate_comparative_statements(db, periods)
+    assert len(db.statements) == 1
+    assert db.params[0] == ([p.start_date for p in periods], [p.end_date for p in periods])
+
+    sheet = {line.name: line for line in result.balance_sheet}
+    assert sheet["assets"].values == [700.0, 900.0, 1000.0]
+    assert sheet["assets"].change == [None, 200.0, 100.0]
+    assert sheet["liabilities"].values == [0.0, 0.0, 0.0]
+    assert sheet["equity"].values == [400.0, 400.0, 400.0]
+
+    income = {line.name: line for line in result.income_statement}
+    assert income["revenues"].values == [100.0, 150.0, 0.0]
+    assert income["revenues"].change_percent == [None, 50.0, -100.0]
+    assert income["expenses"].change_percent == [None, -100.0, None]
+    assert income["net_income"].values == [60.0, 150.0, -60.0]
+
+
+def test_comparative_statements_of_empty_ledger():
+    period = schemas.StatementPeriod(start_date=datetime.date(2024, 1, 1), end_date=datetime.date(2024, 1, 31))
+    result = crud.generate_comparative_statements(FakeDB(), [period])
+    assert [line.values for line in result.income_statement] == [[0.0], [0.0], [0.0]]
+    assert result.balance_sheet[0].change == [None]
+
+
+def test_comparative_statements_limits_periods():
+    app.dependency_overrides[get_db] = FakeDB
+    try:
+        response = TestClient(app).post("/financial_statements/comparative/", json={"periods": [
+            {"start_date": "2024-01-01", "end_date": "2024-01-31"}
+        ] * (utils.MAX_COMPARATIVE_PERIODS + 1)})
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 400
+
+
+TRIAL_BALANCE_ROWS = [
+    (1, "Cash", "Asset", Decimal("500.00"), Decimal("200.00")),
+    (2, "Sales", "Revenue", Decimal("0.00"), Decimal("300.00")),
+    (3, "Rent", "Expense", Decimal("120.50"), Decimal("0.00")),
+]
+
+
+def test_trial_balance_streams_in_batches():
+    db = FakeDB(trial_balance=TRIAL_BALANCE_ROWS)
+    batches = list(crud.iter_trial_balance_batches(db, datetime.date(2024, 6, 30), batch_size=2))
+    assert [len(rows) for rows in batches] == [2, 1]
+    assert "day <= %s" in db.statements[0]
+    assert db.params[0] == [datetime.date(2024, 6, 30)]
+    assert db.rollbacks == 1
+
+
+def test_trial_balance_totals():
+    trial_balance = crud.generate_trial_balance(FakeDB(trial_balance=TRIAL_BALANCE_ROWS))
+    assert [line.name for line in trial_balance.accounts] == ["Cash", "Sales", "Rent"]
+    assert (trial_balance.total_debits, trial_balance.total_credits) == (620.5, 500.0)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """
+    Stands in for the connection pool, counting checkouts and returns.
+    """
+    counts = {"taken": 0, "released": 0}
+
+    def get_connection():
+        counts["taken"] += 1
+        return FakeDB(trial_balance=TRIAL_BALANCE_ROWS)
+
+    def release_connection(db):
+        counts["released"] += 1
+
+    monkeypatch.setattr("app.database.get_connection", get_connection)
+    monkeypatch.setattr("app.database.release_connection", release_connection)
+    return counts
+
+
+def test_trial_balance_csv(pool):
+    response = TestClient(app).get("/financial_statements/trial_balance/",
+                                   params={"as_of": "2024-06-30", "format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "trial_balance_2024-06-30.csv" in response.headers["content-disposition"]
+    lines = response.text.splitlines()
+    assert lines[0] == "account_id,name,type,debit_total,credit_total"
+    assert lines[1] == "1,Cash,Asset,500.00,200.00"
+    assert lines[-1] == ",Total,,620.50,500.00"
+    assert pool["taken"] == pool["released"]
+
+
+def test_trial_balance_csv_takes_no_connection_until_streamed(pool):
+    request = Request({"type": "http", "method": "GET", "query_string": b"format=csv", "headers": []})
+    response = get_trial_balance(request, Response(), format="csv", db=FakeDB())
+    assert isinstance(response, StreamingResponse)
+    # A client that disconnects before the body starts leaves nothing checked out.
+    assert pool["taken"] == 0
+
+
+def test_statements_answer_not_modified_for_current_etag():
+    db = FakeDB({"Asset": 500.0}, version=7)
+    app.dependency_overrides[get_db] = lambda: db
+    client = TestClient(app)
+    try:
+        first = client.get("/financial_statements/balance_sheet/")
+        etag = first.headers["etag"]
+        assert first.status_code == 200
+        assert first.headers["cache-control"] == utils.STATEMENT_CACHE_CONTROL
+
+        db.statements.clear()
+        again = client.get("/financial_statements/balance_sheet/", headers={"If-None-Match": etag})
+        assert again.status_code == 304
+        assert again.headers["etag"] == etag
+        assert db.statements == ["SELECT SUM(version) FROM ledger_version;"]
+
+        db.version += 1
+        changed = client.get("/financial_statements/balance_sheet/", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_statement_etag_depends_on_query_parameters():
+    db = FakeDB(income=(10, 5))
+    app.dependency_overrides[get_db] = lambda: db
+    client = TestClient(app)
+    try:
+        year = client.get("/financial_statements/income_statement/",
+                          params={"start_date": "2024-01-01", "end_date": "2024-12-31"})
+        month = client.get("/financial_statements/income_statement/",
+                           params={"start_date": "2024-01-01", "end_date": "2024-01-31"},
+                           headers={"If-None-Match": year.headers["etag"]})
+    finally:
+        app.dependency_overrides.clear()
+    assert month.status_code == 200
+    assert month.headers["etag"] != year.headers["etag"]
+
+
+def test_etag_matches():
+    assert utils.etag_matches('"a", W/"b"', '"b"')
+    assert utils.etag_matches("*", '"b"')
+    assert not utils.etag_matches('"a"', '"b"')
+    assert not utils.etag_matches(None, '"b"')
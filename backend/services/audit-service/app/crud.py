@@ -7,27 +7,42 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+AUDIT_LOG_COLUMNS = "id, user_id, action, timestamp, details"
+
+
+def _row_to_audit_log(row):
+    """
+    Map a row selected with AUDIT_LOG_COLUMNS to an AuditLog schema.
+    """
+    return schemas.AuditLog(
+        id=row[0],
+        user_id=row[1],
+        action=row[2],
+        timestamp=row[3],
+        details=row[4]
+    )
+
 
 def create_audit_log(db, audit_log: schemas.AuditLogCreate):
     """
     Create a new audit log entry.
     """
     cursor = db.cursor()
-    sql = """
-        INSERT INTO audit_logs (user_id, action, timestamp, details)
-        VALUES (%s, %s, %s, %s) RETURNING id;
+    # Timestamp is left to the column default (current UTC time)
+    sql = f"""
+        INSERT INTO audit_logs (user_id, action, details)
+        VALUES (%s, %s, %s) RETURNING {AUDIT_LOG_COLUMNS};
     """
     params = (
         audit_log.user_id,
         audit_log.action,
-        None,  # Timestamp defaults to current time
         audit_log.details
     )
     cursor.execute(sql, params)
-    log_id = cursor.fetchone()[0]
+    row = cursor.fetchone()
     db.commit()
     cursor.close()
-    return get_audit_log(db, log_id)
+    return _row_to_audit_log(row)
 
 
 def get_audit_log(db, log_id: int):
@@ -35,21 +50,12 @@ def get_audit_log(db, log_id: int):
     Retrieve an audit log entry by ID.
     """
     cursor = db.cursor()
-    sql = """
-        SELECT id, user_id, action, timestamp, details
-        FROM audit_logs WHERE id = %s;
-    """
+    sql = f"SELECT {AUDIT_LOG_COLUMNS} FROM audit_logs WHERE id = %s;"
     cursor.execute(sql, (log_id,))
     row = cursor.fetchone()
     cursor.close()
     if row:
-        return schemas.AuditLog(
-            id=row[0],
-            user_id=row[1],
-            action=row[2],
-            timestamp=row[3],
-            details=row[4]
-        )
+        return _row_to_audit_log(row)
     return None
 
 
@@ -58,20 +64,11 @@ def get_audit_logs(db, skip: int = 0, limit: int = 100):
     Retrieve a list of audit logs.
     """
     cursor = db.cursor()
-    sql = """
-        SELECT id, user_id, action, timestamp, details
+    sql = f"""
+        SELECT {AUDIT_LOG_COLUMNS}
         FROM audit_logs ORDER BY timestamp DESC OFFSET %s LIMIT %s;
     """
     cursor.execute(sql, (skip, limit))
     rows = cursor.fetchall()
     cursor.close()
-    audit_logs = [
-        schemas.AuditLog(
-            id=row[0],
-            user_id=row[1],
-            action=row[2],
-            timestamp=row[3],
-            details=row[4]
-        ) for row in rows
-    ]
-    return audit_logs
+    return [_row_to_audit_log(row) for row in rows]
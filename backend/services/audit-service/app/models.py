@@ -4,6 +4,8 @@ Database models for the Audit Service.
 Defines SQL statements for creating the audit_logs table.
 """
 
+from .migrate import Migration
+
 audit_logs_table_creation = """
 CREATE TABLE IF NOT EXISTS audit_logs (
     id SERIAL PRIMARY KEY,
@@ -13,3 +15,19 @@ CREATE TABLE IF NOT EXISTS audit_logs (
     details TEXT
 );
 """
+
+audit_logs_timestamp_index_creation = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_logs_timestamp
+ON audit_logs (timestamp DESC);
+"""
+
+SERVICE = "audit-service"
+
+# Applied in order by `python -m app.migrate`; never edit a released migration, add a new one.
+MIGRATIONS = [
+    Migration(1, "create tables", [audit_logs_table_creation]),
+    # Built without blocking writes, for the newest-first audit log listing.
+    Migration(2, "add indexes", [
+        audit_logs_timestamp_index_creation,
+    ], transactional=False),
+]
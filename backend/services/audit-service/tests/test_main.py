@@ -0,0 +1,18 @@
+"""
+Test cases for the Audit Service.
+"""
+
+from fastapi.testclient import TestClient
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_create_audit_log_single_round_trip(recording_db):
+    recording_db.rows = [(11, 1, "login", "2024-03-01T00:00:00", "web")]
+    response = client.post("/audit_logs/", json={"user_id": 1, "action": "login", "details": "web"})
+    assert response.status_code == 201
+    # Every field comes from the INSERT's RETURNING row; nothing is read back.
+    assert response.json() == {"id": 11, "user_id": 1, "action": "login",
+                               "timestamp": "2024-03-01T00:00:00", "details": "web"}
+    assert len(recording_db.queries) == 1
@@ -0,0 +1,122 @@
+"""
+Asynchronous CRUD operations for the Banking Service using asyncpg.
+
+Mirrors crud.py and utils.reconcile_bank_account for the endpoints served by
+async_main.py.
+"""
+
+from . import idempotency, schemas
+from .crud import BANK_ACCOUNT_COLUMNS, BANK_TRANSACTION_COLUMNS, _row_to_bank_account, _row_to_bank_transaction
+import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Bank Account CRUD Operations
+
+async def get_bank_account(db, account_id: int):
+    """
+    Retrieve a bank account by ID.
+    """
+    row = await db.fetchrow(f"SELECT {BANK_ACCOUNT_COLUMNS} FROM bank_accounts WHERE id = $1;", account_id)
+    if row:
+        return _row_to_bank_account(row)
+    return None
+
+
+async def get_bank_account_by_number(db, account_number: str):
+    """
+    Retrieve a bank account by account number.
+    """
+    row = await db.fetchrow(
+        f"SELECT {BANK_ACCOUNT_COLUMNS} FROM bank_accounts WHERE account_number = $1;",
+        account_number
+    )
+    if row:
+        return _row_to_bank_account(row)
+    return None
+
+
+async def create_bank_account(db, bank_account: schemas.BankAccountCreate):
+    """
+    Create a new bank account.
+    """
+    row = await db.fetchrow(
+        f"""
+        INSERT INTO bank_accounts (account_name, account_number, balance)
+        VALUES ($1, $2, $3) RETURNING {BANK_ACCOUNT_COLUMNS};
+        """,
+        bank_account.account_name,
+        bank_account.account_number,
+        bank_account.balance
+    )
+    return _row_to_bank_account(row)
+
+
+# Bank Transaction CRUD Operations
+
+async def create_bank_transaction(db, transaction: schemas.BankTransactionCreate, idempotency_key=None):
+    """
+    Create a new bank transaction and apply it to the account balance.
+
+    With an idempotency_key the response is stored in the same database transaction.
+    """
+    signed_amount = transaction.amount if transaction.transaction_type == 'Credit' else -transaction.amount
+    sql = f"""
+        WITH inserted AS (
+            INSERT INTO bank_transactions (bank_account_id, description, amount, date, transaction_type)
+            VALUES ($1, $2, $3, $4, $5) RETURNING {BANK_TRANSACTION_COLUMNS}
+        ), balance_update AS (
+            UPDATE bank_accounts SET balance = balance + $6
+            WHERE id = (SELECT bank_account_id FROM inserted)
+        )
+        SELECT {BANK_TRANSACTION_COLUMNS} FROM inserted;
+    """
+    params = (
+        transaction.bank_account_id,
+        transaction.description,
+        transaction.amount,
+        datetime.datetime.utcnow(),
+        transaction.transaction_type,
+        signed_amount
+    )
+    if idempotency_key is None:
+        return _row_to_bank_transaction(await db.fetchrow(sql, *params))
+    async with db.transaction():
+        result = _row_to_bank_transaction(await db.fetchrow(sql, *params))
+        await idempotency.store_response_async(db, idempotency_key, result)
+    return result
+
+
+async def get_bank_transaction(db, transaction_id: int):
+    """
+    Retrieve a bank transaction by ID.
+    """
+    row = await db.fetchrow(
+        f"SELECT {BANK_TRANSACTION_COLUMNS} FROM bank_transactions WHERE id = $1;",
+        transaction_id
+    )
+    if row:
+        return _row_to_bank_transaction(row)
+    return None
+
+
+async def reconcile_bank_account(db, account_id: int) -> bool:
+    """
+    Recompute a bank account balance from its transactions.
+
+    Returns:
+    - True if the account exists and was reconciled, False otherwise.
+    """
+    status = await db.execute(
+        """
+        UPDATE bank_accounts SET balance = COALESCE((
+            SELECT SUM(CASE WHEN transaction_type = 'Credit' THEN amount ELSE -amount END)
+            FROM bank_transactions WHERE bank_account_id = $1
+        ), 0)
+        WHERE id = $1;
+        """,
+        account_id
+    )
+    return status != "UPDATE 0"
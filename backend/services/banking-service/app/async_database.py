@@ -0,0 +1,69 @@
+"""
+Asynchronous database access using asyncpg against AWS RDS PostgreSQL.
+
+Enabled by setting DB_ENGINE=asyncpg. The pool is created lazily inside the
+running event loop and reused for as long as that loop lives, so a single
+worker can multiplex many concurrent DB-bound requests without tying up
+threads.
+"""
+
+import asyncio
+import os
+
+ENGINE = os.environ.get("DB_ENGINE", "psycopg2").lower()
+ENABLED = ENGINE == "asyncpg"
+
+_pool = None
+_pool_loop = None
+_pool_lock = None
+
+
+async def get_pool():
+    """
+    Return the asyncpg pool bound to the current event loop, creating it on first use.
+
+    Returns:
+    - asyncpg.Pool instance.
+    """
+    global _pool, _pool_loop, _pool_lock
+    loop = asyncio.get_running_loop()
+    if _pool is not None and _pool_loop is loop:
+        return _pool
+    if _pool_lock is None or _pool_loop is not loop:
+        _pool_lock = asyncio.Lock()
+        _pool_loop = loop
+        _pool = None
+    async with _pool_lock:
+        if _pool is None:
+            import asyncpg
+
+            _pool = await asyncpg.create_pool(
+                host=os.environ.get("DB_HOST"),
+                port=int(os.environ.get("DB_PORT", 5432)),
+                database=os.environ.get("DB_NAME"),
+                user=os.environ.get("DB_USER"),
+                password=os.environ.get("DB_PASSWORD"),
+                min_size=int(os.environ.get("DB_POOL_MIN_SIZE", 1)),
+                max_size=int(os.environ.get("DB_ASYNC_POOL_MAX_SIZE", 50)),
+                max_inactive_connection_lifetime=float(os.environ.get("DB_POOL_MAX_AGE", 1800)),
+            )
+    return _pool
+
+
+async def close_pool():
+    """
+    Close the asyncpg pool, if one has been created.
+    """
+    global _pool
+    if _pool is not None:
+        pool, _pool = _pool, None
+        await pool.close()
+
+
+async def get_db():
+    """
+    Dependency to get an asyncpg connection from the pool.
+    """
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        yield conn
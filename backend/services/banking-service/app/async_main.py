@@ -0,0 +1,94 @@
+"""
+Async endpoint variants for the Banking Service.
+
+When DB_ENGINE=asyncpg, install() swaps the blocking bank account, transaction
+and reconciliation endpoints in main.py for these coroutine handlers, which
+run on the event loop instead of FastAPI's threadpool.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.routing import APIRoute
+from . import schemas, async_crud, async_database, idempotency
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+# Bank Account Endpoints
+
+@router.post("/bank_accounts/", response_model=schemas.BankAccount, status_code=status.HTTP_201_CREATED)
+async def create_bank_account(bank_account: schemas.BankAccountCreate, db=Depends(async_database.get_db)):
+    """
+    Create a new bank account.
+    """
+    try:
+        existing_account = await async_crud.get_bank_account_by_number(db, bank_account.account_number)
+    except Exception as e:
+        logger.exception("Error creating bank account")
+        raise HTTPException(status_code=400, detail=str(e))
+    if existing_account:
+        raise HTTPException(status_code=400, detail="Bank account already exists")
+    try:
+        return await async_crud.create_bank_account(db, bank_account)
+    except Exception as e:
+        logger.exception("Error creating bank account")
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/bank_accounts/{account_id}", response_model=schemas.BankAccount)
+async def read_bank_account(account_id: int, db=Depends(async_database.get_db)):
+    """
+    Retrieve a bank account by its ID.
+    """
+    account = await async_crud.get_bank_account(db, account_id)
+    if not account:
+        raise HTTPException(status_code=404, detail="Bank account not found")
+    return account
+
+
+@router.post("/bank_transactions/", response_model=schemas.BankTransaction, status_code=status.HTTP_201_CREATED)
+async def create_bank_transaction(transaction: schemas.BankTransactionCreate, request: Request,
+                                  db=Depends(async_database.get_db)):
+    """
+    Create a new bank transaction.
+    """
+    try:
+        return await async_crud.create_bank_transaction(db, transaction, idempotency.take_key(request))
+    except idempotency.ClaimLost as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.exception("Error creating bank transaction")
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/reconcile/", status_code=status.HTTP_200_OK)
+async def reconcile_account(account_id: int, db=Depends(async_database.get_db)):
+    """
+    Reconcile a bank account.
+    """
+    try:
+        result = await async_crud.reconcile_bank_account(db, account_id)
+    except Exception as e:
+        logger.exception("Error during reconciliation")
+        raise HTTPException(status_code=400, detail=str(e))
+    if not result:
+        raise HTTPException(status_code=404, detail="Bank account not found or reconciliation failed")
+    return {"message": "Bank account reconciled successfully"}
+
+
+def install(app):
+    """
+    Replace the matching synchronous routes on `app` with the async variants.
+
+    Parameters:
+    - app: The FastAPI application from main.py.
+    """
+    replaced = {(route.path, method) for route in router.routes for method in route.methods}
+    app.router.routes = [
+        route for route in app.router.routes
+        if not (isinstance(route, APIRoute)
+                and any((route.path, method) in replaced for method in route.methods))
+    ]
+    app.include_router(router)
@@ -2,11 +2,41 @@
 CRUD operations for the Banking Service using direct AWS RDS PostgreSQL connection.
 """
 
-from . import schemas
+from . import idempotency, schemas
+import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
+BANK_ACCOUNT_COLUMNS = "id, account_name, account_number, balance"
+BANK_TRANSACTION_COLUMNS = "id, bank_account_id, description, amount, date, transaction_type"
+
+
+def _row_to_bank_account(row):
+    """
+    Map a row selected with BANK_ACCOUNT_COLUMNS to a BankAccount schema.
+    """
+    return schemas.BankAccount(
+        id=row[0],
+        account_name=row[1],
+        account_number=row[2],
+        balance=float(row[3])
+    )
+
+
+def _row_to_bank_transaction(row):
+    """
+    Map a row selected with BANK_TRANSACTION_COLUMNS to a BankTransaction schema.
+    """
+    return schemas.BankTransaction(
+        id=row[0],
+        bank_account_id=row[1],
+        description=row[2],
+        amount=float(row[3]),
+        date=row[4],
+        transaction_type=row[5]
+    )
+
 
 # Bank Account CRUD Operations
 
@@ -15,17 +45,12 @@ def get_bank_account(db, account_id: int):
     Retrieve a bank account by ID.
     """
     cursor = db.cursor()
-    sql = "SELECT id, account_name, account_number, balance FROM bank_accounts WHERE id = %s;"
+    sql = f"SELECT {BANK_ACCOUNT_COLUMNS} FROM bank_accounts WHERE id = %s;"
     cursor.execute(sql, (account_id,))
     row = cursor.fetchone()
     cursor.close()
     if row:
-        return schemas.BankAccount(
-            id=row[0],
-            account_name=row[1],
-            account_number=row[2],
-            balance=float(row[3])
-        )
+        return _row_to_bank_account(row)
     return None
 
 
@@ -34,17 +59,12 @@ def get_bank_account_by_number(db, account_number: str):
     Retrieve a bank account by account number.
     """
     cursor = db.cursor()
-    sql = "SELECT id, account_name, account_number, balance FROM bank_accounts WHERE account_number = %s;"
+    sql = f"SELECT {BANK_ACCOUNT_COLUMNS} FROM bank_accounts WHERE account_number = %s;"
     cursor.execute(sql, (account_number,))
     row = cursor.fetchone()
     cursor.close()
     if row:
-        return schemas.BankAccount(
-            id=row[0],
-            account_name=row[1],
-            account_number=row[2],
-            balance=float(row[3])
-        )
+        return _row_to_bank_account(row)
     return None
 
 
@@ -53,48 +73,63 @@ def create_bank_account(db, bank_account: schemas.BankAccountCreate):
     Create a new bank account.
     """
     cursor = db.cursor()
-    sql = """
+    sql = f"""
         INSERT INTO bank_accounts (account_name, account_number, balance)
-        VALUES (%s, %s, %s) RETURNING id;
+        VALUES (%s, %s, %s) RETURNING {BANK_ACCOUNT_COLUMNS};
     """
     params = (bank_account.account_name, bank_account.account_number, bank_account.balance)
     cursor.execute(sql, params)
-    account_id = cursor.fetchone()[0]
+    row = cursor.fetchone()
     db.commit()
     cursor.close()
-    return get_bank_account(db, account_id)
+    return _row_to_bank_account(row)
 
 
 # Bank Transaction CRUD Operations
 
-def create_bank_transaction(db, transaction: schemas.BankTransactionCreate):
+def create_bank_transaction(db, transaction: schemas.BankTransactionCreate, idempotency_key=None):
     """
     Create a new bank transaction.
+
+    The insert and the bank account balance update are sent as a single
+    statement so the write costs one round trip.
+
+    Parameters:
+    - idempotency_key: Key hash from idempotency.take_key(); the response is
+      stored under it in the same database transaction.
     """
     cursor = db.cursor()
-    # Insert transaction
-    sql = """
-        INSERT INTO bank_transactions (bank_account_id, description, amount, date, transaction_type)
-        VALUES (%s, %s, %s, %s, %s) RETURNING id;
+    signed_amount = transaction.amount if transaction.transaction_type == 'Credit' else -transaction.amount
+    sql = f"""
+        WITH inserted AS (
+            INSERT INTO bank_transactions (bank_account_id, description, amount, date, transaction_type)
+            VALUES (%s, %s, %s, %s, %s) RETURNING {BANK_TRANSACTION_COLUMNS}
+        ), balance_update AS (
+            UPDATE bank_accounts SET balance = balance + %s
+            WHERE id = (SELECT bank_account_id FROM inserted)
+        )
+        SELECT {BANK_TRANSACTION_COLUMNS} FROM inserted;
     """
     params = (
         transaction.bank_account_id,
         transaction.description,
         transaction.amount,
         datetime.datetime.utcnow(),
-        transaction.transaction_type
+        transaction.transaction_type,
+        signed_amount
     )
-    cursor.execute(sql, params)
-    transaction_id = cursor.fetchone()[0]
-    # Update bank account balance
-    if transaction.transaction_type == 'Credit':
-        balance_update_sql = "UPDATE bank_accounts SET balance = balance + %s WHERE id = %s;"
-    else:
-        balance_update_sql = "UPDATE bank_accounts SET balance = balance - %s WHERE id = %s;"
-    cursor.execute(balance_update_sql, (transaction.amount, transaction.bank_account_id))
-    db.commit()
-    cursor.close()
-    return get_bank_transaction(db, transaction_id)
+    try:
+        cursor.execute(sql, params)
+        result = _row_to_bank_transaction(cursor.fetchone())
+        if idempotency_key is not None:
+            idempotency.store_response(cursor, idempotency_key, result)
+        db.commit()
+        return result
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
 
 
 def get_bank_transaction(db, transaction_id: int):
@@ -102,20 +137,10 @@ def get_bank_transaction(db, transaction_id: int):
     Retrieve a bank transaction by ID.
     """
     cursor = db.cursor()
-    sql = """
-        SELECT id, bank_account_id, description, amount, date, transaction_type
-        FROM bank_transactions WHERE id = %s;
-    """
+    sql = f"SELECT {BANK_TRANSACTION_COLUMNS} FROM bank_transactions WHERE id = %s;"
     cursor.execute(sql, (transaction_id,))
     row = cursor.fetchone()
     cursor.close()
     if row:
-        return schemas.BankTransaction(
-            id=row[0],
-            bank_account_id=row[1],
-            description=row[2],
-            amount=float(row[3]),
-            date=row[4],
-            transaction_type=row[5]
-        )
+        return _row_to_bank_transaction(row)
     return None
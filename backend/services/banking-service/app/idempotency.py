@@ -0,0 +1,348 @@
+"""
+Idempotency-Key support for write endpoints.
+
+A client (or API Gateway / Lambda retrying on its behalf) sends the same
+Idempotency-Key header with every attempt of one logical request. The first
+attempt claims the key in the idempotency_keys table, runs the endpoint and
+stores its response; later attempts with that key get the stored response
+back from one primary-key lookup, without the write running again.
+
+- Keys are scoped to the service, method and path, and stored as a 32-byte
+  SHA-256 digest.
+- Reusing a key with a different request body is rejected with 422.
+- An attempt arriving while the first one is still running gets 409 and
+  should retry later.
+- Only successful (2xx) responses are stored. After any other response the
+  claim is released so the request can be retried: the endpoints report
+  database errors as 400 as well, and those may be transient.
+- Stored responses expire after IDEMPOTENCY_TTL seconds (default 24 hours).
+  A claim whose response was never stored (the process died mid-request)
+  expires after IDEMPOTENCY_PENDING_TIMEOUT seconds (default 300). Expired
+  rows are deleted in small batches as new keys are claimed.
+
+The claim, the endpoint's write and the stored response are separate
+database transactions unless the endpoint takes part, so the guarantee is
+best-effort: if the process dies after the write commits but before the
+response is stored, a retry after PENDING_TIMEOUT runs the write again.
+Endpoints close that gap by calling take_key(request) and passing the key
+to their write, which stores the response with store_response() (or
+store_response_async() on asyncpg) in the same database transaction. That
+statement only succeeds while the claim is unanswered, so of two attempts
+that both got to write (one outliving its claim), the second is rolled back
+with ClaimLost.
+
+install(app, routes) wraps the app in IdempotencyMiddleware for the given
+(method, path) pairs, so it covers whichever route variant serves the path.
+"""
+
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+import hashlib
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+TTL = int(os.environ.get("IDEMPOTENCY_TTL", 24 * 3600))
+# Well above the worst-case request time, which includes waiting up to 30
+# seconds for a pooled connection: a claim that expires while its request is
+# still running lets a retry run the write as well.
+PENDING_TIMEOUT = int(os.environ.get("IDEMPOTENCY_PENDING_TIMEOUT", 300))
+
+# Request state entry holding the claimed key hash, and whether the endpoint took it.
+STATE_KEY = "idempotency_key"
+TAKEN_KEY = "idempotency_key_taken"
+
+# Claims between opportunistic deletes of expired keys, and rows per delete.
+PURGE_EVERY = 1000
+PURGE_BATCH = 1000
+
+# Claims the key, or takes over an expired one; returns no row if the key is live.
+CLAIM_SQL = """
+    INSERT INTO idempotency_keys (key_hash, request_hash, expires_at)
+    VALUES (%s, %s, (NOW() AT TIME ZONE 'UTC') + make_interval(secs => %s))
+    ON CONFLICT (key_hash) DO UPDATE SET
+        request_hash = EXCLUDED.request_hash, status_code = NULL, content_type = NULL,
+        body = NULL, expires_at = EXCLUDED.expires_at
+    WHERE idempotency_keys.expires_at <= (NOW() AT TIME ZONE 'UTC')
+    RETURNING key_hash;
+"""
+
+LOOKUP_SQL = """
+    SELECT request_hash, status_code, content_type, body FROM idempotency_keys
+    WHERE key_hash = %s AND expires_at > (NOW() AT TIME ZONE 'UTC');
+"""
+
+STORE_SQL = """
+    UPDATE idempotency_keys
+    SET status_code = %s, content_type = %s, body = %s,
+        expires_at = (NOW() AT TIME ZONE 'UTC') + make_interval(secs => %s)
+    WHERE key_hash = %s;
+"""
+
+# Stores the response in the endpoint's own database transaction; updates no
+# row once the claim has been answered or purged.
+TRANSACTIONAL_STORE_SQL = """
+    UPDATE idempotency_keys
+    SET status_code = %s, content_type = %s, body = %s,
+        expires_at = (NOW() AT TIME ZONE 'UTC') + make_interval(secs => %s)
+    WHERE key_hash = %s AND status_code IS NULL;
+"""
+
+ASYNC_TRANSACTIONAL_STORE_SQL = """
+    UPDATE idempotency_keys
+    SET status_code = $1, content_type = $2, body = $3,
+        expires_at = (NOW() AT TIME ZONE 'UTC') + make_interval(secs => $4)
+    WHERE key_hash = $5 AND status_code IS NULL;
+"""
+
+RELEASE_SQL = "DELETE FROM idempotency_keys WHERE key_hash = %s AND status_code IS NULL;"
+
+PURGE_SQL = """
+    DELETE FROM idempotency_keys WHERE key_hash IN (
+        SELECT key_hash FROM idempotency_keys
+        WHERE expires_at <= (NOW() AT TIME ZONE 'UTC') LIMIT %s
+    );
+"""
+
+
+class ClaimLost(Exception):
+    """
+    Raised when a write's idempotency key was answered by another attempt.
+    """
+
+
+def take_key(request):
+    """
+    Take over storing the response for a request's claimed Idempotency-Key.
+
+    The endpoint must then store its successful response with
+    store_response() or store_response_async() in the same database
+    transaction as its write; the middleware no longer stores it.
+
+    Returns:
+    - Key hash to pass to the write, or None if the request has no claimed key.
+    """
+    state = request.scope.get("state", {})
+    key_hash = state.get(STATE_KEY)
+    if key_hash is not None:
+        state[TAKEN_KEY] = True
+    return key_hash
+
+
+def _response_params(key_hash, content, status_code):
+    # Rendered as FastAPI renders the endpoint's response, so a replay is byte-for-byte the same.
+    body = JSONResponse(jsonable_encoder(content)).body
+    return (status_code, "application/json", body, TTL, key_hash)
+
+
+def store_response(cursor, key_hash, content, status_code=201):
+    """
+    Store an endpoint's response on the cursor of its write, before the commit.
+
+    Raises:
+    - ClaimLost: Another attempt with this key already stored its response.
+    """
+    cursor.execute(TRANSACTIONAL_STORE_SQL, _response_params(key_hash, content, status_code))
+    if cursor.rowcount == 0:
+        raise ClaimLost("A request with this Idempotency-Key has already completed")
+
+
+async def store_response_async(db, key_hash, content, status_code=201):
+    """
+    store_response() for an asyncpg connection inside the write's transaction.
+    """
+    if await db.execute(ASYNC_TRANSACTIONAL_STORE_SQL, *_response_params(key_hash, content, status_code)) == "UPDATE 0":
+        raise ClaimLost("A request with this Idempotency-Key has already completed")
+
+
+class KeyStore:
+    """
+    The idempotency_keys table, accessed through short pooled connections.
+
+    Parameters:
+    - acquire, release: Get and return a database connection.
+    """
+
+    def __init__(self, acquire, release):
+        self.acquire = acquire
+        self.release = release
+        self._claims = 0
+        self._lock = threading.Lock()
+
+    def _execute(self, sql, params, fetch=False):
+        db = self.acquire()
+        try:
+            cursor = db.cursor()
+            try:
+                cursor.execute(sql, params)
+                row = cursor.fetchone() if fetch else None
+                db.commit()
+                return row
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                cursor.close()
+        finally:
+            self.release(db)
+
+    def claim(self, key_hash, request_hash):
+        """
+        Claim a key for a new request.
+
+        Returns:
+        - None if the caller now owns the key; otherwise the live row as
+          (request hash, status code, content type, body), whose status code
+          is None while the owning request is still running.
+        """
+        with self._lock:
+            self._claims += 1
+            purge = self._claims % PURGE_EVERY == 0
+        if purge:
+            try:
+                self._execute(PURGE_SQL, (PURGE_BATCH,))
+            except Exception:
+                logger.exception("Could not purge expired idempotency keys")
+        if self._execute(CLAIM_SQL, (key_hash, request_hash, PENDING_TIMEOUT), fetch=True):
+            return None
+        row = self._execute(LOOKUP_SQL, (key_hash,), fetch=True)
+        if row is None:
+            # The live row expired between the two statements; claim it now.
+            return self.claim(key_hash, request_hash)
+        return (bytes(row[0]), row[1], row[2], bytes(row[3]) if row[3] is not None else None)
+
+    def store(self, key_hash, status_code, content_type, body):
+        self._execute(STORE_SQL, (status_code, content_type, body, TTL, key_hash))
+
+    def release_claim(self, key_hash):
+        self._execute(RELEASE_SQL, (key_hash,))
+
+
+def _json_response(status_code, detail):
+    return status_code, b"application/json", json.dumps({"detail": detail}).encode()
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware replaying stored responses for requests carrying an Idempotency-Key.
+
+    Parameters:
+    - routes: Set of (method, path) pairs covered.
+    - store: KeyStore.
+    - scope_name: Prefix of every key, usually the service name.
+    """
+
+    def __init__(self, app, routes, store, scope_name):
+        self.app = app
+        self.routes = routes
+        self.store = store
+        self.scope_name = scope_name
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"]) not in self.routes:
+            await self.app(scope, receive, send)
+            return
+        key = dict(scope["headers"]).get(HEADER)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await self._send(send, *_json_response(400, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} bytes"))
+            return
+
+        # The body is read up front to fingerprint the request, then replayed to the app.
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body = b"".join(chunks)
+        key_hash = hashlib.sha256(b"\0".join([
+            self.scope_name.encode(), scope["method"].encode(), scope["path"].encode(), key
+        ])).digest()
+        request_hash = hashlib.sha256(body).digest()
+
+        stored = await run_in_threadpool(self.store.claim, key_hash, request_hash)
+        if stored is not None:
+            stored_request_hash, status_code, content_type, stored_body = stored
+            if stored_request_hash != request_hash:
+                await self._send(send, *_json_response(422, "Idempotency-Key was used for a different request"))
+            elif status_code is None:
+                await self._send(send, *_json_response(409, "A request with this Idempotency-Key is in progress"))
+            else:
+                await self._send(send, status_code, (content_type or "application/json").encode(), stored_body,
+                                 replayed=True)
+            return
+
+        state = {**scope.get("state", {}), STATE_KEY: key_hash}
+        scope = {**scope, "state": state}
+        body_sent = False
+
+        async def replay_body():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status_code = 500
+        content_type = None
+        response_chunks = []
+
+        async def capture(message):
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = dict(message.get("headers", [])).get(b"content-type")
+            elif message["type"] == "http.response.body":
+                response_chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_body, capture)
+        finally:
+            try:
+                if not 200 <= status_code < 300:
+                    await run_in_threadpool(self.store.release_claim, key_hash)
+                elif not state.get(TAKEN_KEY):
+                    # Endpoints that took the key stored the response along with their write.
+                    await run_in_threadpool(
+                        self.store.store, key_hash, status_code,
+                        content_type.decode() if content_type else None, b"".join(response_chunks)
+                    )
+            except Exception:
+                logger.exception("Could not record the response for an idempotency key")
+
+    @staticmethod
+    async def _send(send, status_code, content_type, body, replayed=False):
+        headers = [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]
+        if replayed:
+            headers.append((b"idempotent-replayed", b"true"))
+        await send({"type": "http.response.start", "status": status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+def install(app, routes, scope_name, acquire=None, release=None):
+    """
+    Honour Idempotency-Key headers on the given routes.
+
+    Parameters:
+    - app: The FastAPI application.
+    - routes: Iterable of (method, path) pairs, e.g. [("POST", "/transactions/")].
+    - scope_name: Service name keys are scoped to.
+    - acquire, release: Connection functions; default to the service's pool.
+    """
+    if acquire is None or release is None:
+        from . import database
+        acquire, release = database.get_connection, database.release_connection
+    app.add_middleware(IdempotencyMiddleware, routes=set(routes), store=KeyStore(acquire, release),
+                       scope_name=scope_name)
@@ -5,11 +5,9 @@ This module initializes the FastAPI app and defines the endpoints for managing b
 and transactions, including reconciliation.
 """
 
-from fastapi import FastAPI, Depends, HTTPException, status
-from . import schemas, crud, utils
+from fastapi import FastAPI, Depends, HTTPException, Request, status
+from . import schemas, crud, utils, database, async_database, instrumentation, idempotency
 import logging
-import psycopg2
-import os
 
 # Initialize FastAPI app
 app = FastAPI(title="Banking Service", description="Bank account and reconciliation endpoints")
@@ -23,17 +21,26 @@ def get_db():
     """
     Dependency to get a database connection.
     """
-    conn = psycopg2.connect(
-        host=os.environ.get("DB_HOST"),
-        port=int(os.environ.get("DB_PORT", 5432)),
-        database=os.environ.get("DB_NAME"),
-        user=os.environ.get("DB_USER"),
-        password=os.environ.get("DB_PASSWORD")
-    )
+    db = database.get_connection()
     try:
-        yield conn
+        yield db
     finally:
-        conn.close()
+        database.release_connection(db)
+
+
+@app.on_event("startup")
+def warm_up():
+    """
+    Pre-open pooled database connections once per container.
+    """
+    database.warm_pool()
+
+
+# Per-route metrics on GET /metrics and the slow query log on GET /admin/slow_queries.
+instrumentation.install(app, gauges=database.pool_gauges, explain_connect=database.dedicated_connection)
+
+# Replay the stored response when a retried create carries the same Idempotency-Key.
+idempotency.install(app, [("POST", "/bank_transactions/")], scope_name="banking-service")
 
 
 # Bank Account Endpoints
@@ -77,7 +84,7 @@ def read_bank_account(account_id: int, db=Depends(get_db)):
 
 
 @app.post("/bank_transactions/", response_model=schemas.BankTransaction, status_code=status.HTTP_201_CREATED)
-def create_bank_transaction(transaction: schemas.BankTransactionCreate, db=Depends(get_db)):
+def create_bank_transaction(transaction: schemas.BankTransactionCreate, request: Request, db=Depends(get_db)):
     """
     Create a new bank transaction.
 
@@ -88,7 +95,9 @@ def create_bank_transaction(transaction: schemas.BankTransactionCreate, db=Depen
     - BankTransaction schema of the newly created transaction.
     """
     try:
-        return crud.create_bank_transaction(db, transaction)
+        return crud.create_bank_transaction(db, transaction, idempotency.take_key(request))
+    except idempotency.ClaimLost as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         logger.exception("Error creating bank transaction")
         raise HTTPException(status_code=400, detail=str(e))
@@ -113,3 +122,9 @@ def reconcile_account(account_id: int, db=Depends(get_db)):
     except Exception as e:
         logger.exception("Error during reconciliation")
         raise HTTPException(status_code=400, detail=str(e))
+
+
+# Serve the hot endpoints from the asyncpg engine when DB_ENGINE=asyncpg.
+if async_database.ENABLED:
+    from . import async_main
+    async_main.install(app)
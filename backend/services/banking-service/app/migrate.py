@@ -0,0 +1,146 @@
+"""
+Versioned schema migrations.
+
+Each service lists its migrations in models.MIGRATIONS. Applied versions are
+recorded per service in the schema_migrations table, so services sharing a
+database track their own history. A PostgreSQL advisory lock serialises
+concurrent runners (e.g. several containers starting at once).
+
+Usage (from the service directory, with the DB_* environment variables set):
+
+    python -m app.migrate            # apply pending migrations
+    python -m app.migrate --list     # show applied and pending versions
+"""
+
+import argparse
+import collections
+import logging
+import zlib
+
+logger = logging.getLogger(__name__)
+
+Migration = collections.namedtuple(
+    "Migration", ["version", "name", "statements", "transactional"], defaults=(True,)
+)
+Migration.__doc__ = """
+A schema change.
+
+- version: Strictly increasing integer.
+- name: Short description.
+- statements: SQL statements executed in order.
+- transactional: Run all statements in one transaction. Set to False for
+  statements that cannot run inside a transaction block, such as
+  CREATE INDEX CONCURRENTLY; those must be idempotent (IF NOT EXISTS).
+"""
+
+HISTORY_TABLE_CREATION = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    service VARCHAR(100) NOT NULL,
+    version INTEGER NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    applied_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'UTC'),
+    PRIMARY KEY (service, version)
+);
+"""
+
+
+def applied_versions(conn, service):
+    """
+    Return the set of migration versions already applied for a service.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(HISTORY_TABLE_CREATION)
+        cursor.execute("SELECT version FROM schema_migrations WHERE service = %s;", (service,))
+        versions = {row[0] for row in cursor.fetchall()}
+        conn.commit()
+        return versions
+    finally:
+        cursor.close()
+
+
+def _record(cursor, service, migration):
+    cursor.execute(
+        "INSERT INTO schema_migrations (service, version, name) VALUES (%s, %s, %s);",
+        (service, migration.version, migration.name)
+    )
+
+
+def apply_migrations(conn, service, migrations):
+    """
+    Apply the pending migrations for a service in version order.
+
+    Parameters:
+    - conn: A dedicated (unpooled) database connection; its autocommit setting
+      is changed while non-transactional migrations run.
+    - service: Name under which versions are recorded.
+    - migrations: Iterable of Migration.
+
+    Returns:
+    - List of the versions applied by this call.
+    """
+    migrations = sorted(migrations, key=lambda migration: migration.version)
+    versions = [migration.version for migration in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError(f"Duplicate migration versions for {service}: {versions}")
+
+    lock_key = zlib.crc32(f"schema_migrations:{service}".encode())
+    cursor = conn.cursor()
+    cursor.execute("SELECT pg_advisory_lock(%s);", (lock_key,))
+    conn.commit()
+    applied = []
+    try:
+        done = applied_versions(conn, service)
+        for migration in migrations:
+            if migration.version in done:
+                continue
+            logger.info("Applying %s migration %s: %s", service, migration.version, migration.name)
+            if migration.transactional:
+                try:
+                    for statement in migration.statements:
+                        cursor.execute(statement)
+                    _record(cursor, service, migration)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+            else:
+                conn.autocommit = True
+                try:
+                    for statement in migration.statements:
+                        cursor.execute(statement)
+                    _record(cursor, service, migration)
+                finally:
+                    conn.autocommit = False
+            applied.append(migration.version)
+    finally:
+        cursor.execute("SELECT pg_advisory_unlock(%s);", (lock_key,))
+        conn.commit()
+        cursor.close()
+    return applied
+
+
+def main():
+    from . import database, models
+
+    parser = argparse.ArgumentParser(description="Apply this service's schema migrations.")
+    parser.add_argument("--list", action="store_true", help="Show applied and pending versions only")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    conn = database.dedicated_connection()
+    try:
+        if args.list:
+            done = applied_versions(conn, models.SERVICE)
+            for migration in sorted(models.MIGRATIONS, key=lambda migration: migration.version):
+                state = "applied" if migration.version in done else "pending"
+                print(f"{migration.version:>4}  {state:<8} {migration.name}")
+            return
+        applied = apply_migrations(conn, models.SERVICE, models.MIGRATIONS)
+        logger.info("%s: %s", models.SERVICE, f"applied {applied}" if applied else "up to date")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ Database models for the Banking Service.
 Defines SQL statements for creating the bank_accounts and bank_transactions tables.
 """
 
+from .migrate import Migration
+
 bank_account_table_creation = """
 CREATE TABLE IF NOT EXISTS bank_accounts (
     id SERIAL PRIMARY KEY,
@@ -23,3 +25,37 @@ CREATE TABLE IF NOT EXISTS bank_transactions (
     transaction_type VARCHAR(10) NOT NULL  -- 'Debit' or 'Credit'
 );
 """
+
+bank_transactions_account_index_creation = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bank_transactions_bank_account_id
+ON bank_transactions (bank_account_id) INCLUDE (amount, transaction_type);
+"""
+
+# Stored responses for Idempotency-Key replays (see app/idempotency.py). The
+# table is shared by the services that accept the header; keys are scoped by service.
+idempotency_keys_table_creation = """
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key_hash BYTEA PRIMARY KEY,  -- SHA-256 of service, method, path and key
+    request_hash BYTEA NOT NULL,  -- SHA-256 of the request body
+    status_code SMALLINT,  -- NULL while the first attempt is running
+    content_type VARCHAR(100),
+    body BYTEA,
+    expires_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+);
+"""
+
+idempotency_keys_expiry_index_creation = """
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys (expires_at);
+"""
+
+SERVICE = "banking-service"
+
+# Applied in order by `python -m app.migrate`; never edit a released migration, add a new one.
+MIGRATIONS = [
+    Migration(1, "create tables", [bank_account_table_creation, bank_transaction_table_creation]),
+    # Built without blocking writes, for bank account reconciliation.
+    Migration(2, "add indexes", [
+        bank_transactions_account_index_creation,
+    ], transactional=False),
+    Migration(3, "idempotency keys", [idempotency_keys_table_creation, idempotency_keys_expiry_index_creation]),
+]
@@ -0,0 +1,55 @@
+"""
+Shared fixtures for the service's tests.
+"""
+
+from app.main import app, get_db
+import pytest
+
+
+class RecordingCursor:
+    def __init__(self, db):
+        self.db = db
+
+    def execute(self, sql, params=None):
+        self.db.queries.append(sql)
+
+    def fetchone(self):
+        return self.db.rows.pop(0) if self.db.rows else None
+
+    def fetchall(self):
+        rows, self.db.rows = self.db.rows, []
+        return rows
+
+    def close(self):
+        pass
+
+
+class RecordingDB:
+    """
+    Fake connection that hands out queued result rows and records every
+    statement, so tests can pin the number of database round trips an
+    endpoint makes.
+    """
+    def __init__(self):
+        self.rows = []
+        self.queries = []
+
+    def cursor(self):
+        return RecordingCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def recording_db():
+    db = RecordingDB()
+    app.dependency_overrides[get_db] = lambda: db
+    yield db
+    app.dependency_overrides.clear()
@@ -4,6 +4,7 @@ Test cases for the Banking Service.
 
 from fastapi.testclient import TestClient
 from app.main import app
+import datetime
 
 client = TestClient(app)
 
@@ -30,3 +31,32 @@ def test_reconcile_account():
     response = client.post("/reconcile/", params={"account_id": 1})
     assert response.status_code == 200
     assert response.json()["message"] == "Bank account reconciled successfully"
+
+
+def test_create_bank_account_round_trips(recording_db):
+    recording_db.rows = [None, (2, "Business Checking", "123456789", 5000.0)]
+    response = client.post("/bank_accounts/", json={
+        "account_name": "Business Checking",
+        "account_number": "123456789",
+        "balance": 5000.0
+    })
+    assert response.status_code == 201
+    assert response.json() == {"id": 2, "account_name": "Business Checking", "account_number": "123456789",
+                               "balance": 5000.0}
+    # Duplicate-number check plus the INSERT, whose RETURNING row is the response.
+    assert len(recording_db.queries) == 2
+
+
+def test_create_bank_transaction_single_round_trip(recording_db):
+    recording_db.rows = [(9, 2, "Deposit", 1000.0, datetime.datetime(2024, 3, 1), "Credit")]
+    response = client.post("/bank_transactions/", json={
+        "bank_account_id": 2,
+        "description": "Deposit",
+        "amount": 1000.0,
+        "transaction_type": "Credit"
+    })
+    assert response.status_code == 201
+    assert response.json() == {"id": 9, "bank_account_id": 2, "description": "Deposit", "amount": 1000.0,
+                               "date": "2024-03-01T00:00:00", "transaction_type": "Credit"}
+    # Insert and balance update travel as one statement, and nothing is read back.
+    assert len(recording_db.queries) == 1
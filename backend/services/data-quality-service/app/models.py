@@ -4,6 +4,8 @@ Database models for the Data Quality Service.
 Defines SQL statements for creating the data_quality_issues table.
 """
 
+from .migrate import Migration
+
 data_quality_issues_table_creation = """
 CREATE TABLE IF NOT EXISTS data_quality_issues (
     id SERIAL PRIMARY KEY,
@@ -13,3 +15,10 @@ CREATE TABLE IF NOT EXISTS data_quality_issues (
     resolved BOOLEAN DEFAULT FALSE
 );
 """
+
+SERVICE = "data-quality-service"
+
+# Applied in order by `python -m app.migrate`; never edit a released migration, add a new one.
+MIGRATIONS = [
+    Migration(1, "create tables", [data_quality_issues_table_creation]),
+]
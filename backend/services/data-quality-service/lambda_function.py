@@ -4,12 +4,17 @@ AWS Lambda handler for the Data Quality Service.
 
 import json
 import logging
+import time
 from app.main import app
+from app import request_logging
 from mangum import Mangum
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
+# Mangum logs every lifespan transition at INFO; keep that out of CloudWatch
+logging.getLogger("mangum").setLevel(logging.WARNING)
+request_logging.configure()
 
 # AWS Lambda handler
 handler = Mangum(app)
@@ -18,14 +23,17 @@ def lambda_handler(event, context):
     """
     Entry point for AWS Lambda.
     """
-    logger.info(f"Received event: {json.dumps(event)}")
+    started = time.perf_counter()
+    sampled = request_logging.should_sample()
     try:
         response = handler(event, context)
-        logger.info(f"Response: {response}")
-        return response
     except Exception as e:
         logger.exception("Exception occurred")
-        return {
+        response = {
             'statusCode': 500,
             'body': json.dumps({'message': 'Internal server error'})
         }
+    request_logging.log_invocation(logger, event, response, started, sampled)
+    # Write out queued log records before Lambda freezes the container.
+    request_logging.flush()
+    return response
@@ -7,26 +7,32 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+INTEGRATION_COLUMNS = "id, name, endpoint_url, last_synced"
+
+
+def _row_to_integration(row):
+    """
+    Map a row selected with INTEGRATION_COLUMNS to an Integration schema.
+    """
+    return schemas.Integration(
+        id=row[0],
+        name=row[1],
+        endpoint_url=row[2],
+        last_synced=row[3]
+    )
+
 
 def get_integration(db, integration_id: int):
     """
     Retrieve an integration by ID.
     """
     cursor = db.cursor()
-    sql = """
-        SELECT id, name, endpoint_url, last_synced
-        FROM integrations WHERE id = %s;
-    """
+    sql = f"SELECT {INTEGRATION_COLUMNS} FROM integrations WHERE id = %s;"
     cursor.execute(sql, (integration_id,))
     row = cursor.fetchone()
     cursor.close()
     if row:
-        return schemas.Integration(
-            id=row[0],
-            name=row[1],
-            endpoint_url=row[2],
-            last_synced=row[3]
-        )
+        return _row_to_integration(row)
     return None
 
 
@@ -35,20 +41,12 @@ def get_integration_by_name(db, name: str):
     Retrieve an integration by name.
     """
     cursor = db.cursor()
-    sql = """
-        SELECT id, name, endpoint_url, last_synced
-        FROM integrations WHERE name = %s;
-    """
+    sql = f"SELECT {INTEGRATION_COLUMNS} FROM integrations WHERE name = %s;"
     cursor.execute(sql, (name,))
     row = cursor.fetchone()
     cursor.close()
     if row:
-        return schemas.Integration(
-            id=row[0],
-            name=row[1],
-            endpoint_url=row[2],
-            last_synced=row[3]
-        )
+        return _row_to_integration(row)
     return None
 
 
@@ -57,13 +55,13 @@ def create_integration(db, integration: schemas.IntegrationCreate):
     Create a new integration.
     """
     cursor = db.cursor()
-    sql = """
+    sql = f"""
         INSERT INTO integrations (name, api_key, api_secret, endpoint_url)
-        VALUES (%s, %s, %s, %s) RETURNING id;
+        VALUES (%s, %s, %s, %s) RETURNING {INTEGRATION_COLUMNS};
     """
     params = (integration.name, integration.api_key, integration.api_secret, integration.endpoint_url)
     cursor.execute(sql, params)
-    integration_id = cursor.fetchone()[0]
+    row = cursor.fetchone()
     db.commit()
     cursor.close()
-    return get_integration(db, integration_id)
+    return _row_to_integration(row)
@@ -0,0 +1,492 @@
+"""
+Request and database instrumentation with a Prometheus-format /metrics endpoint.
+
+- MetricsMiddleware: pure ASGI middleware recording per-route latency
+  histograms and status counts.
+- TimedCursor: psycopg2 cursor class that counts and times every statement
+  against the request currently being served.
+- SlowQueryLog: statements slower than SLOW_QUERY_MS are logged and kept in
+  a bounded set of the slowest queries, and their plan is captured on a
+  background connection (EXPLAIN (ANALYZE, BUFFERS) for plain SELECTs,
+  estimated EXPLAIN for everything else). Parameter values can hold
+  passwords, emails and amounts, so only their types are recorded, and
+  quoted literals are masked in captured plans.
+- install(): wires these into a FastAPI app and adds GET /metrics and, when
+  SLOW_QUERY_ENDPOINT is set, GET /admin/slow_queries. That endpoint has no
+  authentication of its own; enable it only where the admin path is not
+  reachable from outside.
+
+The hot path is a couple of perf_counter() calls, a bisect into fixed buckets
+and a few integer increments under an uncontended lock, so the overhead stays
+in the low microseconds per request.
+
+Configuration (environment variables):
+- SLOW_QUERY_MS: Duration above which a statement counts as slow (default 500).
+- SLOW_QUERY_LOG_SIZE: Number of slowest statements kept (default 20).
+- SLOW_QUERY_EXPLAIN: Capture execution plans for slow statements (default true).
+- SLOW_QUERY_EXPLAIN_INTERVAL: Seconds before the same statement is explained
+  again (default 300).
+- SLOW_QUERY_EXPLAIN_TIMEOUT_MS: statement_timeout for the EXPLAIN run (default 10000).
+- SLOW_QUERY_ENDPOINT: Serve GET /admin/slow_queries (default false).
+"""
+
+import bisect
+import contextvars
+import datetime
+import heapq
+import itertools
+import logging
+import os
+import queue
+import re
+import threading
+import time
+
+from psycopg2 import extensions
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds, shared by every histogram.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 500))
+SLOW_QUERY_LOG_SIZE = int(os.environ.get("SLOW_QUERY_LOG_SIZE", 20))
+SLOW_QUERY_EXPLAIN = os.environ.get("SLOW_QUERY_EXPLAIN", "true").lower() == "true"
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.environ.get("SLOW_QUERY_EXPLAIN_INTERVAL", 300))
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.environ.get("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", 10000))
+SLOW_QUERY_ENDPOINT = os.environ.get("SLOW_QUERY_ENDPOINT", "false").lower() == "true"
+
+
+class RequestStats:
+    """
+    Database work done on behalf of a single request.
+    """
+    __slots__ = ("endpoint", "queries", "db_seconds")
+
+    def __init__(self, endpoint=None):
+        self.endpoint = endpoint
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_current_request = contextvars.ContextVar("current_request", default=None)
+
+
+def current_request_stats():
+    """
+    Return the RequestStats of the request being served, or None outside one.
+    """
+    return _current_request.get()
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram; not thread-safe on its own (guarded by Registry).
+    """
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Registry:
+    """
+    In-process store for request and query metrics.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}  # (method, route, status) -> count
+        self.latency = {}  # (method, route) -> Histogram
+        self.db_time = {}  # (method, route) -> Histogram of per-request DB time
+        self.db_queries = {}  # (method, route) -> count
+        self.queries_outside_requests = Histogram()
+
+    def observe_request(self, method, route, status, seconds, stats):
+        key = (method, route)
+        with self._lock:
+            status_key = (method, route, status)
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = Histogram()
+                self.db_time[key] = Histogram()
+                self.db_queries[key] = 0
+            histogram.observe(seconds)
+            if stats.queries:
+                self.db_time[key].observe(stats.db_seconds)
+                self.db_queries[key] += stats.queries
+
+    def observe_query(self, seconds):
+        stats = _current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += seconds
+        else:
+            with self._lock:
+                self.queries_outside_requests.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.requests.clear()
+            self.latency.clear()
+            self.db_time.clear()
+            self.db_queries.clear()
+            self.queries_outside_requests = Histogram()
+
+    def render(self, gauges=None):
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Parameters:
+        - gauges: Optional mapping of extra gauge names to values.
+
+        Returns:
+        - The exposition text.
+        """
+        lines = []
+        with self._lock:
+            lines.append("# TYPE http_requests_total counter")
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(
+                    f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}'
+                )
+            lines.append("# TYPE http_request_duration_seconds histogram")
+            for (method, route), histogram in sorted(self.latency.items()):
+                _render_histogram(lines, "http_request_duration_seconds",
+                                  f'method="{method}",route="{route}"', histogram)
+            lines.append("# TYPE db_queries_total counter")
+            for (method, route), count in sorted(self.db_queries.items()):
+                lines.append(f'db_queries_total{{method="{method}",route="{route}"}} {count}')
+            lines.append("# TYPE db_request_time_seconds histogram")
+            for (method, route), histogram in sorted(self.db_time.items()):
+                _render_histogram(lines, "db_request_time_seconds",
+                                  f'method="{method}",route="{route}"', histogram)
+            lines.append("# TYPE db_background_query_duration_seconds histogram")
+            _render_histogram(lines, "db_background_query_duration_seconds", "",
+                              self.queries_outside_requests)
+        for name, value in sorted((gauges or {}).items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _render_histogram(lines, name, labels, histogram):
+    prefix = f"{labels}," if labels else ""
+    cumulative = 0
+    for bound, count in zip(BUCKETS, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {histogram.total}")
+    lines.append(f"{name}_count{suffix} {histogram.count}")
+
+
+registry = Registry()
+
+
+_WRITE_STATEMENT = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|COPY|CREATE|ALTER|DROP|TRUNCATE|INTO)\b", re.I)
+
+# FOR UPDATE, FOR NO KEY UPDATE, FOR SHARE and FOR KEY SHARE take row locks.
+_LOCKING_CLAUSE = re.compile(r"\bFOR\s+(NO\s+KEY\s+UPDATE|UPDATE|SHARE|KEY\s+SHARE)\b", re.I)
+
+# Any name followed by "(": a function call, or a keyword such as IN (...).
+_CALL = re.compile(r'([A-Za-z_][\w$]*|")\s*\(')
+
+# Keywords and side-effect-free functions that may precede "(" in a statement
+# safe to run twice. Anything else (nextval, pg_advisory_lock, user-defined
+# functions that write) only gets its estimated plan.
+_SAFE_CALLS = frozenset("""
+    SELECT FROM WHERE AND OR NOT IN EXISTS ANY ALL AS ON USING JOIN OVER FILTER VALUES ARRAY
+    SUM COUNT AVG MIN MAX COALESCE NULLIF GREATEST LEAST ABS ROUND LOWER UPPER LENGTH CAST
+    DATE_TRUNC EXTRACT ROW_NUMBER RANK DENSE_RANK ARRAY_AGG STRING_AGG UNNEST
+    TO_TSVECTOR TO_TSQUERY PLAINTO_TSQUERY WEBSEARCH_TO_TSQUERY TS_RANK TS_RANK_CD
+""".split())
+
+
+def _is_read_only(query):
+    """
+    Whether a statement is a plain SELECT that can safely run a second time
+    under EXPLAIN ANALYZE: no writes, no locking clause and no calls to
+    functions that may have side effects.
+    """
+    if not query.lstrip().upper().startswith(("SELECT", "WITH")):
+        return False
+    if _WRITE_STATEMENT.search(query) or _LOCKING_CLAUSE.search(query):
+        return False
+    return all(name.upper() in _SAFE_CALLS for name in _CALL.findall(query))
+
+
+# Parameter lists longer than this (e.g. executemany() rows) are only counted.
+_PARAM_TYPES_LIMIT = 20
+
+_QUOTED_LITERAL = re.compile(r"'(?:[^']|'')*'")
+
+
+def _describe_params(params):
+    """
+    Describe query parameters by their types only, never their values.
+    """
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        items = [f"{name}: {type(value).__name__}" for name, value in params.items()]
+    elif isinstance(params, (list, tuple)):
+        items = [type(value).__name__ for value in params]
+    else:
+        return type(params).__name__
+    if len(items) > _PARAM_TYPES_LIMIT:
+        return f"{len(items)} values"
+    return f"({', '.join(items)})"
+
+
+def _redact_plan(plan):
+    # psycopg2 binds parameters client-side, so their values appear in plan conditions.
+    return _QUOTED_LITERAL.sub("'?'", plan)
+
+
+class SlowQueryLog:
+    """
+    Keeps the slowest statements seen by this process and explains them out-of-band.
+
+    Plans are captured by a single daemon thread on its own connection, so the
+    request that ran the slow statement never waits for EXPLAIN. Plain SELECTs
+    are explained with ANALYZE and BUFFERS inside a transaction that is rolled
+    back. Everything else only gets its estimated plan, so it is never executed
+    twice: writes, SELECTs with a locking clause, and SELECTs calling functions
+    that may have effects a rollback does not undo (sequence advances, advisory
+    locks, functions that create partitions).
+
+    Parameters:
+    - threshold_ms: Duration above which a statement is recorded.
+    - size: Number of slowest statements kept.
+    - explain: Whether to capture execution plans.
+    """
+
+    def __init__(self, threshold_ms=SLOW_QUERY_MS, size=SLOW_QUERY_LOG_SIZE, explain=SLOW_QUERY_EXPLAIN):
+        self.threshold = threshold_ms / 1000
+        self.size = size
+        self.explain = explain
+        self.connect = None
+        self._lock = threading.Lock()
+        self._heap = []  # (duration, sequence, entry); the fastest kept entry is at the top
+        self._sequence = itertools.count()
+        self._last_explained = {}
+        self._queue = queue.Queue(maxsize=100)
+        self._worker = None
+        self._conn = None
+
+    def record(self, query, params, seconds, explainable=True):
+        """
+        Log a slow statement, keep it if it ranks among the slowest, and queue its plan.
+
+        Parameters:
+        - query: SQL text as passed to the cursor.
+        - params: Query parameters; only their types are kept.
+        - seconds: Execution time.
+        - explainable: False for executemany()/COPY, which cannot be re-planned as-is.
+        """
+        if isinstance(query, bytes):
+            query = query.decode("utf-8", "replace")
+        query = str(query)
+        stats = _current_request.get()
+        entry = {
+            "query": " ".join(query.split()),
+            "params": _describe_params(params),
+            "duration_ms": round(seconds * 1000, 3),
+            "endpoint": stats.endpoint if stats is not None else None,
+            "recorded_at": datetime.datetime.utcnow().isoformat(),
+            "plan": None,
+        }
+        logger.warning("Slow query (%.1f ms) on %s: %s params=%s", entry["duration_ms"],
+                       entry["endpoint"] or "-", entry["query"], entry["params"])
+        with self._lock:
+            item = (seconds, next(self._sequence), entry)
+            if len(self._heap) < self.size:
+                heapq.heappush(self._heap, item)
+            elif seconds > self._heap[0][0]:
+                heapq.heapreplace(self._heap, item)
+            else:
+                return
+            if not (explainable and self.explain and self.connect):
+                return
+            now = time.monotonic()
+            last = self._last_explained.get(entry["query"])
+            if last is not None and now - last < SLOW_QUERY_EXPLAIN_INTERVAL:
+                return
+            self._last_explained[entry["query"]] = now
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="slow-query-explain", daemon=True)
+                self._worker.start()
+        try:
+            self._queue.put_nowait((entry, query, params))
+        except queue.Full:
+            pass
+
+    def entries(self):
+        """
+        Return the kept statements, slowest first.
+        """
+        with self._lock:
+            return [dict(entry) for _, _, entry in sorted(self._heap, key=lambda item: item[:2], reverse=True)]
+
+    def reset(self):
+        with self._lock:
+            self._heap.clear()
+            self._last_explained.clear()
+
+    def _run(self):
+        while True:
+            entry, query, params = self._queue.get()
+            try:
+                plan = self._explain(query, params)
+            except Exception as e:
+                logger.warning("Could not explain slow query: %s", e)
+                self._discard_connection()
+                continue
+            with self._lock:
+                entry["plan"] = plan
+            logger.warning("Plan for slow query on %s:\n%s", entry["endpoint"] or "-", plan)
+
+    def _explain(self, query, params):
+        """
+        Run EXPLAIN for a statement on the worker's connection and return the plan text.
+        """
+        if self._conn is None or self._conn.closed:
+            self._conn = self.connect()
+        explain = "EXPLAIN (ANALYZE, BUFFERS)" if _is_read_only(query) else "EXPLAIN"
+        # A plain cursor, so the EXPLAIN itself is neither timed nor logged as slow.
+        cursor = self._conn.cursor(cursor_factory=extensions.cursor)
+        try:
+            cursor.execute(f"SET LOCAL statement_timeout = {SLOW_QUERY_EXPLAIN_TIMEOUT_MS};")
+            cursor.execute(f"{explain} {query.strip().rstrip(';')}", params)
+            return _redact_plan("\n".join(row[0] for row in cursor.fetchall()))
+        finally:
+            cursor.close()
+            self._conn.rollback()
+
+    def _discard_connection(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+
+slow_queries = SlowQueryLog()
+
+
+def _observe(query, params, seconds, explainable=True):
+    registry.observe_query(seconds)
+    if seconds >= slow_queries.threshold:
+        slow_queries.record(query, params, seconds, explainable)
+
+
+class TimedCursor(extensions.cursor):
+    """
+    psycopg2 cursor that reports the duration of every statement to the registry
+    and hands slow statements to the slow query log.
+    """
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _observe(query, vars, time.perf_counter() - start)
+
+    def executemany(self, query, vars_list):
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _observe(query, None, time.perf_counter() - start, explainable=False)
+
+    def copy_expert(self, sql, file, size=8192):
+        start = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            _observe(sql, None, time.perf_counter() - start, explainable=False)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency and status per route template.
+    """
+
+    def __init__(self, app, registry=registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats(f"{scope['method']} {scope['path']}")
+        token = _current_request.set(stats)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_request.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "<unmatched>"
+            self.registry.observe_request(scope["method"], route_path, status_code, elapsed, stats)
+
+
+def install(app, gauges=None, explain_connect=None):
+    """
+    Add the metrics middleware, GET /metrics and, if SLOW_QUERY_ENDPOINT is set,
+    GET /admin/slow_queries to a FastAPI app.
+
+    Parameters:
+    - app: The FastAPI application.
+    - gauges: Optional callable returning a mapping of gauge names to values,
+      evaluated on every scrape (e.g. connection pool statistics).
+    - explain_connect: Optional callable opening the dedicated connection used
+      to capture slow query plans; without it plans are not captured.
+    """
+    from fastapi.responses import PlainTextResponse
+
+    app.add_middleware(MetricsMiddleware)
+    if explain_connect is not None:
+        slow_queries.connect = explain_connect
+
+    @app.get("/metrics", include_in_schema=False, response_class=PlainTextResponse)
+    def metrics():
+        """
+        Expose collected metrics in the Prometheus text format.
+        """
+        return PlainTextResponse(
+            registry.render(gauges() if gauges else None),
+            media_type="text/plain; version=0.0.4"
+        )
+
+    if not SLOW_QUERY_ENDPOINT:
+        return
+
+    @app.get("/admin/slow_queries", include_in_schema=False)
+    def read_slow_queries():
+        """
+        List the slowest statements seen by this process, slowest first, with their plans.
+        """
+        return {"threshold_ms": slow_queries.threshold * 1000, "queries": slow_queries.entries()}
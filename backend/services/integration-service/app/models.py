@@ -4,6 +4,8 @@ Database models for the Integration Service.
 Defines SQL statements for creating the integrations table.
 """
 
+from .migrate import Migration
+
 integrations_table_creation = """
 CREATE TABLE IF NOT EXISTS integrations (
     id SERIAL PRIMARY KEY,
@@ -14,3 +16,10 @@ CREATE TABLE IF NOT EXISTS integrations (
     last_synced TIMESTAMP WITHOUT TIME ZONE
 );
 """
+
+SERVICE = "integration-service"
+
+# Applied in order by `python -m app.migrate`; never edit a released migration, add a new one.
+MIGRATIONS = [
+    Migration(1, "create tables", [integrations_table_creation]),
+]
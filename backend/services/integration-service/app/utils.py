@@ -2,7 +2,6 @@
 Utility functions for the Integration Service.
 """
 
-import requests
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,6 +17,9 @@ def sync_integration_data(integration):
     Returns:
     - None
     """
+    # Imported lazily to keep requests off the Lambda cold-start path
+    import requests
+
     # Placeholder for actual synchronization logic
     logger.info(f"Synchronizing data for integration '{integration.name}'")
     # Example: Send a GET request to the endpoint URL
@@ -0,0 +1,23 @@
+"""
+Test cases for the Integration Service.
+"""
+
+from fastapi.testclient import TestClient
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_create_integration_round_trips(recording_db):
+    recording_db.rows = [None, (6, "Stripe", "https://api.stripe.com", "2024-03-01T00:00:00")]
+    response = client.post("/integrations/", json={
+        "name": "Stripe",
+        "endpoint_url": "https://api.stripe.com",
+        "api_key": "key",
+        "api_secret": "secret"
+    })
+    assert response.status_code == 201
+    assert response.json() == {"id": 6, "name": "Stripe", "endpoint_url": "https://api.stripe.com",
+                               "last_synced": "2024-03-01T00:00:00"}
+    # Duplicate-name check plus the INSERT, whose RETURNING row is the response.
+    assert len(recording_db.queries) == 2
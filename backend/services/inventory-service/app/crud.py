@@ -7,24 +7,33 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+ITEM_COLUMNS = "id, name, description, quantity, price"
+
+
+def _row_to_item(row):
+    """
+    Map a row selected with ITEM_COLUMNS to an InventoryItem schema.
+    """
+    return schemas.InventoryItem(
+        id=row[0],
+        name=row[1],
+        description=row[2],
+        quantity=row[3],
+        price=float(row[4])
+    )
+
 
 def get_item(db, item_id: int):
     """
     Retrieve an item by ID.
     """
     cursor = db.cursor()
-    sql = "SELECT id, name, description, quantity, price FROM inventory_items WHERE id = %s;"
+    sql = f"SELECT {ITEM_COLUMNS} FROM inventory_items WHERE id = %s;"
     cursor.execute(sql, (item_id,))
     row = cursor.fetchone()
     cursor.close()
     if row:
-        return schemas.InventoryItem(
-            id=row[0],
-            name=row[1],
-            description=row[2],
-            quantity=row[3],
-            price=float(row[4])
-        )
+        return _row_to_item(row)
     return None
 
 
@@ -33,18 +42,12 @@ def get_item_by_name(db, name: str):
     Retrieve an item by name.
     """
     cursor = db.cursor()
-    sql = "SELECT id, name, description, quantity, price FROM inventory_items WHERE name = %s;"
+    sql = f"SELECT {ITEM_COLUMNS} FROM inventory_items WHERE name = %s;"
     cursor.execute(sql, (name,))
     row = cursor.fetchone()
     cursor.close()
     if row:
-        return schemas.InventoryItem(
-            id=row[0],
-            name=row[1],
-            description=row[2],
-            quantity=row[3],
-            price=float(row[4])
-        )
+        return _row_to_item(row)
     return None
 
 
@@ -53,23 +56,22 @@ def create_item(db, item: schemas.InventoryItemCreate):
     Create a new inventory item.
     """
     cursor = db.cursor()
-    sql = """
+    sql = f"""
         INSERT INTO inventory_items (name, description, quantity, price)
-        VALUES (%s, %s, %s, %s) RETURNING id;
+        VALUES (%s, %s, %s, %s) RETURNING {ITEM_COLUMNS};
     """
     params = (item.name, item.description, item.quantity, item.price)
     cursor.execute(sql, params)
-    item_id = cursor.fetchone()[0]
+    row = cursor.fetchone()
     db.commit()
     cursor.close()
-    return get_item(db, item_id)
+    return _row_to_item(row)
 
 
 def update_item(db, item_id: int, item: schemas.InventoryItemUpdate):
     """
     Update an existing inventory item.
     """
-    cursor = db.cursor()
     fields = []
     params = []
     if item.name is not None:
@@ -84,12 +86,18 @@ def update_item(db, item_id: int, item: schemas.InventoryItemUpdate):
     if item.quantity is not None:
         fields.append("quantity = %s")
         params.append(item.quantity)
+    if not fields:
+        return get_item(db, item_id)
     params.append(item_id)
-    sql = f"UPDATE inventory_items SET {', '.join(fields)} WHERE id = %s;"
+    sql = f"UPDATE inventory_items SET {', '.join(fields)} WHERE id = %s RETURNING {ITEM_COLUMNS};"
+    cursor = db.cursor()
     cursor.execute(sql, params)
+    row = cursor.fetchone()
     db.commit()
     cursor.close()
-    return get_item(db, item_id)
+    if row:
+        return _row_to_item(row)
+    return None
 
 
 def delete_item(db, item_id: int):
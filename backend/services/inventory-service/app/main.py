@@ -5,10 +5,8 @@ This module initializes the FastAPI app and defines the endpoints for managing i
 """
 
 from fastapi import FastAPI, Depends, HTTPException, status
-from . import schemas, crud, utils
+from . import schemas, crud, utils, database, instrumentation
 import logging
-import psycopg2
-import os
 
 # Initialize FastAPI app
 app = FastAPI(title="Inventory Service", description="Inventory management endpoints")
@@ -21,17 +19,21 @@ def get_db():
     """
     Dependency to get a database connection.
     """
-    conn = psycopg2.connect(
-        host=os.environ.get("DB_HOST"),
-        port=int(os.environ.get("DB_PORT", 5432)),
-        database=os.environ.get("DB_NAME"),
-        user=os.environ.get("DB_USER"),
-        password=os.environ.get("DB_PASSWORD")
-    )
+    db = database.get_connection()
     try:
-        yield conn
+        yield db
     finally:
-        conn.close()
+        database.release_connection(db)
+
+@app.on_event("startup")
+def warm_up():
+    """
+    Pre-open pooled database connections once per container.
+    """
+    database.warm_pool()
+
+# Per-route metrics on GET /metrics and the slow query log on GET /admin/slow_queries.
+instrumentation.install(app, gauges=database.pool_gauges, explain_connect=database.dedicated_connection)
 
 @app.post("/items/", response_model=schemas.InventoryItem, status_code=status.HTTP_201_CREATED)
 def create_item(item: schemas.InventoryItemCreate, db=Depends(get_db)):
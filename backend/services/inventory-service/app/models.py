@@ -4,6 +4,8 @@ Database models for the Inventory Service.
 Defines SQL statements for creating the inventory_items table.
 """
 
+from .migrate import Migration
+
 inventory_item_table_creation = """
 CREATE TABLE IF NOT EXISTS inventory_items (
     id SERIAL PRIMARY KEY,
@@ -13,3 +15,10 @@ CREATE TABLE IF NOT EXISTS inventory_items (
     price NUMERIC(12, 2) NOT NULL
 );
 """
+
+SERVICE = "inventory-service"
+
+# Applied in order by `python -m app.migrate`; never edit a released migration, add a new one.
+MIGRATIONS = [
+    Migration(1, "create tables", [inventory_item_table_creation]),
+]
@@ -0,0 +1,33 @@
+"""
+Test cases for the Inventory Service.
+"""
+
+from fastapi.testclient import TestClient
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_create_item_round_trips(recording_db):
+    recording_db.rows = [None, (4, "Widget", "Blue widget", 10, 2.5)]
+    response = client.post("/items/", json={
+        "name": "Widget",
+        "description": "Blue widget",
+        "price": 2.5,
+        "quantity": 10
+    })
+    assert response.status_code == 201
+    assert response.json() == {"id": 4, "name": "Widget", "description": "Blue widget", "quantity": 10,
+                               "price": 2.5}
+    # Duplicate-name check plus the INSERT, whose RETURNING row is the response.
+    assert len(recording_db.queries) == 2
+
+
+def test_update_item_single_round_trip(recording_db):
+    recording_db.rows = [(4, "Widget", "Blue widget", 12, 2.5)]
+    response = client.put("/items/4", json={"quantity": 12})
+    assert response.status_code == 200
+    # The unchanged fields come from the UPDATE's RETURNING row too; nothing is read back.
+    assert response.json() == {"id": 4, "name": "Widget", "description": "Blue widget", "quantity": 12,
+                               "price": 2.5}
+    assert len(recording_db.queries) == 1
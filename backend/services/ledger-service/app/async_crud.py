@@ -0,0 +1,82 @@
+"""
+Asynchronous CRUD operations for the Ledger Service using asyncpg.
+
+Mirrors crud.py for the endpoints served by async_main.py.
+"""
+
+from . import schemas
+from .crud import ACCOUNT_COLUMNS, _row_to_account
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def get_account(db, account_id: int):
+    """
+    Retrieve an account by ID.
+    """
+    row = await db.fetchrow(f"SELECT {ACCOUNT_COLUMNS} FROM accounts WHERE id = $1;", account_id)
+    if row:
+        return _row_to_account(row)
+    return None
+
+
+async def get_account_by_name(db, name: str):
+    """
+    Retrieve an account by name.
+    """
+    row = await db.fetchrow(f"SELECT {ACCOUNT_COLUMNS} FROM accounts WHERE name = $1;", name)
+    if row:
+        return _row_to_account(row)
+    return None
+
+
+async def create_account(db, account: schemas.AccountCreate):
+    """
+    Create a new account; its initial balance is recorded as its opening balance.
+    """
+    row = await db.fetchrow(
+        f"""
+        INSERT INTO accounts (name, type, balance, opening_balance)
+        VALUES ($1, $2, $3, $3) RETURNING {ACCOUNT_COLUMNS};
+        """,
+        account.name,
+        account.type,
+        account.balance
+    )
+    return _row_to_account(row)
+
+
+async def update_account(db, account_id: int, account: schemas.AccountUpdate):
+    """
+    Update an existing account; setting the balance moves the opening balance by the same amount.
+    """
+    fields = []
+    params = []
+    for column in ("name", "type", "balance"):
+        value = getattr(account, column)
+        if value is not None:
+            params.append(value)
+            fields.append(f"{column} = ${len(params)}")
+    if account.balance is not None:
+        # As in crud.update_account: the directly set part of the balance moves the opening balance.
+        fields.append(f"opening_balance = opening_balance + (${len(params)} - COALESCE(balance, 0))")
+    if not fields:
+        return await get_account(db, account_id)
+    params.append(account_id)
+    row = await db.fetchrow(
+        f"UPDATE accounts SET {', '.join(fields)} WHERE id = ${len(params)} "
+        f"RETURNING {ACCOUNT_COLUMNS};",
+        *params
+    )
+    if row:
+        return _row_to_account(row)
+    return None
+
+
+async def delete_account(db, account_id: int):
+    """
+    Delete an account.
+    """
+    status = await db.execute("DELETE FROM accounts WHERE id = $1;", account_id)
+    return status != "DELETE 0"
@@ -0,0 +1,91 @@
+"""
+Async endpoint variants for the Ledger Service.
+
+When DB_ENGINE=asyncpg, install() swaps the blocking account endpoints in
+main.py for these coroutine handlers, which run on the event loop instead of
+FastAPI's threadpool.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.routing import APIRoute
+from . import schemas, async_crud, async_database
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.post("/accounts/", response_model=schemas.Account, status_code=status.HTTP_201_CREATED)
+async def create_account(account: schemas.AccountCreate, db=Depends(async_database.get_db)):
+    """
+    Create a new account in the ledger.
+    """
+    try:
+        existing_account = await async_crud.get_account_by_name(db, account.name)
+    except Exception as e:
+        logger.exception("Error creating account")
+        raise HTTPException(status_code=400, detail=str(e))
+    if existing_account:
+        raise HTTPException(status_code=400, detail="Account already exists")
+    try:
+        return await async_crud.create_account(db, account)
+    except Exception as e:
+        logger.exception("Error creating account")
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/accounts/{account_id}", response_model=schemas.Account)
+async def read_account(account_id: int, db=Depends(async_database.get_db)):
+    """
+    Retrieve an account by its ID.
+    """
+    account = await async_crud.get_account(db, account_id)
+    if not account:
+        raise HTTPException(status_code=404, detail="Account not found")
+    return account
+
+
+@router.put("/accounts/{account_id}", response_model=schemas.Account)
+async def update_account(account_id: int, account: schemas.AccountUpdate, db=Depends(async_database.get_db)):
+    """
+    Update an existing account.
+    """
+    try:
+        updated_account = await async_crud.update_account(db, account_id, account)
+    except Exception as e:
+        logger.exception("Error updating account")
+        raise HTTPException(status_code=400, detail=str(e))
+    if not updated_account:
+        raise HTTPException(status_code=404, detail="Account not found")
+    return updated_account
+
+
+@router.delete("/accounts/{account_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_account(account_id: int, db=Depends(async_database.get_db)):
+    """
+    Delete an account by its ID.
+    """
+    try:
+        result = await async_crud.delete_account(db, account_id)
+    except Exception as e:
+        logger.exception("Error deleting account")
+        raise HTTPException(status_code=400, detail=str(e))
+    if not result:
+        raise HTTPException(status_code=404, detail="Account not found")
+
+
+def install(app):
+    """
+    Replace the matching synchronous routes on `app` with the async variants.
+
+    Parameters:
+    - app: The FastAPI application from main.py.
+    """
+    replaced = {(route.path, method) for route in router.routes for method in route.methods}
+    app.router.routes = [
+        route for route in app.router.routes
+        if not (isinstance(route, APIRoute)
+                and any((route.path, method) in replaced for method in route.methods))
+    ]
+    app.include_router(router)
@@ -7,23 +7,32 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+ACCOUNT_COLUMNS = "id, name, type, balance"
+
+
+def _row_to_account(row):
+    """
+    Map a row selected with ACCOUNT_COLUMNS to an Account schema.
+    """
+    return schemas.Account(
+        id=row[0],
+        name=row[1],
+        type=row[2],
+        balance=float(row[3])
+    )
+
 
 def get_account(db, account_id: int):
     """
     Retrieve an account by ID.
     """
     cursor = db.cursor()
-    sql = "SELECT id, name, type, balance FROM accounts WHERE id = %s;"
+    sql = f"SELECT {ACCOUNT_COLUMNS} FROM accounts WHERE id = %s;"
     cursor.execute(sql, (account_id,))
     row = cursor.fetchone()
     cursor.close()
     if row:
-        return schemas.Account(
-            id=row[0],
-            name=row[1],
-            type=row[2],
-            balance=float(row[3])
-        )
+        return _row_to_account(row)
     return None
 
 
@@ -32,42 +41,39 @@ def get_account_by_name(db, name: str):
     Retrieve an account by name.
     """
     cursor = db.cursor()
-    sql = "SELECT id, name, type, balance FROM accounts WHERE name = %s;"
+    sql = f"SELECT {ACCOUNT_COLUMNS} FROM accounts WHERE name = %s;"
     cursor.execute(sql, (name,))
     row = cursor.fetchone()
     cursor.close()
     if row:
-        return schemas.Account(
-            id=row[0],
-            name=row[1],
-            type=row[2],
-            balance=float(row[3])
-        )
+        return _row_to_account(row)
     return None
 
 
 def create_account(db, account: schemas.AccountCreate):
     """
-    Create a new account.
+    Create a new account; its initial balance is recorded as its opening balance.
     """
     cursor = db.cursor()
-    sql = """
-        INSERT INTO accounts (name, type, balance)
-        VALUES (%s, %s, %s) RETURNING id;
+    sql = f"""
+        INSERT INTO accounts (name, type, balance, opening_balance)
+        VALUES (%s, %s, %s, %s) RETURNING {ACCOUNT_COLUMNS};
     """
-    params = (account.name, account.type, account.balance)
+    params = (account.name, account.type, account.balance, account.balance)
     cursor.execute(sql, params)
-    account_id = cursor.fetchone()[0]
+    row = cursor.fetchone()
     db.commit()
     cursor.close()
-    return get_account(db, account_id)
+    return _row_to_account(row)
 
 
 def update_account(db, account_id: int, account: schemas.AccountUpdate):
     """
     Update an existing account.
+
+    Setting the balance directly moves the opening balance by the same amount,
+    so transaction-service's balance rebuild keeps the adjustment.
     """
-    cursor = db.cursor()
     fields = []
     params = []
     if account.name is not None:
@@ -78,13 +84,20 @@ def update_account(db, account_id: int, account: schemas.AccountUpdate):
         params.append(account.type)
     if account.balance is not None:
         fields.append("balance = %s")
-        params.append(account.balance)
+        fields.append("opening_balance = opening_balance + (%s - COALESCE(balance, 0))")
+        params.extend([account.balance, account.balance])
+    if not fields:
+        return get_account(db, account_id)
     params.append(account_id)
-    sql = f"UPDATE accounts SET {', '.join(fields)} WHERE id = %s;"
+    sql = f"UPDATE accounts SET {', '.join(fields)} WHERE id = %s RETURNING {ACCOUNT_COLUMNS};"
+    cursor = db.cursor()
     cursor.execute(sql, params)
+    row = cursor.fetchone()
     db.commit()
     cursor.close()
-    return get_account(db, account_id)
+    if row:
+        return _row_to_account(row)
+    return None
 
 
 def delete_account(db, account_id: int):
@@ -6,10 +6,8 @@ and the general ledger.
 """
 
 from fastapi import FastAPI, Depends, HTTPException, status
-from . import schemas, crud, utils
+from . import schemas, crud, utils, database, async_database, instrumentation
 import logging
-import psycopg2
-import os
 
 # Initialize FastAPI app
 app = FastAPI(title="Ledger Service", description="Ledger management endpoints")
@@ -23,17 +21,23 @@ def get_db():
     """
     Dependency to get a database connection.
     """
-    conn = psycopg2.connect(
-        host=os.environ.get("DB_HOST"),
-        port=int(os.environ.get("DB_PORT", 5432)),
-        database=os.environ.get("DB_NAME"),
-        user=os.environ.get("DB_USER"),
-        password=os.environ.get("DB_PASSWORD")
-    )
+    db = database.get_connection()
     try:
-        yield conn
+        yield db
     finally:
-        conn.close()
+        database.release_connection(db)
+
+
+@app.on_event("startup")
+def warm_up():
+    """
+    Pre-open pooled database connections once per container.
+    """
+    database.warm_pool()
+
+
+# Per-route metrics on GET /metrics and the slow query log on GET /admin/slow_queries.
+instrumentation.install(app, gauges=database.pool_gauges, explain_connect=database.dedicated_connection)
 
 
 @app.post("/accounts/", response_model=schemas.Account, status_code=status.HTTP_201_CREATED)
@@ -111,3 +115,9 @@ def delete_account(account_id: int, db=Depends(get_db)):
     except Exception as e:
         logger.exception("Error deleting account")
         raise HTTPException(status_code=400, detail=str(e))
+
+
+# Serve the hot endpoints from the asyncpg engine when DB_ENGINE=asyncpg.
+if async_database.ENABLED:
+    from . import async_main
+    async_main.install(app)
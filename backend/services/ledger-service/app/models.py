@@ -4,6 +4,8 @@ Database models for the Ledger Service.
 Defines SQL statements for creating the accounts table.
 """
 
+from .migrate import Migration
+
 account_table_creation = """
 CREATE TABLE IF NOT EXISTS accounts (
     id SERIAL PRIMARY KEY,
@@ -12,3 +14,26 @@ CREATE TABLE IF NOT EXISTS accounts (
     balance NUMERIC(12, 2) DEFAULT 0.0
 );
 """
+
+accounts_type_index_creation = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_accounts_type
+ON accounts (type) INCLUDE (id, balance);
+"""
+
+# The part of the balance set directly here rather than by transactions;
+# transaction-service's balance rebuild adds transactions on top of it.
+account_opening_balance_column = """
+ALTER TABLE accounts ADD COLUMN IF NOT EXISTS opening_balance NUMERIC(12, 2) NOT NULL DEFAULT 0;
+"""
+
+SERVICE = "ledger-service"
+
+# Applied in order by `python -m app.migrate`; never edit a released migration, add a new one.
+MIGRATIONS = [
+    Migration(1, "create tables", [account_table_creation]),
+    # Built without blocking writes, for lookups of accounts by type.
+    Migration(2, "add indexes", [
+        accounts_type_index_creation,
+    ], transactional=False),
+    Migration(3, "account opening balances", [account_opening_balance_column]),
+]
@@ -31,3 +31,25 @@ def test_update_account():
 def test_delete_account():
     response = client.delete("/accounts/1")
     assert response.status_code == 204
+
+
+def test_create_account_round_trips(recording_db):
+    recording_db.rows = [None, (5, "Cash", "Asset", 1000.0)]
+    response = client.post("/accounts/", json={
+        "name": "Cash",
+        "type": "Asset",
+        "balance": 1000.0
+    })
+    assert response.status_code == 201
+    assert response.json() == {"id": 5, "name": "Cash", "type": "Asset", "balance": 1000.0}
+    # Duplicate-name check plus the INSERT, whose RETURNING row is the response.
+    assert len(recording_db.queries) == 2
+
+
+def test_update_account_single_round_trip(recording_db):
+    recording_db.rows = [(5, "Cash", "Asset", 1500.0)]
+    response = client.put("/accounts/5", json={"balance": 1500.0})
+    assert response.status_code == 200
+    # The unchanged fields come from the UPDATE's RETURNING row too; nothing is read back.
+    assert response.json() == {"id": 5, "name": "Cash", "type": "Asset", "balance": 1500.0}
+    assert len(recording_db.queries) == 1
@@ -0,0 +1,114 @@
+"""
+Test cases run against a real PostgreSQL database.
+
+They apply the service's migrations in a scratch schema and check what the
+account statements actually write. They are skipped unless TEST_DB_NAME
+names a database the DB_HOST/DB_PORT/DB_USER/DB_PASSWORD credentials can
+create schemas in; the schema is dropped afterwards.
+"""
+
+from app import async_crud, crud, migrate, models, schemas
+import asyncio
+import asyncpg
+import os
+import psycopg2
+import pytest
+
+pytestmark = pytest.mark.skipif(not os.environ.get("TEST_DB_NAME"), reason="TEST_DB_NAME is not set")
+
+SCHEMA = f"ledger_service_test_{os.getpid()}"
+
+
+def _connect():
+    return psycopg2.connect(
+        host=os.environ.get("DB_HOST"),
+        port=int(os.environ.get("DB_PORT", 5432)),
+        database=os.environ.get("TEST_DB_NAME"),
+        user=os.environ.get("DB_USER"),
+        password=os.environ.get("DB_PASSWORD"),
+        options=f"-c search_path={SCHEMA}"
+    )
+
+
+@pytest.fixture(scope="module")
+def migrated():
+    conn = _connect()
+    cursor = conn.cursor()
+    cursor.execute(f'CREATE SCHEMA "{SCHEMA}";')
+    conn.commit()
+    try:
+        migrate.apply_migrations(conn, models.SERVICE, models.MIGRATIONS)
+        yield conn
+    finally:
+        conn.rollback()
+        cursor.execute(f'DROP SCHEMA "{SCHEMA}" CASCADE;')
+        conn.commit()
+        conn.close()
+
+
+@pytest.fixture
+def db(migrated):
+    cursor = migrated.cursor()
+    cursor.execute("TRUNCATE accounts RESTART IDENTITY;")
+    migrated.commit()
+    yield migrated
+    migrated.rollback()
+
+
+def _run_async(operation):
+    async def run():
+        conn = await asyncpg.connect(
+            host=os.environ.get("DB_HOST"), port=int(os.environ.get("DB_PORT", 5432)),
+            database=os.environ.get("TEST_DB_NAME"), user=os.environ.get("DB_USER"),
+            password=os.environ.get("DB_PASSWORD"), server_settings={"search_path": SCHEMA}
+        )
+        try:
+            return await operation(conn)
+        finally:
+            await conn.close()
+
+    return asyncio.run(run())
+
+
+def _transaction_amounts(db):
+    """
+    Map account id to balance minus opening balance: the part transaction-service's rebuild recomputes.
+    """
+    cursor = db.cursor()
+    cursor.execute("SELECT id, balance - opening_balance FROM accounts ORDER BY id;")
+    amounts = {row[0]: float(row[1]) for row in cursor.fetchall()}
+    cursor.close()
+    db.commit()
+    return amounts
+
+
+def _post_transaction(db, account_id, amount):
+    # transaction-service applying a transaction to the balance.
+    cursor = db.cursor()
+    cursor.execute("UPDATE accounts SET balance = balance + %s WHERE id = %s;", (amount, account_id))
+    cursor.close()
+    db.commit()
+
+
+@pytest.mark.parametrize("engine", ["psycopg2", "asyncpg"])
+def test_directly_set_balances_survive_a_rebuild(db, engine):
+    if engine == "asyncpg":
+        def create(account):
+            return _run_async(lambda conn: async_crud.create_account(conn, account))
+
+        def update(account_id, account):
+            return _run_async(lambda conn: async_crud.update_account(conn, account_id, account))
+    else:
+        def create(account):
+            return crud.create_account(db, account)
+
+        def update(account_id, account):
+            return crud.update_account(db, account_id, account)
+
+    create(schemas.AccountCreate(name="Cash", type="Asset", balance=250))
+    create(schemas.AccountCreate(name="Bank", type="Asset", balance=0))
+    _post_transaction(db, 2, 10)
+    assert update(2, schemas.AccountUpdate(balance=75)).balance == 75.0
+    update(1, schemas.AccountUpdate(name="Petty cash"))
+    # Only the 10 posted by a transaction is left for the rebuild to recompute.
+    assert _transaction_amounts(db) == {1: 0.0, 2: 10.0}
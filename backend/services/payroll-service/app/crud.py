@@ -7,6 +7,38 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+EMPLOYEE_COLUMNS = "id, full_name, email, position, salary, date_hired"
+PAYROLL_RECORD_COLUMNS = "id, employee_id, pay_date, gross_pay, net_pay, deductions, taxes"
+
+
+def _row_to_employee(row):
+    """
+    Map a row selected with EMPLOYEE_COLUMNS to an Employee schema.
+    """
+    return schemas.Employee(
+        id=row[0],
+        full_name=row[1],
+        email=row[2],
+        position=row[3],
+        salary=row[4],
+        date_hired=row[5]
+    )
+
+
+def _row_to_payroll_record(row):
+    """
+    Map a row selected with PAYROLL_RECORD_COLUMNS to a PayrollRecord schema.
+    """
+    return schemas.PayrollRecord(
+        id=row[0],
+        employee_id=row[1],
+        pay_date=row[2],
+        gross_pay=row[3],
+        net_pay=row[4],
+        deductions=row[5],
+        taxes=row[6]
+    )
+
 
 # Employee CRUD Operations
 
@@ -15,9 +47,9 @@ def create_employee(db, employee: schemas.EmployeeCreate):
     Create a new employee.
     """
     cursor = db.cursor()
-    sql = """
+    sql = f"""
         INSERT INTO employees (full_name, email, position, salary, date_hired)
-        VALUES (%s, %s, %s, %s, %s) RETURNING id;
+        VALUES (%s, %s, %s, %s, %s) RETURNING {EMPLOYEE_COLUMNS};
     """
     params = (
         employee.full_name,
@@ -27,10 +59,10 @@ def create_employee(db, employee: schemas.EmployeeCreate):
         employee.date_hired
     )
     cursor.execute(sql, params)
-    employee_id = cursor.fetchone()[0]
+    row = cursor.fetchone()
     db.commit()
     cursor.close()
-    return get_employee(db, employee_id)
+    return _row_to_employee(row)
 
 
 def get_employee(db, employee_id: int):
@@ -38,22 +70,12 @@ def get_employee(db, employee_id: int):
     Retrieve an employee by ID.
     """
     cursor = db.cursor()
-    sql = """
-        SELECT id, full_name, email, position, salary, date_hired
-        FROM employees WHERE id = %s;
-    """
+    sql = f"SELECT {EMPLOYEE_COLUMNS} FROM employees WHERE id = %s;"
     cursor.execute(sql, (employee_id,))
     row = cursor.fetchone()
     cursor.close()
     if row:
-        return schemas.Employee(
-            id=row[0],
-            full_name=row[1],
-            email=row[2],
-            position=row[3],
-            salary=row[4],
-            date_hired=row[5]
-        )
+        return _row_to_employee(row)
     return None
 
 
@@ -65,7 +87,6 @@ def create_payroll_record(db, payroll_request: schemas.PayrollCreate):
 
     Calculates taxes and deductions, and inserts the record into the database.
     """
-    cursor = db.cursor()
     # Retrieve employee salary
     employee = get_employee(db, payroll_request.employee_id)
     if not employee:
@@ -76,9 +97,9 @@ def create_payroll_record(db, payroll_request: schemas.PayrollCreate):
     deductions = utils.calculate_deductions(gross_pay)
     net_pay = gross_pay - taxes - deductions
 
-    sql = """
+    sql = f"""
         INSERT INTO payroll_records (employee_id, pay_date, gross_pay, net_pay, deductions, taxes)
-        VALUES (%s, %s, %s, %s, %s, %s) RETURNING id;
+        VALUES (%s, %s, %s, %s, %s, %s) RETURNING {PAYROLL_RECORD_COLUMNS};
     """
     params = (
         payroll_request.employee_id,
@@ -88,11 +109,12 @@ def create_payroll_record(db, payroll_request: schemas.PayrollCreate):
         deductions,
         taxes
     )
+    cursor = db.cursor()
     cursor.execute(sql, params)
-    payroll_id = cursor.fetchone()[0]
+    row = cursor.fetchone()
     db.commit()
     cursor.close()
-    return get_payroll_record(db, payroll_id)
+    return _row_to_payroll_record(row)
 
 
 def get_payroll_record(db, payroll_id: int):
@@ -100,21 +122,10 @@ def get_payroll_record(db, payroll_id: int):
     Retrieve a payroll record by ID.
     """
     cursor = db.cursor()
-    sql = """
-        SELECT id, employee_id, pay_date, gross_pay, net_pay, deductions, taxes
-        FROM payroll_records WHERE id = %s;
-    """
+    sql = f"SELECT {PAYROLL_RECORD_COLUMNS} FROM payroll_records WHERE id = %s;"
     cursor.execute(sql, (payroll_id,))
     row = cursor.fetchone()
     cursor.close()
     if row:
-        return schemas.PayrollRecord(
-            id=row[0],
-            employee_id=row[1],
-            pay_date=row[2],
-            gross_pay=row[3],
-            net_pay=row[4],
-            deductions=row[5],
-            taxes=row[6]
-        )
+        return _row_to_payroll_record(row)
     return None
@@ -1,22 +1,345 @@
 """
 Database connection management using AWS RDS PostgreSQL.
+
+Connections are handed out from a process-wide pool so that warm Lambda
+containers and long-running uvicorn workers reuse established sessions instead
+of paying the TCP/TLS/auth handshake on every request.
 """
 
-import psycopg2
+import collections
+import logging
 import os
+import threading
+import time
 
-def get_connection():
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+from . import instrumentation
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """
+    Raised when no connection becomes available within the checkout timeout.
     """
-    Establishes a connection to the AWS RDS PostgreSQL database.
+
+
+def _connect():
+    """
+    Open a new physical connection to the AWS RDS PostgreSQL database.
 
     Returns:
     - A database connection object.
     """
-    conn = psycopg2.connect(
+    return psycopg2.connect(
         host=os.environ.get("DB_HOST"),
         port=int(os.environ.get("DB_PORT", 5432)),
         database=os.environ.get("DB_NAME"),
         user=os.environ.get("DB_USER"),
-        password=os.environ.get("DB_PASSWORD")
+        password=os.environ.get("DB_PASSWORD"),
+        cursor_factory=instrumentation.TimedCursor
     )
-    return conn
+
+
+class ConnectionPool:
+    """
+    Thread-safe, bounded pool of PostgreSQL connections.
+
+    Parameters:
+    - connect: Callable returning a new connection.
+    - min_size: Number of connections opened by warm().
+    - max_size: Upper bound on open connections; checkouts wait beyond it.
+    - max_age: Seconds after which a connection is retired instead of reused.
+    - check_after: Idle seconds after which a checkout pings the server first.
+    - timeout: Seconds a checkout waits for a free connection.
+    """
+
+    def __init__(self, connect=_connect, min_size=1, max_size=10, max_age=1800.0,
+                 check_after=30.0, timeout=30.0):
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max(max_size, 1)
+        self.max_age = max_age
+        self.check_after = check_after
+        self.timeout = timeout
+        self.closed = False
+        self._cond = threading.Condition()
+        self._idle = collections.deque()  # (conn, created_at, released_at)
+        self._in_use = {}  # id(conn) -> created_at
+        self._size = 0
+        self._counters = collections.Counter()
+
+    def warm(self):
+        """
+        Open connections until at least min_size are available.
+        """
+        while True:
+            with self._cond:
+                if self.closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            conn = self._open()
+            now = time.monotonic()
+            with self._cond:
+                self._idle.append((conn, now, now))
+                self._cond.notify()
+
+    def getconn(self):
+        """
+        Check out a healthy connection, opening one if the pool has room.
+
+        Returns:
+        - A database connection object; hand it back with putconn().
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            entry = self._reserve(deadline)
+            if entry is None:
+                conn = self._open()
+                created = time.monotonic()
+            else:
+                conn, created, released = entry
+                if not self._is_healthy(conn, created, released):
+                    self._discard(conn)
+                    continue
+            with self._cond:
+                self._in_use[id(conn)] = created
+                self._counters["checkouts"] += 1
+            return conn
+
+    def putconn(self, conn, close=False):
+        """
+        Return a connection to the pool.
+
+        Parameters:
+        - conn: Connection previously obtained from getconn().
+        - close: Close the connection instead of keeping it for reuse.
+        """
+        with self._cond:
+            created = self._in_use.pop(id(conn), None)
+        if created is None:
+            # Not ours (e.g. checked out before a fork); just get rid of it.
+            if not conn.closed:
+                conn.close()
+            return
+        if not close and not conn.closed:
+            status = conn.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                close = True
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    close = True
+        now = time.monotonic()
+        if close or conn.closed or self.closed or now - created > self.max_age:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, created, now))
+            self._cond.notify()
+
+    def closeall(self):
+        """
+        Close every idle connection and refuse further checkouts.
+        """
+        with self._cond:
+            self.closed = True
+            idle = [entry[0] for entry in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def stats(self):
+        """
+        Snapshot of pool occupancy and lifetime counters.
+
+        Returns:
+        - Dictionary of gauges (size, idle, in_use) and counters.
+        """
+        with self._cond:
+            snapshot = {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            }
+            for name in ("checkouts", "connections_opened", "connections_closed",
+                         "health_checks", "waits", "timeouts"):
+                snapshot[name] = self._counters[name]
+        return snapshot
+
+    def _reserve(self, deadline):
+        """
+        Pop an idle connection or reserve a slot for a new one.
+
+        Returns:
+        - An idle (conn, created_at, released_at) tuple, or None if a new
+          connection should be opened.
+        """
+        with self._cond:
+            while True:
+                if self.closed:
+                    raise PoolError("connection pool is closed")
+                if self._idle:
+                    # LIFO keeps the most recently used connections hot.
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"no database connection available within {self.timeout}s"
+                    )
+                self._counters["waits"] += 1
+                self._cond.wait(remaining)
+
+    def _open(self):
+        """
+        Open a connection for a slot already reserved in _size.
+        """
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._counters["connections_opened"] += 1
+        return conn
+
+    def _is_healthy(self, conn, created, released):
+        """
+        Decide whether an idle connection can be handed out again.
+        """
+        if conn.closed:
+            return False
+        now = time.monotonic()
+        if now - created > self.max_age:
+            return False
+        if conn.info.transaction_status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if now - released < self.check_after:
+            return True
+        with self._cond:
+            self._counters["health_checks"] += 1
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1;")
+            cursor.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        """
+        Close a connection and free its slot.
+        """
+        self._close_quietly(conn)
+        with self._cond:
+            self._size -= 1
+            self._counters["connections_closed"] += 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            logger.debug("Ignoring error while closing connection", exc_info=True)
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Return the process-wide connection pool, creating it on first use.
+
+    The pool lives at module level so it survives across warm Lambda
+    invocations; it is rebuilt after a fork so children never share sockets.
+
+    Returns:
+    - ConnectionPool instance.
+    """
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = ConnectionPool(
+                    min_size=int(os.environ.get("DB_POOL_MIN_SIZE", 1)),
+                    max_size=int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+                    max_age=float(os.environ.get("DB_POOL_MAX_AGE", 1800)),
+                    check_after=float(os.environ.get("DB_POOL_CHECK_AFTER", 30)),
+                    timeout=float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+                )
+                _pool_pid = pid
+    return _pool
+
+
+def warm_pool():
+    """
+    Open the pool's minimum number of connections ahead of the first request.
+
+    Cheap to call repeatedly (Mangum runs startup hooks on every invocation).
+    Failures are logged rather than raised so an unreachable database does
+    not stop the app from starting.
+    """
+    try:
+        get_pool().warm()
+    except Exception:
+        logger.exception("Could not pre-open database connections")
+
+
+def get_connection():
+    """
+    Check out a connection to the AWS RDS PostgreSQL database from the pool.
+
+    Returns:
+    - A database connection object; hand it back with release_connection().
+    """
+    return get_pool().getconn()
+
+
+def dedicated_connection():
+    """
+    Open a connection outside the pool for background work such as plan capture.
+
+    Returns:
+    - A database connection object; the caller closes it.
+    """
+    return _connect()
+
+
+def release_connection(conn, discard=False):
+    """
+    Return a connection obtained from get_connection() to the pool.
+
+    Parameters:
+    - conn: The database connection.
+    - discard: Close the connection instead of keeping it for reuse.
+    """
+    get_pool().putconn(conn, close=discard)
+
+
+def pool_gauges():
+    """
+    Connection pool statistics named for the /metrics endpoint.
+
+    Returns:
+    - Dictionary mapping metric names to current values.
+    """
+    return {f"db_pool_{name}": value for name, value in get_pool().stats().items()}
@@ -6,7 +6,7 @@ and processing payroll.
 """
 
 from fastapi import FastAPI, Depends, HTTPException, status
-from . import schemas, crud, utils, database
+from . import schemas, crud, utils, database, instrumentation
 import logging
 
 # Initialize FastAPI app
@@ -25,7 +25,19 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
+        database.release_connection(db)
+
+
+@app.on_event("startup")
+def warm_up():
+    """
+    Pre-open pooled database connections once per container.
+    """
+    database.warm_pool()
+
+
+# Per-route metrics on GET /metrics and the slow query log on GET /admin/slow_queries.
+instrumentation.install(app, gauges=database.pool_gauges, explain_connect=database.dedicated_connection)
 
 
 # Employee Endpoints
@@ -4,6 +4,8 @@ Database models for the Payroll Service.
 Defines SQL statements for creating the employees and payroll_records tables.
 """
 
+from .migrate import Migration
+
 employee_table_creation = """
 CREATE TABLE IF NOT EXISTS employees (
     id SERIAL PRIMARY KEY,
@@ -26,3 +28,19 @@ CREATE TABLE IF NOT EXISTS payroll_records (
     taxes NUMERIC(12, 2) NOT NULL
 );
 """
+
+payroll_records_employee_index_creation = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_payroll_records_employee_id
+ON payroll_records (employee_id, pay_date);
+"""
+
+SERVICE = "payroll-service"
+
+# Applied in order by `python -m app.migrate`; never edit a released migration, add a new one.
+MIGRATIONS = [
+    Migration(1, "create tables", [employee_table_creation, payroll_record_table_creation]),
+    # Built without blocking writes, for payroll record lookups per employee.
+    Migration(2, "add indexes", [
+        payroll_records_employee_index_creation,
+    ], transactional=False),
+]
@@ -3,7 +3,7 @@ Test cases for the Payroll Service.
 """
 
 from fastapi.testclient import TestClient
-from app.main import app
+from app.main import app, get_db
 import pytest
 import datetime
 
@@ -45,3 +45,31 @@ def test_create_employee(mock_db):
     })
     assert response.status_code == 201
     assert response.json()["full_name"] == "John Doe"
+
+
+def test_create_employee_single_round_trip(recording_db):
+    recording_db.rows = [(1, "John Doe", "john@example.com", "Developer", 60000.0, datetime.date(2024, 1, 2))]
+    response = client.post("/employees/", json={
+        "full_name": "John Doe",
+        "email": "john@example.com",
+        "position": "Developer",
+        "salary": 60000.0,
+        "date_hired": "2024-01-02"
+    })
+    assert response.status_code == 201
+    assert response.json() == {"id": 1, "full_name": "John Doe", "email": "john@example.com",
+                               "position": "Developer", "salary": 60000.0, "date_hired": "2024-01-02"}
+    assert len(recording_db.queries) == 1
+
+
+def test_process_payroll_round_trips(recording_db):
+    recording_db.rows = [
+        (1, "John Doe", "john@example.com", "Developer", 60000.0, datetime.date(2024, 1, 2)),
+        (3, 1, datetime.date(2024, 2, 1), 5000.0, 3750.0, 250.0, 1000.0),
+    ]
+    response = client.post("/payroll/", json={"employee_id": 1, "pay_date": "2024-02-01"})
+    assert response.status_code == 201
+    assert response.json() == {"id": 3, "employee_id": 1, "pay_date": "2024-02-01", "gross_pay": 5000.0,
+                               "net_pay": 3750.0, "deductions": 250.0, "taxes": 1000.0}
+    # Salary lookup plus the INSERT, whose RETURNING row is the response.
+    assert len(recording_db.queries) == 2
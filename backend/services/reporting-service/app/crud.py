@@ -8,6 +8,22 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+REPORT_COLUMNS = "id, report_type, status, created_at, completed_at, file_path"
+
+
+def _row_to_report(row):
+    """
+    Map a row selected with REPORT_COLUMNS to a Report schema.
+    """
+    return schemas.Report(
+        id=row[0],
+        report_type=row[1],
+        status=row[2],
+        created_at=row[3],
+        completed_at=row[4],
+        file_path=row[5]
+    )
+
 
 def create_report(db, report_request: schemas.ReportCreate):
     """
@@ -21,9 +37,9 @@ def create_report(db, report_request: schemas.ReportCreate):
     - Report schema.
     """
     cursor = db.cursor()
-    sql = """
+    sql = f"""
         INSERT INTO reports (report_type, status, created_at)
-        VALUES (%s, %s, %s) RETURNING id;
+        VALUES (%s, %s, %s) RETURNING {REPORT_COLUMNS};
     """
     params = (
         report_request.report_type,
@@ -31,10 +47,10 @@ def create_report(db, report_request: schemas.ReportCreate):
         datetime.datetime.utcnow()
     )
     cursor.execute(sql, params)
-    report_id = cursor.fetchone()[0]
+    row = cursor.fetchone()
     db.commit()
     cursor.close()
-    return get_report(db, report_id)
+    return _row_to_report(row)
 
 
 def get_report(db, report_id: int):
@@ -49,22 +65,12 @@ def get_report(db, report_id: int):
     - Report schema.
     """
     cursor = db.cursor()
-    sql = """
-        SELECT id, report_type, status, created_at, completed_at, file_path
-        FROM reports WHERE id = %s;
-    """
+    sql = f"SELECT {REPORT_COLUMNS} FROM reports WHERE id = %s;"
     cursor.execute(sql, (report_id,))
     row = cursor.fetchone()
     cursor.close()
     if row:
-        return schemas.Report(
-            id=row[0],
-            report_type=row[1],
-            status=row[2],
-            created_at=row[3],
-            completed_at=row[4],
-            file_path=row[5]
-        )
+        return _row_to_report(row)
     return None
 
 
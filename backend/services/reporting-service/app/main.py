@@ -5,7 +5,7 @@ This module initializes the FastAPI app and defines the endpoints for generating
 """
 
 from fastapi import FastAPI, Depends, HTTPException, status, BackgroundTasks
-from . import schemas, crud, utils, database
+from . import schemas, crud, utils, database, instrumentation
 import logging
 
 # Initialize FastAPI app
@@ -23,7 +23,17 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
+        database.release_connection(db)
+
+@app.on_event("startup")
+def warm_up():
+    """
+    Pre-open pooled database connections once per container.
+    """
+    database.warm_pool()
+
+# Per-route metrics on GET /metrics and the slow query log on GET /admin/slow_queries.
+instrumentation.install(app, gauges=database.pool_gauges, explain_connect=database.dedicated_connection)
 
 @app.post("/reports/", response_model=schemas.Report, status_code=status.HTTP_202_ACCEPTED)
 def generate_report(report_request: schemas.ReportCreate, background_tasks: BackgroundTasks, db=Depends(get_db)):
@@ -4,6 +4,8 @@ Database models for the Reporting Service.
 Defines SQL statements for creating the reports table.
 """
 
+from .migrate import Migration
+
 report_table_creation = """
 CREATE TABLE IF NOT EXISTS reports (
     id SERIAL PRIMARY KEY,
@@ -14,3 +16,10 @@ CREATE TABLE IF NOT EXISTS reports (
     file_path TEXT
 );
 """
+
+SERVICE = "reporting-service"
+
+# Applied in order by `python -m app.migrate`; never edit a released migration, add a new one.
+MIGRATIONS = [
+    Migration(1, "create tables", [report_table_creation]),
+]
@@ -3,7 +3,7 @@ Utility functions for the Reporting Service.
 """
 
 import time
-from .database import get_connection
+from .database import get_connection, release_connection
 from .crud import update_report_status
 import logging
 
@@ -29,4 +29,4 @@ def generate_report(report_id: int):
         logger.exception("Error generating report")
         update_report_status(db, report_id, status="Failed")
     finally:
-        db.close()
+        release_connection(db)
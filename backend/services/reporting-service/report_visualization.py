@@ -2,9 +2,10 @@
 Report visualization module for the Reporting Service.
 
 Contains functions for generating visual representations of reports.
+matplotlib is imported on first use; it is by far the heaviest dependency of
+the service and most invocations never draw a chart.
 """
 
-import matplotlib.pyplot as plt
 import io
 import base64
 
@@ -20,6 +21,10 @@ def generate_bar_chart(data, title):
     Returns:
     - Base64 encoded image of the bar chart.
     """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
     labels = list(data.keys())
     amounts = list(data.values())
 
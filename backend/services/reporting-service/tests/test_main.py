@@ -3,7 +3,8 @@ Test cases for the Reporting Service.
 """
 
 from fastapi.testclient import TestClient
-from app.main import app
+from app.main import app, get_db
+import datetime
 import pytest
 
 client = TestClient(app)
@@ -41,3 +42,14 @@ def test_generate_report(mock_db):
     assert response.status_code == 202
     assert response.json()["report_type"] == "balance_sheet"
     assert response.json()["status"] == "Pending"
+
+
+def test_generate_report_single_round_trip(recording_db, monkeypatch):
+    monkeypatch.setattr("app.utils.generate_report", lambda report_id: None)
+    recording_db.rows = [(8, "balance_sheet", "Pending", datetime.datetime(2024, 3, 1), datetime.datetime(2024, 3, 1), "")]
+    response = client.post("/reports/", json={"report_type": "balance_sheet"})
+    assert response.status_code == 202
+    assert response.json() == {"id": 8, "report_type": "balance_sheet", "status": "Pending",
+                               "created_at": "2024-03-01T00:00:00", "completed_at": "2024-03-01T00:00:00",
+                               "file_path": ""}
+    assert len(recording_db.queries) == 1
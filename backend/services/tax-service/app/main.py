@@ -6,10 +6,8 @@ and filings.
 """
 
 from fastapi import FastAPI, Depends, HTTPException, status
-from . import schemas, utils
+from . import schemas, utils, database, instrumentation
 import logging
-import psycopg2
-import os
 
 # Initialize FastAPI app
 app = FastAPI(title="Tax Service", description="Tax calculations and compliance endpoints")
@@ -22,17 +20,21 @@ def get_db():
     """
     Dependency to get a database connection.
     """
-    conn = psycopg2.connect(
-        host=os.environ.get("DB_HOST"),
-        port=int(os.environ.get("DB_PORT", 5432)),
-        database=os.environ.get("DB_NAME"),
-        user=os.environ.get("DB_USER"),
-        password=os.environ.get("DB_PASSWORD")
-    )
+    db = database.get_connection()
     try:
-        yield conn
+        yield db
     finally:
-        conn.close()
+        database.release_connection(db)
+
+@app.on_event("startup")
+def warm_up():
+    """
+    Pre-open pooled database connections once per container.
+    """
+    database.warm_pool()
+
+# Per-route metrics on GET /metrics and the slow query log on GET /admin/slow_queries.
+instrumentation.install(app, gauges=database.pool_gauges, explain_connect=database.dedicated_connection)
 
 @app.post("/calculate_tax/", response_model=schemas.TaxCalculationResult)
 def calculate_tax(tax_request: schemas.TaxCalculationRequest, db=Depends(get_db)):
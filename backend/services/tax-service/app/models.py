@@ -4,6 +4,8 @@ Database models for the Tax Service.
 Defines SQL statements for creating the tax_filings table.
 """
 
+from .migrate import Migration
+
 tax_filings_table_creation = """
 CREATE TABLE IF NOT EXISTS tax_filings (
     id SERIAL PRIMARY KEY,
@@ -16,3 +18,10 @@ CREATE TABLE IF NOT EXISTS tax_filings (
     status VARCHAR(50) DEFAULT 'Pending'
 );
 """
+
+SERVICE = "tax-service"
+
+# Applied in order by `python -m app.migrate`; never edit a released migration, add a new one.
+MIGRATIONS = [
+    Migration(1, "create tables", [tax_filings_table_creation]),
+]
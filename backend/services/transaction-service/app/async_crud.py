@@ -0,0 +1,75 @@
+"""
+Asynchronous CRUD operations for the Transaction Service using asyncpg.
+
+Mirrors crud.py for the endpoints served by async_main.py.
+"""
+
+from . import idempotency, schemas
+from .crud import LOCK_ROW_SQL, TRANSACTION_COLUMNS, _create_sql, _delete_sql, _row_to_transaction, _update_sql
+import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def create_transaction(db, transaction: schemas.TransactionCreate, idempotency_key=None):
+    """
+    Create a new transaction, with its balance update and outbox event, in one statement.
+
+    With an idempotency_key the response is stored in the same database transaction.
+    """
+    params = (
+        transaction.description,
+        transaction.amount,
+        datetime.datetime.utcnow(),
+        transaction.account_id,
+        transaction.transaction_type
+    )
+    if idempotency_key is None:
+        return _row_to_transaction(await db.fetchrow(_create_sql("$1, $2, $3, $4, $5"), *params))
+    async with db.transaction():
+        result = _row_to_transaction(await db.fetchrow(_create_sql("$1, $2, $3, $4, $5"), *params))
+        await idempotency.store_response_async(db, idempotency_key, result)
+    return result
+
+
+async def get_transaction(db, transaction_id: int):
+    """
+    Retrieve a transaction by ID.
+    """
+    row = await db.fetchrow(
+        f"SELECT {TRANSACTION_COLUMNS} FROM transactions WHERE id = $1;",
+        transaction_id
+    )
+    if row:
+        return _row_to_transaction(row)
+    return None
+
+
+async def update_transaction(db, transaction_id: int, transaction: schemas.TransactionUpdate):
+    """
+    Update an existing transaction, with its balance correction and outbox event, in one statement.
+    """
+    fields = []
+    params = [transaction_id]
+    for column in ("description", "amount", "account_id", "transaction_type"):
+        value = getattr(transaction, column)
+        if value is not None:
+            params.append(value)
+            fields.append(f"{column} = ${len(params)}")
+    if not fields:
+        return await get_transaction(db, transaction_id)
+    async with db.transaction():
+        await db.execute(LOCK_ROW_SQL.format("$1"), transaction_id)
+        row = await db.fetchrow(_update_sql(", ".join(fields), "$1"), *params)
+    if row:
+        return _row_to_transaction(row)
+    return None
+
+
+async def delete_transaction(db, transaction_id: int):
+    """
+    Delete a transaction, with its balance reversal and outbox event, in one statement.
+    """
+    deleted = await db.fetchval(_delete_sql("$1"), transaction_id)
+    return deleted > 0
@@ -0,0 +1,89 @@
+"""
+Async endpoint variants for the Transaction Service.
+
+When DB_ENGINE=asyncpg, install() swaps the blocking CRUD endpoints in main.py
+for these coroutine handlers, which run on the event loop instead of FastAPI's
+threadpool.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.routing import APIRoute
+from . import schemas, async_crud, async_database, idempotency
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.post("/transactions/", response_model=schemas.Transaction, status_code=status.HTTP_201_CREATED)
+async def create_transaction(transaction: schemas.TransactionCreate, request: Request,
+                             db=Depends(async_database.get_db)):
+    """
+    Create a new financial transaction.
+    """
+    try:
+        return await async_crud.create_transaction(db, transaction, idempotency.take_key(request))
+    except idempotency.ClaimLost as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.exception("Error creating transaction")
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/transactions/{transaction_id}", response_model=schemas.Transaction)
+async def read_transaction(transaction_id: int, db=Depends(async_database.get_db)):
+    """
+    Retrieve a transaction by its ID.
+    """
+    transaction = await async_crud.get_transaction(db, transaction_id)
+    if not transaction:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+    return transaction
+
+
+@router.put("/transactions/{transaction_id}", response_model=schemas.Transaction)
+async def update_transaction(transaction_id: int, transaction: schemas.TransactionUpdate,
+                             db=Depends(async_database.get_db)):
+    """
+    Update an existing transaction.
+    """
+    try:
+        updated_transaction = await async_crud.update_transaction(db, transaction_id, transaction)
+    except Exception as e:
+        logger.exception("Error updating transaction")
+        raise HTTPException(status_code=400, detail=str(e))
+    if not updated_transaction:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+    return updated_transaction
+
+
+@router.delete("/transactions/{transaction_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_transaction(transaction_id: int, db=Depends(async_database.get_db)):
+    """
+    Delete a transaction by its ID.
+    """
+    try:
+        result = await async_crud.delete_transaction(db, transaction_id)
+    except Exception as e:
+        logger.exception("Error deleting transaction")
+        raise HTTPException(status_code=400, detail=str(e))
+    if not result:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+
+
+def install(app, router=router):
+    """
+    Replace the matching synchronous routes on `app` with the async variants.
+
+    Parameters:
+    - app: The FastAPI application from main.py.
+    - router: Router whose routes take over (also used by group_commit).
+    """
+    replaced = {(route.path, method) for route in router.routes for method in route.methods}
+    app.router.routes = [
+        route for route in app.router.routes
+        if not (isinstance(route, APIRoute)
+                and any((route.path, method) in replaced for method in route.methods))
+    ]
+    app.include_router(router)
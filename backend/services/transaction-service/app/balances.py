@@ -0,0 +1,168 @@
+"""
+Rebuild of the accounts.balance projection.
+
+Every transaction write applies its signed amount (credits add, debits
+subtract) to accounts.balance in the same database transaction, so balances
+stay current without scanning transactions. This module recomputes them all
+in one set-based pass, for backfilling existing data or repairing drift.
+
+An account's balance is its opening_balance plus the signed amounts of its
+transactions. opening_balance holds the part set directly through
+ledger-service, which keeps it up to date, so those balances survive a
+rebuild. Transactions are read from the live partitions and from the
+partitions `python -m app.partitions archive` moved to the archive schema.
+The rebuild refuses to run when the daily_account_totals rollup counts
+transactions that neither holds (for instance a year archived with --drop),
+since every balance touched by them would otherwise be rewritten.
+
+Usage (from the service directory, with the DB_* environment variables set):
+
+    python -m app.balances            # recompute and fix drifted balances
+    python -m app.balances --check    # only report drifted balances
+"""
+
+from .crud import SIGNED_AMOUNT
+import argparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SCHEMA = "archive"
+
+
+class IncompleteHistoryError(RuntimeError):
+    """
+    Raised when transactions counted by the rollup are no longer stored anywhere.
+    """
+
+
+def archived_tables(db, archive_schema: str = ARCHIVE_SCHEMA):
+    """
+    List the archived transactions partitions as quoted, schema-qualified names.
+    """
+    cursor = db.cursor()
+    try:
+        cursor.execute(
+            """
+            SELECT format('%%I.%%I', schemaname, tablename) FROM pg_tables
+            WHERE schemaname = %s AND tablename LIKE 'transactions\\_y%%'
+            ORDER BY tablename;
+            """,
+            (archive_schema,)
+        )
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def _transaction_rows(tables):
+    return " UNION ALL ".join(
+        f"SELECT account_id, amount, transaction_type FROM {table}" for table in ["transactions", *tables]
+    )
+
+
+def drift_selection(tables):
+    """
+    Build the query selecting (account id, stored balance, recomputed balance)
+    of every drifted account, reading transactions from the live table and the
+    given archived tables.
+    """
+    return f"""
+        SELECT a.id, a.balance, a.opening_balance + COALESCE(s.balance, 0) AS expected
+        FROM accounts a
+        LEFT JOIN (
+            SELECT account_id, SUM({SIGNED_AMOUNT.format("t")}) AS balance
+            FROM ({_transaction_rows(tables)}) t GROUP BY account_id
+        ) s ON s.account_id = a.id
+        WHERE a.balance IS DISTINCT FROM a.opening_balance + COALESCE(s.balance, 0)
+    """
+
+
+def _check_history(cursor, tables):
+    cursor.execute(
+        f"""
+        SELECT (SELECT COALESCE(SUM(transaction_count), 0) FROM daily_account_totals),
+               (SELECT COUNT(*) FROM ({_transaction_rows(tables)}) t);
+        """
+    )
+    counted, stored = cursor.fetchone()
+    if counted != stored:
+        raise IncompleteHistoryError(
+            f"daily_account_totals counts {counted} transactions but only {stored} are stored in "
+            "transactions and the archive schema; were archived partitions dropped? Refusing to "
+            "recompute balances from an incomplete history."
+        )
+
+
+def rebuild_balances(db, check_only: bool = False, archive_schema: str = ARCHIVE_SCHEMA):
+    """
+    Recompute every account balance from its opening balance and transactions.
+
+    Transaction writes and direct account updates are blocked while the
+    rebuild runs, so nothing changes between the scan and the update.
+
+    Parameters:
+    - check_only: Report the drift without changing anything.
+    - archive_schema: Schema holding archived partitions.
+
+    Returns:
+    - List of (account id, stored balance, recomputed balance) for the
+      accounts that were (or, with check_only, would be) corrected.
+
+    Raises:
+    - IncompleteHistoryError: Some transactions are no longer stored.
+    """
+    tables = archived_tables(db, archive_schema)
+    cursor = db.cursor()
+    try:
+        if not check_only:
+            cursor.execute("LOCK TABLE transactions IN SHARE MODE;")
+            cursor.execute("LOCK TABLE accounts IN EXCLUSIVE MODE;")
+        _check_history(cursor, tables)
+        if check_only:
+            cursor.execute(f"{drift_selection(tables)} ORDER BY a.id;")
+        else:
+            cursor.execute(
+                f"""
+                WITH drift AS ({drift_selection(tables)})
+                UPDATE accounts SET balance = drift.expected
+                FROM drift WHERE accounts.id = drift.id
+                RETURNING drift.id, drift.balance, drift.expected;
+                """
+            )
+        drifted = sorted(cursor.fetchall())
+        if check_only:
+            db.rollback()
+        else:
+            db.commit()
+        return drifted
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def main():
+    from . import database
+
+    parser = argparse.ArgumentParser(description="Recompute accounts.balance from transactions.")
+    parser.add_argument("--check", action="store_true", help="Only report drifted balances")
+    parser.add_argument("--archive-schema", default=ARCHIVE_SCHEMA, help="Schema holding archived partitions")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    conn = database.dedicated_connection()
+    try:
+        drifted = rebuild_balances(conn, check_only=args.check, archive_schema=args.archive_schema)
+        for account_id, stored, expected in drifted:
+            print(f"{account_id:>8}  {stored} -> {expected}")
+        logger.info("%s %s accounts", "Found drift in" if args.check else "Corrected", len(drifted))
+    except IncompleteHistoryError as e:
+        parser.exit(1, f"{e}\n")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,22 +2,80 @@
 CRUD operations for the Transaction Service using direct AWS RDS PostgreSQL connection.
 """
 
-from . import schemas
+from . import idempotency, partitions, schemas
+import collections
 import datetime
+import decimal
+import io
+import itertools
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+TRANSACTION_COLUMNS = "id, description, amount, date, account_id, transaction_type"
 
-def create_transaction(db, transaction: schemas.TransactionCreate):
+# Rows sent per COPY FROM STDIN round trip during bulk imports.
+BULK_BATCH_SIZE = 5000
+
+# Rows fetched per round trip from the server-side cursor of an export.
+EXPORT_BATCH_SIZE = 5000
+
+# A transaction's effect on accounts.balance: credits add, debits subtract.
+SIGNED_AMOUNT = "CASE WHEN {0}.transaction_type = 'Credit' THEN {0}.amount ELSE -{0}.amount END"
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _row_to_transaction(row):
+    """
+    Map a row selected with TRANSACTION_COLUMNS to a Transaction schema.
+    """
+    return schemas.Transaction(
+        id=row[0],
+        description=row[1],
+        amount=row[2],
+        date=row[3],
+        account_id=row[4],
+        transaction_type=row[5]
+    )
+
+
+def _create_sql(placeholders):
+    """
+    Build the single-statement insert that also applies the balance effect and
+    records a "created" event in the transaction_events outbox. Shared with
+    async_crud.py, which uses $n placeholders.
+    """
+    return f"""
+        WITH inserted AS (
+            INSERT INTO transactions (description, amount, date, account_id, transaction_type)
+            VALUES ({placeholders}) RETURNING {TRANSACTION_COLUMNS}
+        ), balance_update AS (
+            UPDATE accounts SET balance = balance + {SIGNED_AMOUNT.format("inserted")}
+            FROM inserted WHERE accounts.id = inserted.account_id
+        ), change_event AS (
+            INSERT INTO transaction_events (event_type, transaction_id, payload)
+            SELECT 'created', id, jsonb_build_object('old', NULL::jsonb, 'new', to_jsonb(inserted))
+            FROM inserted
+        )
+        SELECT {TRANSACTION_COLUMNS} FROM inserted;
+    """
+
+
+def create_transaction(db, transaction: schemas.TransactionCreate, idempotency_key=None):
     """
     Create a new transaction.
+
+    The insert, the account balance update and the outbox event are sent as a
+    single statement, so they commit together and cost one round trip.
+
+    Parameters:
+    - idempotency_key: Key hash from idempotency.take_key(); the response is
+      stored under it in the same database transaction.
     """
     cursor = db.cursor()
-    sql = """
-        INSERT INTO transactions (description, amount, date, account_id, transaction_type)
-        VALUES (%s, %s, %s, %s, %s) RETURNING id;
-    """
+    sql = _create_sql("%s, %s, %s, %s, %s")
     params = (
         transaction.description,
         transaction.amount,
@@ -25,11 +83,79 @@ def create_transaction(db, transaction: schemas.TransactionCreate):
         transaction.account_id,
         transaction.transaction_type
     )
-    cursor.execute(sql, params)
-    transaction_id = cursor.fetchone()[0]
-    db.commit()
-    cursor.close()
-    return get_transaction(db, transaction_id)
+    try:
+        cursor.execute(sql, params)
+        result = _row_to_transaction(cursor.fetchone())
+        if idempotency_key is not None:
+            idempotency.store_response(cursor, idempotency_key, result)
+        db.commit()
+        return result
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def create_transactions(db, transactions, dates):
+    """
+    Create several transactions with one statement and one commit.
+
+    Ids are drawn from the sequence per input position, so results map back
+    to their inputs exactly. Balance updates and outbox events are written in
+    the same statement, as in create_transaction().
+
+    Parameters:
+    - transactions: List of TransactionCreate schemas.
+    - dates: Transaction date for each of them.
+
+    Returns:
+    - List of Transaction schemas in input order.
+    """
+    cursor = db.cursor()
+    sql = f"""
+        WITH input AS (
+            SELECT * FROM unnest(%s::text[], %s::numeric[], %s::timestamp[], %s::integer[], %s::varchar[])
+            WITH ORDINALITY AS v(description, amount, date, account_id, transaction_type, position)
+        ), ids AS (
+            SELECT position, nextval(pg_get_serial_sequence('transactions', 'id')) AS id FROM input
+        ), inserted AS (
+            INSERT INTO transactions (id, description, amount, date, account_id, transaction_type)
+            SELECT ids.id, description, amount, date, account_id, transaction_type
+            FROM input JOIN ids USING (position)
+            RETURNING {TRANSACTION_COLUMNS}
+        ), balance_update AS (
+            UPDATE accounts SET balance = balance + d.delta
+            FROM (
+                SELECT account_id, SUM({SIGNED_AMOUNT.format("inserted")}) AS delta
+                FROM inserted GROUP BY account_id
+            ) d
+            WHERE accounts.id = d.account_id
+        ), change_event AS (
+            INSERT INTO transaction_events (event_type, transaction_id, payload)
+            SELECT 'created', id, jsonb_build_object('old', NULL::jsonb, 'new', to_jsonb(inserted))
+            FROM inserted ORDER BY id
+        )
+        SELECT {', '.join(f"inserted.{column}" for column in TRANSACTION_COLUMNS.split(', '))}
+        FROM inserted JOIN ids ON ids.id = inserted.id ORDER BY ids.position;
+    """
+    params = (
+        [transaction.description for transaction in transactions],
+        [transaction.amount for transaction in transactions],
+        list(dates),
+        [transaction.account_id for transaction in transactions],
+        [transaction.transaction_type for transaction in transactions],
+    )
+    try:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+    return [_row_to_transaction(row) for row in rows]
 
 
 def get_transaction(db, transaction_id: int):
@@ -37,30 +163,87 @@ def get_transaction(db, transaction_id: int):
     Retrieve a transaction by ID.
     """
     cursor = db.cursor()
-    sql = """
-        SELECT id, description, amount, date, account_id, transaction_type
-        FROM transactions WHERE id = %s;
-    """
+    sql = f"SELECT {TRANSACTION_COLUMNS} FROM transactions WHERE id = %s;"
     cursor.execute(sql, (transaction_id,))
     row = cursor.fetchone()
     cursor.close()
     if row:
-        return schemas.Transaction(
-            id=row[0],
-            description=row[1],
-            amount=row[2],
-            date=row[3],
-            account_id=row[4],
-            transaction_type=row[5]
-        )
+        return _row_to_transaction(row)
     return None
 
 
-def update_transaction(db, transaction_id: int, transaction: schemas.TransactionUpdate):
+def get_transactions(db, ids):
     """
-    Update an existing transaction.
+    Retrieve many transactions by ID with a single query.
+
+    Returns:
+    - Dictionary of id to Transaction schema; ids that do not exist are absent.
     """
+    if not ids:
+        return {}
     cursor = db.cursor()
+    sql = f"SELECT {TRANSACTION_COLUMNS} FROM transactions WHERE id = ANY(%s);"
+    cursor.execute(sql, (list(ids),))
+    rows = cursor.fetchall()
+    cursor.close()
+    return {row[0]: _row_to_transaction(row) for row in rows}
+
+
+# Run before _update_sql() in the same database transaction.
+LOCK_ROW_SQL = "SELECT id FROM transactions WHERE id = {0} FOR UPDATE;"
+
+
+def _update_sql(assignments, id_placeholder):
+    """
+    Build the single-statement update that also moves the balance effect and
+    records an "updated" event with the old and new rows.
+
+    The old row's signed amount is reversed on its old account and the new
+    row's applied to its (possibly different) account; deltas are summed per
+    account so each accounts row is updated once. Shared with async_crud.py,
+    which uses $n placeholders; the id placeholder appears before and after
+    the assignments.
+
+    `old` reads the row from the statement's snapshot; it must not lock it,
+    because the `updated` CTE modifies the same row in the same command and
+    a locking read would then skip it. Callers lock the row beforehand with
+    LOCK_ROW_SQL in the same database transaction, so the snapshot already
+    holds the latest committed version and a concurrent update cannot be
+    reversed from stale values.
+    """
+    signed_old = SIGNED_AMOUNT.format("old")
+    signed_new = SIGNED_AMOUNT.format("updated")
+    return f"""
+        WITH old AS (
+            SELECT {TRANSACTION_COLUMNS} FROM transactions WHERE id = {id_placeholder}
+        ), updated AS (
+            UPDATE transactions SET {assignments} WHERE id = {id_placeholder}
+            RETURNING {TRANSACTION_COLUMNS}
+        ), deltas AS (
+            SELECT old.account_id, -{signed_old} AS delta FROM old JOIN updated ON updated.id = old.id
+            UNION ALL
+            SELECT updated.account_id, {signed_new} FROM updated
+        ), balance_update AS (
+            UPDATE accounts SET balance = balance + d.delta
+            FROM (
+                SELECT account_id, SUM(delta) AS delta FROM deltas
+                GROUP BY account_id HAVING SUM(delta) <> 0
+            ) d
+            WHERE accounts.id = d.account_id
+        ), change_event AS (
+            INSERT INTO transaction_events (event_type, transaction_id, payload)
+            SELECT 'updated', updated.id, jsonb_build_object('old', to_jsonb(old), 'new', to_jsonb(updated))
+            FROM old JOIN updated ON updated.id = old.id
+        )
+        SELECT {TRANSACTION_COLUMNS} FROM updated;
+    """
+
+
+def update_transaction(db, transaction_id: int, transaction: schemas.TransactionUpdate):
+    """
+    Update an existing transaction, correcting the balances it affects and
+    recording the change in the outbox in the same statement.
+    """
     fields = []
     params = []
     if transaction.description is not None:
@@ -75,21 +258,299 @@ def update_transaction(db, transaction_id: int, transaction: schemas.Transaction
     if transaction.transaction_type is not None:
         fields.append("transaction_type = %s")
         params.append(transaction.transaction_type)
-    params.append(transaction_id)
-    sql = f"UPDATE transactions SET {', '.join(fields)} WHERE id = %s;"
-    cursor.execute(sql, params)
-    db.commit()
-    cursor.close()
-    return get_transaction(db, transaction_id)
+    if not fields:
+        return get_transaction(db, transaction_id)
+    sql = _update_sql(", ".join(fields), "%s")
+    params = [transaction_id, *params, transaction_id]
+    cursor = db.cursor()
+    try:
+        cursor.execute(LOCK_ROW_SQL.format("%s"), (transaction_id,))
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+    if row:
+        return _row_to_transaction(row)
+    return None
+
+
+def _delete_sql(id_placeholder):
+    """
+    Build the single-statement delete that also reverses the balance effect and
+    records a "deleted" event with the old row. Shared with async_crud.py.
+    """
+    return f"""
+        WITH deleted AS (
+            DELETE FROM transactions WHERE id = {id_placeholder} RETURNING {TRANSACTION_COLUMNS}
+        ), balance_update AS (
+            UPDATE accounts SET balance = balance - {SIGNED_AMOUNT.format("deleted")}
+            FROM deleted WHERE accounts.id = deleted.account_id
+        ), change_event AS (
+            INSERT INTO transaction_events (event_type, transaction_id, payload)
+            SELECT 'deleted', id, jsonb_build_object('old', to_jsonb(deleted), 'new', NULL::jsonb)
+            FROM deleted
+        )
+        SELECT COUNT(*) FROM deleted;
+    """
 
 
 def delete_transaction(db, transaction_id: int):
     """
-    Delete a transaction.
+    Delete a transaction, reversing its effect on the account balance and
+    recording the change in the outbox in the same statement.
     """
     cursor = db.cursor()
-    sql = "DELETE FROM transactions WHERE id = %s;"
-    cursor.execute(sql, (transaction_id,))
+    cursor.execute(_delete_sql("%s"), (transaction_id,))
+    deleted = cursor.fetchone()[0]
     db.commit()
     cursor.close()
-    return cursor.rowcount > 0
+    return deleted > 0
+
+
+def _transaction_filters(account_id=None, transaction_type=None, start_date=None, end_date=None,
+                         min_amount=None, max_amount=None):
+    """
+    Build the WHERE conditions and parameters shared by listing and export.
+    """
+    conditions = []
+    params = []
+    for condition, value in (
+        ("account_id = %s", account_id),
+        ("transaction_type = %s", transaction_type),
+        ("date >= %s", start_date),
+        ("date < %s", end_date),
+        ("amount >= %s", min_amount),
+        ("amount <= %s", max_amount),
+    ):
+        if value is not None:
+            conditions.append(condition)
+            params.append(value)
+    return conditions, params
+
+
+def list_transactions(db, account_id: int = None, transaction_type: str = None,
+                      start_date: datetime.datetime = None, end_date: datetime.datetime = None,
+                      min_amount: float = None, max_amount: float = None,
+                      after: tuple = None, limit: int = 100):
+    """
+    Retrieve transactions matching the filters, newest first, by keyset pagination.
+
+    Parameters:
+    - account_id, transaction_type: Exact-match filters.
+    - start_date, end_date: Date range; start inclusive, end exclusive.
+    - min_amount, max_amount: Inclusive amount range.
+    - after: (date, id) of the last row of the previous page.
+    - limit: Maximum number of rows.
+
+    Returns:
+    - List of Transaction schemas.
+    """
+    conditions, params = _transaction_filters(account_id, transaction_type, start_date, end_date,
+                                              min_amount, max_amount)
+    if after is not None:
+        # Row comparison lets the (date, id) indexes seek straight to the page;
+        # the plain date bound lets the planner skip newer monthly partitions.
+        conditions.append("(date, id) < (%s, %s)")
+        conditions.append("date <= %s")
+        params.extend(after)
+        params.append(after[0])
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    sql = f"""
+        SELECT {TRANSACTION_COLUMNS} FROM transactions {where}
+        ORDER BY date DESC, id DESC LIMIT %s;
+    """
+    params.append(limit)
+    cursor = db.cursor()
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    cursor.close()
+    return [_row_to_transaction(row) for row in rows]
+
+
+def search_transactions(db, query: str, match: str = "words", sort: str = "rank",
+                        account_id: int = None, start_date: datetime.datetime = None,
+                        end_date: datetime.datetime = None, after: tuple = None, limit: int = 50):
+    """
+    Search transaction descriptions, by keyset pagination.
+
+    Parameters:
+    - query: Search text.
+    - match: "words" for full-text search (websearch syntax: quoted phrases,
+      OR, -word) on the GIN-indexed description_tsv column, or "substring"
+      for a case-insensitive substring match on the trigram index.
+    - sort: "rank" (best match first, then newest) or "date" (newest first).
+      Ranking only applies to word matches.
+    - account_id, start_date, end_date: Optional filters as for list_transactions().
+    - after: Sort key of the last row of the previous page: (rank, date, id)
+      when sorting by rank, otherwise (date, id).
+    - limit: Maximum number of rows.
+
+    Returns:
+    - List of (Transaction schema, rank) tuples; rank is None when sorting by date.
+    """
+    conditions, params = _transaction_filters(account_id=account_id, start_date=start_date, end_date=end_date)
+    if match == "words":
+        conditions.append("description_tsv @@ websearch_to_tsquery('english', %s)")
+        rank = "ts_rank(description_tsv, websearch_to_tsquery('english', %s))"
+    else:
+        escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        conditions.append("description ILIKE %s")
+        query = f"%{escaped}%"
+        sort = "date"
+    params.append(query)
+    if sort == "rank":
+        select = f"{TRANSACTION_COLUMNS}, {rank} AS rank"
+        select_params = [query]
+        if after is not None:
+            # Ranks are real; casting the cursor value back keeps the comparison exact.
+            conditions.append(f"({rank}, date, id) < (%s::real, %s, %s)")
+            params.extend([query, *after])
+        order = "rank DESC, date DESC, id DESC"
+    else:
+        select = TRANSACTION_COLUMNS
+        select_params = []
+        if after is not None:
+            conditions.append("(date, id) < (%s, %s)")
+            conditions.append("date <= %s")
+            params.extend([*after, after[0]])
+        order = "date DESC, id DESC"
+    sql = f"""
+        SELECT {select} FROM transactions WHERE {' AND '.join(conditions)}
+        ORDER BY {order} LIMIT %s;
+    """
+    cursor = db.cursor()
+    cursor.execute(sql, [*select_params, *params, limit])
+    rows = cursor.fetchall()
+    cursor.close()
+    return [(_row_to_transaction(row), row[6] if sort == "rank" else None) for row in rows]
+
+
+def iter_transaction_batches(db, batch_size=EXPORT_BATCH_SIZE, **filters):
+    """
+    Stream matching transactions in chronological order through a server-side cursor.
+
+    Only one batch is held in memory at a time. The connection stays inside a
+    read-only transaction until the iterator is exhausted or closed.
+
+    Parameters:
+    - batch_size: Rows fetched per round trip (the cursor's itersize).
+    - filters: Same keyword filters as list_transactions().
+
+    Returns:
+    - Iterator of lists of raw rows in TRANSACTION_COLUMNS order.
+    """
+    conditions, params = _transaction_filters(**filters)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    cursor = db.cursor(name="transactions_export")
+    cursor.itersize = batch_size
+    try:
+        cursor.execute(
+            f"SELECT {TRANSACTION_COLUMNS} FROM transactions {where} ORDER BY date, id;", params
+        )
+        while True:
+            rows = cursor.fetchmany(cursor.itersize)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+        db.rollback()
+
+
+def bulk_create_transactions(db, transactions, batch_size=BULK_BATCH_SIZE):
+    """
+    Insert many transactions with COPY FROM STDIN, all in one database transaction.
+
+    Ids are reserved from the sequence per batch so that a "created" outbox
+    event can be copied for every row alongside it. The per-account balance
+    deltas are summed while the rows stream and applied with one UPDATE
+    before the commit.
+
+    Rows dated outside the existing monthly partitions land in
+    transactions_default. After the commit their months' partitions are
+    created, which moves them out of it; creating them inside the import
+    would lock transactions against reads until it commits.
+
+    Parameters:
+    - transactions: Iterable of TransactionImport schemas; consumed lazily,
+      batch_size rows at a time.
+    - batch_size: Rows buffered per COPY round trip.
+
+    Returns:
+    - Number of rows inserted.
+    """
+    imported_at = datetime.datetime.utcnow()
+    transactions = iter(transactions)
+    inserted = 0
+    deltas = collections.defaultdict(decimal.Decimal)
+    months = set()
+    cursor = db.cursor()
+    try:
+        while True:
+            batch = list(itertools.islice(transactions, batch_size))
+            if not batch:
+                break
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence('transactions', 'id')) FROM generate_series(1, %s);",
+                (len(batch),)
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            rows = io.StringIO()
+            events = io.StringIO()
+            for transaction_id, transaction in zip(ids, batch):
+                date = transaction.date
+                if date is None:
+                    date = imported_at
+                elif date.tzinfo is not None:
+                    date = date.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+                months.add(date.date().replace(day=1))
+                date = date.isoformat()
+                rows.write(
+                    f"{transaction_id}\t{transaction.description.translate(_COPY_ESCAPES)}\t"
+                    f"{transaction.amount}\t{date}\t{transaction.account_id}\t{transaction.transaction_type}\n"
+                )
+                payload = json.dumps({"old": None, "new": {
+                    "id": transaction_id, "description": transaction.description, "amount": transaction.amount,
+                    "date": date, "account_id": transaction.account_id,
+                    "transaction_type": transaction.transaction_type,
+                }})
+                events.write(f"created\t{transaction_id}\t{payload.translate(_COPY_ESCAPES)}\n")
+                amount = decimal.Decimal(str(transaction.amount))
+                deltas[transaction.account_id] += amount if transaction.transaction_type == "Credit" else -amount
+            rows.seek(0)
+            cursor.copy_expert(
+                "COPY transactions (id, description, amount, date, account_id, transaction_type) FROM STDIN",
+                rows
+            )
+            events.seek(0)
+            cursor.copy_expert("COPY transaction_events (event_type, transaction_id, payload) FROM STDIN", events)
+            inserted += len(batch)
+            if len(batch) < batch_size:
+                break
+        if deltas:
+            # One set-based balance update for the whole import.
+            cursor.execute(
+                """
+                UPDATE accounts SET balance = balance + d.delta
+                FROM unnest(%s::integer[], %s::numeric[]) AS d(account_id, delta)
+                WHERE accounts.id = d.account_id;
+                """,
+                (list(deltas), list(deltas.values()))
+            )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+    if months:
+        try:
+            partitions.ensure_month_partitions(db, months)
+        except Exception:
+            # The rows are committed; the next import covering these months retries.
+            logger.exception("Could not create partitions for the imported months")
+    return inserted
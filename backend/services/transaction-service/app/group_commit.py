@@ -0,0 +1,237 @@
+"""
+Group commit for POST /transactions/.
+
+Enabled by setting TRANSACTION_WRITE_MODE=grouped. Concurrent create requests
+are queued and a single writer thread inserts them together: it waits up to
+GROUP_COMMIT_WINDOW_MS after the first queued request, or until
+GROUP_COMMIT_MAX_ROWS are queued, then writes the whole group with one
+multi-row INSERT and one commit. Each request still waits for that commit and
+gets back its own row, so the API is unchanged; under load the database
+flushes its WAL once per group instead of once per transaction.
+
+The route is a coroutine: a waiting request holds an asyncio future, not a
+threadpool worker, so groups can grow past the threadpool size (40 by
+default) and the service's other sync endpoints keep their workers.
+Responses to grouped creates carrying an Idempotency-Key are stored by the
+middleware after the group commits, not in the same database transaction.
+
+The window adds up to GROUP_COMMIT_WINDOW_MS of latency to every create, and
+grouping only happens when requests overlap, so this suits long-running
+containers serving many concurrent requests rather than Lambda, where each
+instance handles one request at a time.
+"""
+
+from fastapi import APIRouter, HTTPException, status
+from . import schemas, crud, database
+import asyncio
+import datetime
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("TRANSACTION_WRITE_MODE", "direct").lower() == "grouped"
+
+# Longest a request waits for others to join its group.
+WINDOW = float(os.environ.get("GROUP_COMMIT_WINDOW_MS", 2)) / 1000.0
+
+# Largest group written by one INSERT.
+MAX_ROWS = int(os.environ.get("GROUP_COMMIT_MAX_ROWS", 100))
+
+
+class _Pending:
+    """
+    A queued create request and, once written, its outcome.
+
+    Sync callers wait on `done`; async callers await `future`, which the
+    writer thread resolves on the caller's event loop.
+    """
+
+    __slots__ = ("transaction", "date", "done", "loop", "future", "result", "error")
+
+    def __init__(self, transaction, loop=None):
+        self.transaction = transaction
+        self.date = datetime.datetime.utcnow()
+        self.done = threading.Event()
+        self.loop = loop
+        self.future = loop.create_future() if loop is not None else None
+        self.result = None
+        self.error = None
+
+    def finish(self):
+        self.done.set()
+        if self.future is not None:
+            try:
+                self.loop.call_soon_threadsafe(self._resolve)
+            except RuntimeError:
+                # The caller's event loop has closed; nobody is waiting.
+                pass
+
+    def _resolve(self):
+        # The awaiting request may have been cancelled (e.g. the client went away).
+        if self.future.done():
+            return
+        if self.error is not None:
+            self.future.set_exception(self.error)
+        else:
+            self.future.set_result(self.result)
+
+
+class GroupCommitter:
+    """
+    Coalesces concurrent creates into multi-row inserts written by one background thread.
+
+    Parameters:
+    - acquire, release: Get and return a database connection.
+    - window: Seconds to wait for a group to fill after its first request.
+    - max_rows: Largest group.
+    """
+
+    def __init__(self, acquire=database.get_connection, release=database.release_connection,
+                 window=WINDOW, max_rows=MAX_ROWS):
+        self.acquire = acquire
+        self.release = release
+        self.window = window
+        self.max_rows = max_rows
+        self.groups = 0
+        self.rows = 0
+        self._queue = []
+        self._condition = threading.Condition()
+        self._writer = None
+        self._writer_pid = None
+
+    def submit(self, transaction: schemas.TransactionCreate):
+        """
+        Queue a transaction and wait until its group is committed.
+
+        Returns:
+        - Transaction schema of the created row.
+
+        Raises:
+        - The database error that made its insert fail.
+        """
+        pending = _Pending(transaction)
+        self._enqueue(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    async def submit_async(self, transaction: schemas.TransactionCreate):
+        """
+        Queue a transaction and await its group's commit without blocking a thread.
+
+        Returns and raises as submit().
+        """
+        pending = _Pending(transaction, asyncio.get_running_loop())
+        self._enqueue(pending)
+        return await pending.future
+
+    def _enqueue(self, pending):
+        with self._condition:
+            if self._writer is None or self._writer_pid != os.getpid() or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run, name="group-commit", daemon=True)
+                self._writer_pid = os.getpid()
+                self._writer.start()
+            self._queue.append(pending)
+            self._condition.notify()
+
+    def stats(self):
+        """
+        Groups and rows written so far.
+        """
+        return {"groups": self.groups, "rows": self.rows}
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+                deadline = time.monotonic() + self.window
+                while len(self._queue) < self.max_rows:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                group = self._queue[:self.max_rows]
+                del self._queue[:self.max_rows]
+            self._write(group)
+
+    def _write(self, group):
+        try:
+            db = self.acquire()
+        except Exception as e:
+            for pending in group:
+                pending.error = e
+                pending.finish()
+            return
+        try:
+            try:
+                results = crud.create_transactions(
+                    db, [pending.transaction for pending in group], [pending.date for pending in group]
+                )
+                for pending, result in zip(group, results):
+                    pending.result = result
+                self.groups += 1
+                self.rows += len(group)
+            except Exception as e:
+                if len(group) == 1:
+                    group[0].error = e
+                else:
+                    # One bad row (e.g. an unknown account) fails the whole
+                    # statement; retry row by row so only it is rejected.
+                    logger.warning("Group insert of %s rows failed, retrying individually: %s", len(group), e)
+                    for pending in group:
+                        try:
+                            pending.result = crud.create_transactions(db, [pending.transaction],
+                                                                      [pending.date])[0]
+                            self.groups += 1
+                            self.rows += 1
+                        except Exception as row_error:
+                            pending.error = row_error
+        finally:
+            self.release(db)
+            for pending in group:
+                pending.finish()
+
+
+_committer = None
+_committer_lock = threading.Lock()
+
+
+def get_committer():
+    """
+    Return the process-wide GroupCommitter, creating it on first use.
+    """
+    global _committer
+    if _committer is None:
+        with _committer_lock:
+            if _committer is None:
+                _committer = GroupCommitter()
+    return _committer
+
+
+def gauges():
+    """
+    Group commit counters named for the /metrics endpoint; empty until enabled and used.
+    """
+    if _committer is None:
+        return {}
+    return {f"group_commit_{name}_total": value for name, value in _committer.stats().items()}
+
+
+router = APIRouter()
+
+
+@router.post("/transactions/", response_model=schemas.Transaction, status_code=status.HTTP_201_CREATED)
+async def create_transaction(transaction: schemas.TransactionCreate):
+    """
+    Create a new financial transaction as part of a group commit.
+    """
+    try:
+        return await get_committer().submit_async(transaction)
+    except Exception as e:
+        logger.exception("Error creating transaction")
+        raise HTTPException(status_code=400, detail=str(e))
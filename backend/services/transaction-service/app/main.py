@@ -4,9 +4,14 @@ Main module for the Transaction Service.
 This module initializes the FastAPI app and defines the endpoints for managing financial transactions.
 """
 
-from fastapi import FastAPI, Depends, HTTPException, status
-from . import schemas, crud, database, utils
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from . import schemas, crud, database, utils, async_database, instrumentation
+from . import partitions, group_commit, idempotency
+import datetime
 import logging
+import tempfile
 
 # Initialize FastAPI app
 app = FastAPI(title="Transaction Service", description="Financial transaction management endpoints")
@@ -24,11 +29,35 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
+        database.release_connection(db)
+
+
+@app.on_event("startup")
+def warm_up():
+    """
+    Pre-open pooled database connections once per container.
+    """
+    database.warm_pool()
+
+
+@app.on_event("startup")
+def create_future_partitions():
+    """
+    Keep the coming months' transactions partitions created ahead of inserts.
+    """
+    partitions.ensure_future_partitions_once()
+
+
+# Per-route metrics on GET /metrics and the slow query log on GET /admin/slow_queries.
+instrumentation.install(app, gauges=lambda: {**database.pool_gauges(), **group_commit.gauges()},
+                        explain_connect=database.dedicated_connection)
+
+# Replay the stored response when a retried create carries the same Idempotency-Key.
+idempotency.install(app, [("POST", "/transactions/")], scope_name="transaction-service")
 
 
 @app.post("/transactions/", response_model=schemas.Transaction, status_code=status.HTTP_201_CREATED)
-def create_transaction(transaction: schemas.TransactionCreate, db=Depends(get_db)):
+def create_transaction(transaction: schemas.TransactionCreate, request: Request, db=Depends(get_db)):
     """
     Create a new financial transaction.
 
@@ -39,13 +68,159 @@ def create_transaction(transaction: schemas.TransactionCreate, db=Depends(get_db
     - Transaction schema of the newly created transaction.
     """
     try:
-        result = crud.create_transaction(db, transaction)
+        result = crud.create_transaction(db, transaction, idempotency.take_key(request))
         return result
+    except idempotency.ClaimLost as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         logger.exception("Error creating transaction")
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@app.get("/transactions/", response_model=schemas.TransactionList)
+def list_transactions(account_id: int = None, transaction_type: str = None,
+                      start_date: datetime.datetime = None, end_date: datetime.datetime = None,
+                      min_amount: float = None, max_amount: float = None,
+                      cursor: str = None, limit: int = Query(100, ge=1, le=1000), ids: str = None,
+                      db=Depends(get_db)):
+    """
+    List transactions, newest first, with optional filters.
+
+    Pages are keyed on (date, id) rather than OFFSET, so every page costs the
+    same however deep it is.
+
+    Parameters:
+    - ids: Comma-separated ids to look up instead, as POST /transactions/batch_get
+      does; the other parameters are then ignored.
+    - account_id, transaction_type: Exact-match filters.
+    - start_date, end_date: Date range; start inclusive, end exclusive.
+    - min_amount, max_amount: Inclusive amount range.
+    - cursor: next_cursor from the previous page.
+    - limit: Page size (1-1000).
+
+    Returns:
+    - TransactionList schema with the page and the cursor of the next one.
+    """
+    if ids is not None:
+        try:
+            return _get_transactions_by_id(db, utils.parse_ids(ids))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    try:
+        after = utils.decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    transactions = crud.list_transactions(
+        db, account_id=account_id, transaction_type=transaction_type,
+        start_date=start_date, end_date=end_date, min_amount=min_amount, max_amount=max_amount,
+        after=after, limit=limit + 1
+    )
+    next_cursor = utils.encode_cursor(transactions[limit - 1]) if len(transactions) > limit else None
+    return schemas.TransactionList(transactions=transactions[:limit], next_cursor=next_cursor)
+
+
+@app.post("/transactions/batch_get", response_model=schemas.TransactionList)
+def batch_get_transactions(request: schemas.TransactionBatchGet, db=Depends(get_db)):
+    """
+    Retrieve many transactions by ID in one database round trip.
+
+    Parameters:
+    - request: TransactionBatchGet schema with up to utils.MAX_BATCH_IDS ids.
+
+    Returns:
+    - TransactionList schema with the transactions in requested order and the
+      ids that were not found.
+    """
+    return _get_transactions_by_id(db, request.ids)
+
+
+def _get_transactions_by_id(db, ids):
+    if len(ids) > utils.MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {utils.MAX_BATCH_IDS} ids per request")
+    return utils.order_by_ids(ids, crud.get_transactions(db, ids))
+
+
+@app.get("/transactions/search", response_model=schemas.TransactionList)
+def search_transactions(q: str = Query(..., min_length=1, max_length=200),
+                        match: str = Query("words", pattern="^(words|substring)$"),
+                        sort: str = Query("rank", pattern="^(rank|date)$"),
+                        account_id: int = None, start_date: datetime.datetime = None,
+                        end_date: datetime.datetime = None, cursor: str = None,
+                        limit: int = Query(50, ge=1, le=500), db=Depends(get_db)):
+    """
+    Search transactions by description.
+
+    Parameters:
+    - q: Search text. With match=words it is parsed like a web search
+      ("rent march", quoted phrases, OR, -word) and matched on stemmed words;
+      with match=substring it is matched anywhere in the description and
+      must be at least 3 characters long.
+    - sort: "rank" (best match first) or "date" (newest first). Substring
+      matches are always sorted by date. On very common words, sorting by
+      date avoids ranking every match and is much faster.
+    - account_id, start_date, end_date: Narrow the search; date bounds also
+      limit the monthly partitions scanned.
+    - cursor: next_cursor from the previous page.
+    - limit: Page size (1-500).
+
+    Returns:
+    - TransactionList schema with the page and the cursor of the next one.
+    """
+    if match == "substring":
+        if len(q) < 3:
+            raise HTTPException(status_code=400, detail="Substring searches need at least 3 characters")
+        sort = "date"
+    try:
+        after = utils.decode_cursor(cursor, ranked=sort == "rank") if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    results = crud.search_transactions(
+        db, q, match=match, sort=sort, account_id=account_id, start_date=start_date,
+        end_date=end_date, after=after, limit=limit + 1
+    )
+    next_cursor = utils.encode_cursor(*results[limit - 1]) if len(results) > limit else None
+    return schemas.TransactionList(transactions=[transaction for transaction, _ in results[:limit]],
+                                   next_cursor=next_cursor)
+
+
+@app.get("/transactions/export")
+def export_transactions(account_id: int = None, transaction_type: str = None,
+                        start_date: datetime.datetime = None, end_date: datetime.datetime = None,
+                        min_amount: float = None, max_amount: float = None,
+                        format: str = Query("csv", pattern="^(csv|ndjson)$"), gzip: bool = False):
+    """
+    Stream every matching transaction in chronological order as CSV or NDJSON.
+
+    Rows are read through a server-side cursor one batch at a time, so memory
+    use does not grow with the size of the export.
+
+    Parameters:
+    - account_id, transaction_type: Exact-match filters.
+    - start_date, end_date: Date range; start inclusive, end exclusive.
+    - min_amount, max_amount: Inclusive amount range.
+    - format: "csv" or "ndjson".
+    - gzip: Compress the stream on the fly.
+
+    Returns:
+    - Streaming file download.
+    """
+    filters = dict(account_id=account_id, transaction_type=transaction_type, start_date=start_date,
+                   end_date=end_date, min_amount=min_amount, max_amount=max_amount)
+
+    def stream():
+        # The stream outlives the request handler, so it holds its own connection.
+        db = database.get_connection()
+        try:
+            yield from utils.export_chunks(crud.iter_transaction_batches(db, **filters), format, gzip)
+        finally:
+            database.release_connection(db)
+
+    filename = f"transactions.{format}" + (".gz" if gzip else "")
+    media_type = "application/gzip" if gzip else ("text/csv" if format == "csv" else "application/x-ndjson")
+    return StreamingResponse(stream(), media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
 @app.get("/transactions/{transaction_id}", response_model=schemas.Transaction)
 def read_transaction(transaction_id: int, db=Depends(get_db)):
     """
@@ -100,3 +275,53 @@ def delete_transaction(transaction_id: int, db=Depends(get_db)):
     except Exception as e:
         logger.exception("Error deleting transaction")
         raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/transactions/bulk", response_model=schemas.BulkImportResult)
+async def bulk_import_transactions(request: Request, db=Depends(get_db)):
+    """
+    Import many transactions from an NDJSON or CSV request body.
+
+    The body is spooled to a temporary file as it arrives, then rows are
+    validated against TransactionImport in batches and loaded with COPY in a
+    single database transaction. Invalid rows are skipped and reported.
+
+    Parameters:
+    - request: Body with Content-Type application/x-ndjson (one JSON object per
+      line) or text/csv (header row with description, amount, account_id,
+      transaction_type and optionally date).
+
+    Returns:
+    - BulkImportResult schema with counts and per-row errors.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "csv" in content_type:
+        parse = utils.iter_csv
+    elif "json" in content_type:
+        parse = utils.iter_ndjson
+    else:
+        raise HTTPException(status_code=415, detail="Send application/x-ndjson or text/csv")
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as upload:
+        async for chunk in request.stream():
+            upload.write(chunk)
+        upload.seek(0)
+        report = utils.ImportReport()
+        try:
+            inserted = await run_in_threadpool(
+                crud.bulk_create_transactions, db, utils.validate_import_rows(parse(upload), report)
+            )
+        except Exception as e:
+            logger.exception("Error importing transactions")
+            raise HTTPException(status_code=400, detail=str(e))
+    return report.result(inserted)
+
+
+# Serve the hot endpoints from the asyncpg engine when DB_ENGINE=asyncpg.
+if async_database.ENABLED:
+    from . import async_main
+    async_main.install(app)
+
+# Coalesce concurrent creates into group commits when TRANSACTION_WRITE_MODE=grouped.
+if group_commit.ENABLED:
+    from . import async_main
+    async_main.install(app, group_commit.router)
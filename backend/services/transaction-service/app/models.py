@@ -2,6 +2,8 @@
 Database models for the Transaction Service.
 """
 
+from .migrate import Migration
+
 # Since we're using direct SQL queries, models.py may not be necessary.
 # However, for clarity, we can define table creation SQL statements here.
 
@@ -15,3 +17,392 @@ CREATE TABLE IF NOT EXISTS transactions (
     transaction_type VARCHAR(10) NOT NULL  -- 'Debit' or 'Credit'
 );
 """
+
+transactions_account_id_index_creation = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_account_id_date
+ON transactions (account_id, date);
+"""
+
+transactions_date_index_creation = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_date
+ON transactions (date);
+"""
+
+transactions_credit_index_creation = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_credit_account
+ON transactions (account_id) INCLUDE (amount)
+WHERE transaction_type = 'Credit';
+"""
+
+transactions_debit_index_creation = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_debit_account
+ON transactions (account_id) INCLUDE (amount)
+WHERE transaction_type = 'Debit';
+"""
+
+transactions_date_id_index_creation = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_date_id
+ON transactions (date, id);
+"""
+
+transactions_account_date_id_index_creation = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_account_date_id
+ON transactions (account_id, date, id);
+"""
+
+# Superseded by the (date, id) keyset indexes above.
+transactions_superseded_indexes_removal = [
+    "DROP INDEX CONCURRENTLY IF EXISTS idx_transactions_account_id_date;",
+    "DROP INDEX CONCURRENTLY IF EXISTS idx_transactions_date;",
+]
+
+# Monthly range partitions on date. Partitions are named transactions_yYYYYmMM;
+# rows outside every monthly range land in transactions_default.
+transaction_partition_function_creation = """
+CREATE OR REPLACE FUNCTION create_transaction_partitions(first_month DATE, last_month DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    partition_start DATE := date_trunc('month', first_month);
+    partition_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    WHILE partition_start <= last_month LOOP
+        partition_name := 'transactions_y' || to_char(partition_start, 'YYYY"m"MM');
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF transactions FOR VALUES FROM (%L) TO (%L)',
+                partition_name, partition_start, partition_start + INTERVAL '1 month'
+            );
+            created := created + 1;
+        END IF;
+        partition_start := partition_start + INTERVAL '1 month';
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# Rebuilds transactions as a partitioned table in one transaction. Every row is
+# copied, so on a large table run it in a maintenance window. The id sequence
+# is kept. The primary key becomes (id, date) because it must contain the
+# partition key. The accounts foreign key is kept if the old table had one.
+transactions_partitioning = [
+    "ALTER TABLE transactions RENAME TO transactions_unpartitioned;",
+    "ALTER SEQUENCE transactions_id_seq OWNED BY NONE;",
+    "CREATE TABLE transactions (LIKE transactions_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE (date);",
+    "ALTER TABLE transactions ALTER COLUMN date SET NOT NULL, ADD PRIMARY KEY (id, date);",
+    transaction_partition_function_creation,
+    """
+    SELECT create_transaction_partitions(
+        COALESCE((SELECT MIN(date) FROM transactions_unpartitioned), NOW() AT TIME ZONE 'UTC')::date,
+        ((NOW() AT TIME ZONE 'UTC') + INTERVAL '3 months')::date
+    );
+    """,
+    "CREATE TABLE transactions_default PARTITION OF transactions DEFAULT;",
+    """
+    INSERT INTO transactions (id, description, amount, date, account_id, transaction_type)
+    SELECT id, description, amount, COALESCE(date, NOW() AT TIME ZONE 'UTC'), account_id, transaction_type
+    FROM transactions_unpartitioned;
+    """,
+    """
+    DO $$
+    BEGIN
+        IF EXISTS (
+            SELECT 1 FROM pg_constraint
+            WHERE conrelid = 'transactions_unpartitioned'::regclass AND contype = 'f'
+        ) THEN
+            ALTER TABLE transactions ADD CONSTRAINT transactions_account_id_fkey
+                FOREIGN KEY (account_id) REFERENCES accounts(id);
+        END IF;
+    END $$;
+    """,
+    "ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id;",
+    "DROP TABLE transactions_unpartitioned;",
+    # Partitioned indexes cannot be built CONCURRENTLY; the new table is not
+    # visible to other sessions until commit anyway.
+    "CREATE INDEX idx_transactions_date_id ON transactions (date, id);",
+    "CREATE INDEX idx_transactions_account_date_id ON transactions (account_id, date, id);",
+    """
+    CREATE INDEX idx_transactions_credit_account ON transactions (account_id) INCLUDE (amount)
+    WHERE transaction_type = 'Credit';
+    """,
+    """
+    CREATE INDEX idx_transactions_debit_account ON transactions (account_id) INCLUDE (amount)
+    WHERE transaction_type = 'Debit';
+    """,
+]
+
+# Full-text search on description. Adding a stored generated column rewrites
+# every partition under an exclusive lock, so the indexes are built in the same
+# transaction rather than CONCURRENTLY (which partitioned tables reject anyway).
+transactions_search = [
+    """
+    ALTER TABLE transactions ADD COLUMN description_tsv tsvector
+    GENERATED ALWAYS AS (to_tsvector('english'::regconfig, COALESCE(description, ''))) STORED;
+    """,
+    "CREATE INDEX idx_transactions_description_tsv ON transactions USING GIN (description_tsv);",
+    # Trigram index for substring (ILIKE '%...%') matches on partial words and references.
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+    "CREATE INDEX idx_transactions_description_trgm ON transactions USING GIN (description gin_trgm_ops);",
+]
+
+# Outbox of change events, written in the same statement as each transaction
+# write and published in id order by `python -m app.outbox relay`.
+transaction_events_table_creation = """
+CREATE TABLE IF NOT EXISTS transaction_events (
+    id BIGSERIAL PRIMARY KEY,
+    event_type VARCHAR(10) NOT NULL,  -- 'created', 'updated' or 'deleted'
+    transaction_id INTEGER NOT NULL,
+    payload JSONB NOT NULL,  -- {"old": row or null, "new": row or null}
+    created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (NOW() AT TIME ZONE 'UTC'),
+    published_at TIMESTAMP WITHOUT TIME ZONE
+);
+"""
+
+transaction_events_unpublished_index_creation = """
+CREATE INDEX IF NOT EXISTS idx_transaction_events_unpublished
+ON transaction_events (id) WHERE published_at IS NULL;
+"""
+
+# Stored responses for Idempotency-Key replays (see app/idempotency.py). The
+# table is shared by the services that accept the header; keys are scoped by service.
+idempotency_keys_table_creation = """
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key_hash BYTEA PRIMARY KEY,  -- SHA-256 of service, method, path and key
+    request_hash BYTEA NOT NULL,  -- SHA-256 of the request body
+    status_code SMALLINT,  -- NULL while the first attempt is running
+    content_type VARCHAR(100),
+    body BYTEA,
+    expires_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+);
+"""
+
+idempotency_keys_expiry_index_creation = """
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys (expires_at);
+"""
+
+# Ledger version counter read by account-service's statement caches; the same
+# definitions as account-service's migration 3, which may not have run yet.
+ledger_version_table_creation = """
+CREATE TABLE IF NOT EXISTS ledger_version (
+    shard SMALLINT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+INSERT INTO ledger_version (shard) SELECT generate_series(0, 15) ON CONFLICT DO NOTHING;
+"""
+
+ledger_version_function_creation = """
+CREATE OR REPLACE FUNCTION bump_ledger_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE ledger_version SET version = version + 1 WHERE shard = pg_backend_pid() % 16;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# Per-account, per-day debit and credit totals, kept current by statement-level
+# triggers on transactions so date-ranged statements read one row per account
+# and day instead of every transaction. The triggers see the written rows
+# through transition tables, so multi-row inserts, updates and bulk COPY imports
+# each cost one upsert statement. Partitions removed by `python -m app.partitions
+# archive` bypass the triggers, so archived years stay in the totals.
+daily_account_totals_table_creation = """
+CREATE TABLE IF NOT EXISTS daily_account_totals (
+    account_id INTEGER NOT NULL,
+    day DATE NOT NULL,
+    debit_total NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    credit_total NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    transaction_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (account_id, day)
+);
+"""
+
+# Aggregates signed rows (sign 1 for new, -1 for old) into daily totals.
+DAILY_TOTALS_SELECTION = """
+    SELECT account_id, date::date,
+           SUM(CASE WHEN transaction_type = 'Debit' THEN sign * amount ELSE 0 END),
+           SUM(CASE WHEN transaction_type = 'Credit' THEN sign * amount ELSE 0 END),
+           SUM(sign)
+    FROM ({rows}) r
+    GROUP BY account_id, date::date
+    ORDER BY account_id, date::date
+"""
+
+_DAILY_TOTALS_UPSERT = """
+        INSERT INTO daily_account_totals AS d (account_id, day, debit_total, credit_total, transaction_count)
+        {selection}
+        ON CONFLICT (account_id, day) DO UPDATE SET
+            debit_total = d.debit_total + EXCLUDED.debit_total,
+            credit_total = d.credit_total + EXCLUDED.credit_total,
+            transaction_count = d.transaction_count + EXCLUDED.transaction_count;
+"""
+
+_NEW_ROWS = "SELECT account_id, date, amount, transaction_type, 1 AS sign FROM new_rows"
+_OLD_ROWS = "SELECT account_id, date, amount, transaction_type, -1 AS sign FROM old_rows"
+
+daily_account_totals_function_creation = f"""
+CREATE OR REPLACE FUNCTION roll_up_transactions() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+{_DAILY_TOTALS_UPSERT.format(selection=DAILY_TOTALS_SELECTION.format(rows=_NEW_ROWS))}
+    ELSIF TG_OP = 'UPDATE' THEN
+{_DAILY_TOTALS_UPSERT.format(selection=DAILY_TOTALS_SELECTION.format(rows=_NEW_ROWS + " UNION ALL " + _OLD_ROWS))}
+    ELSIF TG_OP = 'DELETE' THEN
+{_DAILY_TOTALS_UPSERT.format(selection=DAILY_TOTALS_SELECTION.format(rows=_OLD_ROWS))}
+    ELSE
+        DELETE FROM daily_account_totals;
+    END IF;
+    UPDATE ledger_version SET version = version + 1 WHERE shard = pg_backend_pid() % 16;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# Writes are blocked from the triggers' creation until the backfill commits, so
+# every row is counted exactly once.
+daily_account_totals = [
+    daily_account_totals_table_creation,
+    ledger_version_table_creation,
+    ledger_version_function_creation,
+    daily_account_totals_function_creation,
+    "LOCK TABLE transactions IN SHARE ROW EXCLUSIVE MODE;",
+    """
+    CREATE TRIGGER transactions_roll_up_insert AFTER INSERT ON transactions
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION roll_up_transactions();
+    """,
+    """
+    CREATE TRIGGER transactions_roll_up_update AFTER UPDATE ON transactions
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION roll_up_transactions();
+    """,
+    """
+    CREATE TRIGGER transactions_roll_up_delete AFTER DELETE ON transactions
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION roll_up_transactions();
+    """,
+    """
+    CREATE TRIGGER transactions_roll_up_truncate AFTER TRUNCATE ON transactions
+    FOR EACH STATEMENT EXECUTE FUNCTION roll_up_transactions();
+    """,
+    "INSERT INTO daily_account_totals (account_id, day, debit_total, credit_total, transaction_count)"
+    + DAILY_TOTALS_SELECTION.format(
+        rows="SELECT account_id, date, amount, transaction_type, 1 AS sign FROM transactions"
+    ).rstrip() + ";",
+]
+
+# Covers the trial balance's per-account sums, so they stream from an
+# index-only scan in account order.
+daily_account_totals_covering_index_creation = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_daily_account_totals_account_day
+ON daily_account_totals (account_id, day) INCLUDE (debit_total, credit_total);
+"""
+
+# Backfills accounts.opening_balance, the part of each balance set directly
+# through ledger-service rather than by transactions, so `python -m
+# app.balances` can recompute balances without discarding it. accounts and the
+# column belong to ledger-service (its migrations 1 and 3), so ledger-service
+# must be migrated first; this fails rather than guessing otherwise. The
+# existing balances minus their transactions become the baseline.
+account_opening_balances = [
+    """
+    DO $$
+    BEGIN
+        IF to_regclass('accounts') IS NULL OR NOT EXISTS (
+            SELECT 1 FROM pg_attribute
+            WHERE attrelid = 'accounts'::regclass AND attname = 'opening_balance' AND NOT attisdropped
+        ) THEN
+            RAISE EXCEPTION 'accounts.opening_balance does not exist; apply ledger-service migrations first';
+        END IF;
+    END $$;
+    """,
+    "LOCK TABLE transactions IN SHARE MODE;",
+    """
+    UPDATE accounts SET opening_balance = COALESCE(balance, 0) - COALESCE((
+        SELECT SUM(d.credit_total - d.debit_total) FROM daily_account_totals d
+        WHERE d.account_id = accounts.id
+    ), 0);
+    """,
+]
+
+# Replaces migration 4's create_transaction_partitions. Creating a partition
+# fails while transactions_default holds rows in its range (imports of old
+# dates, or a month the startup check had not reached), so those rows are first
+# moved out of the default partition and then into the new one. Both steps
+# touch the partitions directly, so the statement-level rollup triggers on
+# transactions do not fire and the daily totals stay as they are.
+transaction_partition_function_update = """
+CREATE OR REPLACE FUNCTION create_transaction_partitions(first_month DATE, last_month DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    partition_start DATE := date_trunc('month', first_month);
+    partition_end DATE;
+    partition_name TEXT;
+    stored_columns TEXT;
+    created INTEGER := 0;
+BEGIN
+    SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum) INTO stored_columns
+    FROM pg_attribute
+    WHERE attrelid = 'transactions'::regclass AND attnum > 0 AND NOT attisdropped AND attgenerated = '';
+    WHILE partition_start <= last_month LOOP
+        partition_end := partition_start + INTERVAL '1 month';
+        partition_name := 'transactions_y' || to_char(partition_start, 'YYYY"m"MM');
+        IF to_regclass(partition_name) IS NULL THEN
+            IF EXISTS (
+                SELECT 1 FROM transactions_default WHERE date >= partition_start AND date < partition_end
+            ) THEN
+                EXECUTE format(
+                    'CREATE TEMPORARY TABLE transactions_moving AS SELECT %s FROM transactions_default '
+                    'WHERE date >= %L AND date < %L',
+                    stored_columns, partition_start, partition_end
+                );
+                DELETE FROM transactions_default WHERE date >= partition_start AND date < partition_end;
+            END IF;
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF transactions FOR VALUES FROM (%L) TO (%L)',
+                partition_name, partition_start, partition_end
+            );
+            IF to_regclass('pg_temp.transactions_moving') IS NOT NULL THEN
+                EXECUTE format(
+                    'INSERT INTO %I (%s) SELECT %s FROM transactions_moving',
+                    partition_name, stored_columns, stored_columns
+                );
+                DROP TABLE pg_temp.transactions_moving;
+            END IF;
+            created := created + 1;
+        END IF;
+        partition_start := partition_end;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+SERVICE = "transaction-service"
+
+# Applied in order by `python -m app.migrate`; never edit a released migration, add a new one.
+MIGRATIONS = [
+    Migration(1, "create tables", [transaction_table_creation]),
+    # Built without blocking writes, for per-account and date-range transaction queries.
+    Migration(2, "add indexes", [
+        transactions_account_id_index_creation,
+        transactions_date_index_creation,
+        transactions_credit_index_creation,
+        transactions_debit_index_creation,
+    ], transactional=False),
+    # Keyset pagination on (date, id), with and without an account filter.
+    Migration(3, "keyset pagination indexes", [
+        transactions_date_id_index_creation,
+        transactions_account_date_id_index_creation,
+        *transactions_superseded_indexes_removal,
+    ], transactional=False),
+    Migration(4, "partition transactions by month", transactions_partitioning),
+    Migration(5, "description search", transactions_search),
+    Migration(6, "transaction events outbox", [
+        transaction_events_table_creation,
+        transaction_events_unpublished_index_creation,
+    ]),
+    Migration(7, "idempotency keys", [idempotency_keys_table_creation, idempotency_keys_expiry_index_creation]),
+    Migration(8, "daily account totals", daily_account_totals),
+    Migration(9, "trial balance index", [daily_account_totals_covering_index_creation], transactional=False),
+    Migration(10, "account opening balances", account_opening_balances),
+    Migration(11, "move default partition rows into new partitions", [transaction_partition_function_update]),
+]
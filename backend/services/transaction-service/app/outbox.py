@@ -0,0 +1,214 @@
+"""
+Relay of the transaction_events outbox.
+
+Every transaction create, update and delete (including bulk imports) writes a
+change event to transaction_events in the same database transaction, so an
+event exists exactly when its write committed. The relay publishes unpublished
+events in batches, in id order, to a broker and then marks them published.
+
+Delivery is at least once: if the relay stops between publishing a batch and
+marking it, the batch is published again, so consumers should skip event ids
+they have already applied. Events of one transaction are always published in
+the order they were written, because writes to the same row are serialised.
+An advisory lock keeps a single relay running at a time.
+
+The brokers here are local stand-ins: MemoryBroker delivers to in-process
+subscribers and FileBroker appends NDJSON to a file that consumers tail.
+Anything with a publish(events) method can take their place.
+
+Usage (from the service directory, with the DB_* environment variables set):
+
+    python -m app.outbox relay --file events.ndjson          # publish continuously
+    python -m app.outbox relay --file events.ndjson --once   # publish the backlog and exit
+    python -m app.outbox purge --days 7                      # delete old published events
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Events published per broker call.
+RELAY_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", 500))
+
+# Seconds the relay sleeps once the outbox is drained.
+POLL_INTERVAL = float(os.environ.get("OUTBOX_POLL_INTERVAL", 1.0))
+
+RELAY_LOCK_KEY = zlib.crc32(b"transaction_events:relay")
+
+
+class MemoryBroker:
+    """
+    In-process broker keeping every published event and passing each batch to subscribers.
+    """
+
+    def __init__(self):
+        self.events = []
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        """
+        Call `callback(events)` with every batch published from now on.
+        """
+        self._subscribers.append(callback)
+
+    def publish(self, events):
+        self.events.extend(events)
+        for callback in self._subscribers:
+            callback(events)
+
+
+class FileBroker:
+    """
+    Broker appending events as NDJSON lines to a file, synced to disk per batch.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def publish(self, events):
+        with open(self.path, "a", encoding="utf-8") as stream:
+            stream.write("".join(json.dumps(event) + "\n" for event in events))
+            stream.flush()
+            os.fsync(stream.fileno())
+
+
+def _row_to_event(row):
+    return {
+        "id": row[0],
+        "type": row[1],
+        "transaction_id": row[2],
+        "payload": row[3],
+        "created_at": row[4].isoformat(),
+    }
+
+
+def relay_batch(db, broker, batch_size=RELAY_BATCH_SIZE):
+    """
+    Publish the oldest unpublished events and mark them published.
+
+    Returns:
+    - Number of events published.
+    """
+    cursor = db.cursor()
+    try:
+        cursor.execute(
+            """
+            SELECT id, event_type, transaction_id, payload, created_at FROM transaction_events
+            WHERE published_at IS NULL ORDER BY id LIMIT %s FOR UPDATE;
+            """,
+            (batch_size,)
+        )
+        rows = cursor.fetchall()
+        if rows:
+            broker.publish([_row_to_event(row) for row in rows])
+            cursor.execute(
+                "UPDATE transaction_events SET published_at = NOW() AT TIME ZONE 'UTC' WHERE id = ANY(%s);",
+                ([row[0] for row in rows],)
+            )
+        db.commit()
+        return len(rows)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def relay(db, broker, batch_size=RELAY_BATCH_SIZE, poll_interval=POLL_INTERVAL, once=False, stop=None):
+    """
+    Publish events until `stop` is set, or until the outbox is drained if `once`.
+
+    Parameters:
+    - db: A dedicated (unpooled) connection; it holds the relay's advisory lock.
+    - broker: Object with a publish(events) method.
+    - stop: Optional threading.Event ending the loop.
+
+    Returns:
+    - Number of events published, or None if another relay holds the lock.
+    """
+    stop = stop or threading.Event()
+    cursor = db.cursor()
+    cursor.execute("SELECT pg_try_advisory_lock(%s);", (RELAY_LOCK_KEY,))
+    locked = cursor.fetchone()[0]
+    db.commit()
+    if not locked:
+        cursor.close()
+        logger.warning("Another outbox relay is running")
+        return None
+    published = 0
+    try:
+        while not stop.is_set():
+            count = relay_batch(db, broker, batch_size)
+            published += count
+            if count < batch_size:
+                if once:
+                    break
+                stop.wait(poll_interval)
+    finally:
+        cursor.execute("SELECT pg_advisory_unlock(%s);", (RELAY_LOCK_KEY,))
+        db.commit()
+        cursor.close()
+    return published
+
+
+def purge_published(db, older_than_days: int):
+    """
+    Delete events published more than `older_than_days` days ago.
+
+    Returns:
+    - Number of events deleted.
+    """
+    cursor = db.cursor()
+    try:
+        cursor.execute(
+            """
+            DELETE FROM transaction_events
+            WHERE published_at < (NOW() AT TIME ZONE 'UTC') - make_interval(days => %s);
+            """,
+            (older_than_days,)
+        )
+        db.commit()
+        return cursor.rowcount
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def main():
+    from . import database
+
+    parser = argparse.ArgumentParser(description="Publish or purge transaction change events.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    relay_parser = commands.add_parser("relay", help="Publish unpublished events")
+    relay_parser.add_argument("--file", required=True, help="NDJSON file the events are appended to")
+    relay_parser.add_argument("--batch-size", type=int, default=RELAY_BATCH_SIZE)
+    relay_parser.add_argument("--once", action="store_true", help="Exit once the outbox is drained")
+    purge_parser = commands.add_parser("purge", help="Delete old published events")
+    purge_parser.add_argument("--days", type=int, default=7, help="Keep events published this recently")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    conn = database.dedicated_connection()
+    try:
+        if args.command == "relay":
+            try:
+                published = relay(conn, FileBroker(args.file), args.batch_size, once=args.once)
+            except KeyboardInterrupt:
+                return
+            if published is not None:
+                logger.info("Published %s events to %s", published, args.file)
+        else:
+            logger.info("Deleted %s published events", purge_published(conn, args.days))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Maintenance of the monthly transactions partitions.
+
+Migration 4 turns transactions into a table range-partitioned by month on
+date, named transactions_yYYYYmMM, with transactions_default catching rows
+outside every monthly range. Future months are created ahead of time on
+service startup (at most every ENSURE_INTERVAL seconds per process) so that
+inserts never fall through to the default partition. Rows that do land there
+(bulk imports of past dates) are moved into their month's partition when it
+is created: migration 11 makes create_transaction_partitions() do so, and
+bulk imports create the partitions for the months they wrote. Old years can be
+detached and archived in one metadata-only step instead of a bulk DELETE.
+
+Usage (from the service directory, with the DB_* environment variables set):
+
+    python -m app.partitions ensure              # create the next months' partitions
+    python -m app.partitions list                # show partitions and their bounds
+    python -m app.partitions archive 2021        # move 2021 into the archive schema
+    python -m app.partitions archive 2021 --drop # drop 2021 outright
+"""
+
+import argparse
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Months of empty partitions kept ahead of the current one.
+MONTHS_AHEAD = int(os.environ.get("TRANSACTION_PARTITIONS_AHEAD", 3))
+
+# Seconds between partition checks in one process (warm Lambdas run startup often).
+ENSURE_INTERVAL = float(os.environ.get("TRANSACTION_PARTITIONS_CHECK_INTERVAL", 12 * 3600))
+
+_last_ensured = None
+_ensure_lock = threading.Lock()
+
+
+def ensure_future_partitions(db, months_ahead=MONTHS_AHEAD):
+    """
+    Create any missing monthly partitions from the current month to months_ahead months ahead.
+
+    Returns:
+    - Number of partitions created.
+    """
+    cursor = db.cursor()
+    try:
+        cursor.execute(
+            """
+            SELECT create_transaction_partitions(
+                (NOW() AT TIME ZONE 'UTC')::date,
+                ((NOW() AT TIME ZONE 'UTC') + make_interval(months => %s))::date
+            );
+            """,
+            (months_ahead,)
+        )
+        created = cursor.fetchone()[0]
+        db.commit()
+        return created
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def ensure_month_partitions(db, months):
+    """
+    Create any missing monthly partitions for the given months, moving their
+    rows out of transactions_default.
+
+    Parameters:
+    - months: Dates within the months to cover.
+
+    Returns:
+    - Number of partitions created.
+    """
+    cursor = db.cursor()
+    try:
+        cursor.execute(
+            "SELECT COALESCE(SUM(create_transaction_partitions(month, month)), 0) "
+            "FROM unnest(%s::date[]) AS month;",
+            (sorted(months),)
+        )
+        created = cursor.fetchone()[0]
+        db.commit()
+        return created
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def ensure_future_partitions_once():
+    """
+    Run ensure_future_partitions() on a pooled connection unless this process did so recently.
+
+    Failures are logged rather than raised so that a missing migration or an
+    unreachable database does not stop the service from starting.
+    """
+    global _last_ensured
+    from . import database
+
+    with _ensure_lock:
+        now = time.monotonic()
+        if _last_ensured is not None and now - _last_ensured < ENSURE_INTERVAL:
+            return
+        _last_ensured = now
+    try:
+        db = database.get_connection()
+    except Exception:
+        logger.exception("Could not connect to create transaction partitions")
+        return
+    try:
+        created = ensure_future_partitions(db)
+        if created:
+            logger.info("Created %s transaction partitions", created)
+    except Exception:
+        logger.exception("Could not create transaction partitions")
+    finally:
+        database.release_connection(db)
+
+
+def list_partitions(db):
+    """
+    List the partitions of transactions.
+
+    Returns:
+    - List of (partition name, bound expression) tuples ordered by name.
+    """
+    cursor = db.cursor()
+    try:
+        cursor.execute(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = 'transactions'
+            ORDER BY child.relname;
+            """
+        )
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def archive_year(db, year: int, archive_schema: str = "archive", drop: bool = False):
+    """
+    Detach every monthly partition of a year, then move it to archive_schema or drop it.
+
+    The partitions are detached in one transaction. DETACH ... CONCURRENTLY is
+    not usable because the table has a default partition.
+
+    Parameters:
+    - year: Calendar year whose partitions are removed.
+    - archive_schema: Schema receiving the detached tables (created if missing).
+    - drop: Drop the detached tables instead of archiving them.
+
+    Returns:
+    - Names of the partitions removed.
+    """
+    prefix = f"transactions_y{year:04d}m"
+    names = [name for name, _ in list_partitions(db) if name.startswith(prefix)]
+    cursor = db.cursor()
+    try:
+        if names and not drop:
+            cursor.execute(f'CREATE SCHEMA IF NOT EXISTS "{archive_schema}";')
+        for name in names:
+            cursor.execute(f'ALTER TABLE transactions DETACH PARTITION "{name}";')
+            if drop:
+                cursor.execute(f'DROP TABLE "{name}";')
+            else:
+                cursor.execute(f'ALTER TABLE "{name}" SET SCHEMA "{archive_schema}";')
+        db.commit()
+        return names
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def main():
+    from . import database
+
+    parser = argparse.ArgumentParser(description="Maintain the monthly transactions partitions.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ensure = commands.add_parser("ensure", help="Create partitions for the coming months")
+    ensure.add_argument("--months", type=int, default=MONTHS_AHEAD, help="Months ahead to cover")
+    commands.add_parser("list", help="Show partitions and their bounds")
+    archive = commands.add_parser("archive", help="Detach a year's partitions")
+    archive.add_argument("year", type=int)
+    archive.add_argument("--schema", default="archive", help="Schema the detached tables move to")
+    archive.add_argument("--drop", action="store_true", help="Drop the detached tables instead")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    conn = database.dedicated_connection()
+    try:
+        if args.command == "ensure":
+            logger.info("Created %s partitions", ensure_future_partitions(conn, args.months))
+        elif args.command == "list":
+            for name, bound in list_partitions(conn):
+                print(f"{name:<28} {bound}")
+        else:
+            names = archive_year(conn, args.year, args.schema, args.drop)
+            action = "Dropped" if args.drop else f"Moved to {args.schema}:"
+            logger.info("%s %s", action, ", ".join(names) if names else "nothing")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
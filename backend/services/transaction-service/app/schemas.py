@@ -3,6 +3,7 @@ Pydantic schemas for data validation and serialization.
 """
 
 from pydantic import BaseModel
+from typing import List, Optional
 import datetime
 
 class TransactionBase(BaseModel):
@@ -38,3 +39,41 @@ class Transaction(TransactionBase):
 
     class Config:
         orm_mode = True
+
+class TransactionList(BaseModel):
+    """
+    Schema representing one page of transactions, newest first, or the result
+    of a lookup by id in requested order with the ids that were not found.
+    """
+    transactions: List[Transaction]
+    next_cursor: Optional[str] = None
+    missing: Optional[List[int]] = None
+
+class TransactionBatchGet(BaseModel):
+    """
+    Schema for looking up many transactions by id.
+    """
+    ids: List[int]
+
+class TransactionImport(TransactionCreate):
+    """
+    Schema for one row of a bulk import; the date defaults to the import time.
+    """
+    date: Optional[datetime.datetime] = None
+
+class BulkImportError(BaseModel):
+    """
+    Schema describing why one row of a bulk import was rejected.
+    """
+    line: int
+    errors: List[str]
+
+class BulkImportResult(BaseModel):
+    """
+    Schema summarising a bulk import.
+    """
+    received: int
+    inserted: int
+    failed: int
+    errors: List[BulkImportError]
+    errors_truncated: bool = False
@@ -2,6 +2,22 @@
 Utility functions for the Transaction Service.
 """
 
+from pydantic import ValidationError
+from . import schemas
+import base64
+import csv
+import datetime
+import io
+import json
+import zlib
+
+# Rejected rows reported back individually; the rest are only counted.
+MAX_REPORTED_ERRORS = 1000
+
+# Ids accepted by one lookup by id.
+MAX_BATCH_IDS = 5000
+
+
 def validate_transaction_type(transaction_type: str) -> bool:
     """
     Validate the transaction type.
@@ -13,3 +29,220 @@ def validate_transaction_type(transaction_type: str) -> bool:
     - True if valid, False otherwise.
     """
     return transaction_type in ["Debit", "Credit"]
+
+
+def encode_cursor(transaction, rank=None):
+    """
+    Build the opaque pagination cursor pointing after a transaction.
+
+    Parameters:
+    - transaction: Last Transaction of the page.
+    - rank: Its search rank, for pages of search results sorted by rank.
+    """
+    key = [transaction.date.isoformat(), transaction.id]
+    if rank is not None:
+        key.insert(0, rank)
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, ranked: bool = False):
+    """
+    Decode a cursor from encode_cursor().
+
+    Parameters:
+    - ranked: Expect a cursor built with a rank.
+
+    Returns:
+    - (date, id) tuple, or (rank, date, id) if ranked.
+
+    Raises:
+    - ValueError if the cursor is malformed.
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if ranked:
+            rank, date, transaction_id = key
+            return float(rank), datetime.datetime.fromisoformat(date), int(transaction_id)
+        date, transaction_id = key
+        return datetime.datetime.fromisoformat(date), int(transaction_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def parse_ids(ids: str):
+    """
+    Parse a comma-separated list of transaction ids.
+
+    Raises:
+    - ValueError if an id is not an integer.
+    """
+    try:
+        return [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError as e:
+        raise ValueError(f"Invalid ids: {ids}") from e
+
+
+def order_by_ids(ids, found):
+    """
+    Arrange looked-up transactions in the order their ids were requested.
+
+    Parameters:
+    - ids: Requested ids; repeats are returned once.
+    - found: Dictionary of id to Transaction from crud.get_transactions().
+
+    Returns:
+    - TransactionList schema with the transactions and the missing ids.
+    """
+    requested = list(dict.fromkeys(ids))
+    return schemas.TransactionList(
+        transactions=[found[transaction_id] for transaction_id in requested if transaction_id in found],
+        missing=[transaction_id for transaction_id in requested if transaction_id not in found]
+    )
+
+
+EXPORT_FIELDS = ["id", "description", "amount", "date", "account_id", "transaction_type"]
+
+
+def export_chunks(batches, export_format="csv", compress=False):
+    """
+    Encode batches of transaction rows as CSV or NDJSON, one chunk per batch.
+
+    Parameters:
+    - batches: Iterator of row lists from crud.iter_transaction_batches().
+    - export_format: "csv" (with a header row) or "ndjson".
+    - compress: Gzip the output incrementally.
+
+    Returns:
+    - Iterator of bytes.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def emit(text):
+        data = text.encode("utf-8")
+        return compressor.compress(data) if compressor else data
+
+    if export_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        for rows in batches:
+            writer.writerows((row[0], row[1], row[2], row[3].isoformat() if row[3] else "", row[4], row[5])
+                             for row in rows)
+            chunk = emit(buffer.getvalue())
+            buffer.seek(0)
+            buffer.truncate()
+            if chunk:
+                yield chunk
+        if buffer.tell():
+            # No rows matched: only the header was written.
+            yield emit(buffer.getvalue())
+    else:
+        for rows in batches:
+            chunk = emit("".join(
+                json.dumps({
+                    "id": row[0], "description": row[1], "amount": float(row[2]),
+                    "date": row[3].isoformat() if row[3] else None,
+                    "account_id": row[4], "transaction_type": row[5],
+                }) + "\n"
+                for row in rows
+            ))
+            if chunk:
+                yield chunk
+    if compressor:
+        yield compressor.flush()
+
+
+def iter_ndjson(lines):
+    """
+    Parse newline-delimited JSON.
+
+    Parameters:
+    - lines: Iterable of bytes or str lines.
+
+    Returns:
+    - Iterator of (line number, record or None, error message or None).
+    """
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line), None
+        except ValueError as e:
+            yield line_number, None, f"invalid JSON: {e}"
+
+
+def iter_csv(lines):
+    """
+    Parse CSV with a header row naming the transaction fields.
+
+    Parameters:
+    - lines: Iterable of bytes or str lines.
+
+    Returns:
+    - Iterator of (line number, record or None, error message or None); empty
+      cells are treated as missing values.
+    """
+    reader = csv.DictReader(line.decode("utf-8") if isinstance(line, bytes) else line for line in lines)
+    for record in reader:
+        if None in record:
+            yield reader.line_num, None, "too many columns"
+            continue
+        yield reader.line_num, {key: value for key, value in record.items() if value not in ("", None)}, None
+
+
+class ImportReport:
+    """
+    Running tally of a bulk import, filled in while rows are validated.
+    """
+
+    def __init__(self, max_errors=MAX_REPORTED_ERRORS):
+        self.max_errors = max_errors
+        self.received = 0
+        self.failed = 0
+        self.errors = []
+
+    def reject(self, line_number, messages):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(schemas.BulkImportError(line=line_number, errors=messages))
+
+    def result(self, inserted):
+        return schemas.BulkImportResult(
+            received=self.received,
+            inserted=inserted,
+            failed=self.failed,
+            errors=self.errors,
+            errors_truncated=self.failed > len(self.errors)
+        )
+
+
+def validate_import_rows(records, report):
+    """
+    Validate parsed records against TransactionImport, recording rejects in `report`.
+
+    Parameters:
+    - records: Iterator from iter_ndjson() or iter_csv().
+    - report: ImportReport receiving counts and per-row errors.
+
+    Returns:
+    - Iterator of valid TransactionImport schemas.
+    """
+    for line_number, record, error in records:
+        report.received += 1
+        if error is not None:
+            report.reject(line_number, [error])
+            continue
+        if not isinstance(record, dict):
+            report.reject(line_number, ["expected a JSON object"])
+            continue
+        try:
+            transaction = schemas.TransactionImport(**record)
+        except ValidationError as e:
+            report.reject(line_number, [
+                f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()
+            ])
+            continue
+        if not validate_transaction_type(transaction.transaction_type):
+            report.reject(line_number, ["transaction_type: must be 'Debit' or 'Credit'"])
+            continue
+        yield transaction
@@ -0,0 +1,148 @@
+"""
+Shared fixtures for the service's tests.
+"""
+
+from app.main import app, get_db
+from psycopg2 import extensions
+import pytest
+
+
+class RecordingCursor:
+    def __init__(self, db):
+        self.db = db
+
+    def execute(self, sql, params=None):
+        self.db.queries.append(sql)
+        self.db.params.append(params)
+
+    def fetchone(self):
+        return self.db.rows.pop(0) if self.db.rows else None
+
+    def fetchall(self):
+        rows, self.db.rows = self.db.rows, []
+        return rows
+
+    def close(self):
+        pass
+
+
+class RecordingDB:
+    """
+    Fake connection that hands out queued result rows and records every
+    statement with its parameters, so tests can pin the number of database
+    round trips an endpoint makes.
+    """
+    def __init__(self):
+        self.rows = []
+        self.queries = []
+        self.params = []
+
+    def cursor(self):
+        return RecordingCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def recording_db():
+    db = RecordingDB()
+    app.dependency_overrides[get_db] = lambda: db
+    yield db
+    app.dependency_overrides.clear()
+
+
+class CopyRecordingCursor(RecordingCursor):
+    def execute(self, sql, params=None):
+        super().execute(sql, params)
+        if "nextval" in sql:
+            # Reserve ids the way the sequence would.
+            self.db.rows = [(self.db.next_id + n,) for n in range(params[0])]
+            self.db.next_id += params[0]
+        elif "create_transaction_partitions" in sql:
+            self.db.rows = [(0,)]
+
+    def copy_expert(self, sql, file):
+        self.db.queries.append(sql)
+        self.db.params.append(None)
+        self.db.copied.append(file.read())
+
+
+@pytest.fixture
+def copy_db(recording_db):
+    recording_db.copied = []
+    recording_db.next_id = 101
+    recording_db.cursor = lambda: CopyRecordingCursor(recording_db)
+    return recording_db
+
+
+class FakeInfo:
+    def __init__(self):
+        self.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+        self.rowcount = -1
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append((" ".join(sql.split()), params))
+        self.rows = list(self.conn.handler(sql, params) or []) if self.conn.handler else []
+        self.rowcount = len(self.rows)
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """
+    Fake psycopg2 connection for tests of control flow rather than SQL.
+
+    handler(sql, params) returns each statement's result rows, or raises to
+    make it fail. Statements, commits and rollbacks are recorded; what the
+    SQL does is covered against a real database in test_postgres.py.
+    """
+    def __init__(self, handler=None):
+        self.handler = handler
+        self.statements = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.autocommit = False
+        self.closed = 0
+        self.info = FakeInfo()
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def fake_connection():
+    """
+    The FakeConnection class, for tests that build their own.
+    """
+    return FakeConnection
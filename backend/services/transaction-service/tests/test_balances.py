@@ -0,0 +1,40 @@
+"""
+Test cases for the account balance rebuild's transaction handling.
+
+What the rebuild computes is tested against a real database in test_postgres.py.
+"""
+
+from app import balances
+import decimal
+import pytest
+
+DRIFT = [(4, decimal.Decimal("10.00"), decimal.Decimal("0")), (2, None, decimal.Decimal("-5.00"))]
+
+
+def rebuild_results(history):
+    def handler(sql, params):
+        if "pg_tables" in sql:
+            return []
+        if "daily_account_totals" in sql:
+            return [history]
+        return DRIFT
+    return handler
+
+
+def test_rebuild_commits_corrections(fake_connection):
+    conn = fake_connection(rebuild_results((10, 10)))
+    assert balances.rebuild_balances(conn) == sorted(DRIFT)
+    assert conn.commits == 1 and conn.rollbacks == 0
+
+
+def test_rebuild_refuses_when_transactions_are_missing(fake_connection):
+    conn = fake_connection(rebuild_results((10, 7)))
+    with pytest.raises(balances.IncompleteHistoryError):
+        balances.rebuild_balances(conn)
+    assert conn.commits == 0 and conn.rollbacks == 1
+
+
+def test_check_only_rolls_back(fake_connection):
+    conn = fake_connection(rebuild_results((10, 10)))
+    assert len(balances.rebuild_balances(conn, check_only=True)) == 2
+    assert conn.commits == 0 and conn.rollbacks == 1
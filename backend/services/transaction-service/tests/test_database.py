@@ -0,0 +1,70 @@
+"""
+Test cases for the pooled database connection layer.
+"""
+
+from app import database
+from psycopg2 import extensions
+import pytest
+
+
+def fresh_connection_results(sql, params):
+    raise AssertionError("health check should not run for fresh connections")
+
+
+def make_pool(fake_connection, **kwargs):
+    opened = []
+
+    def connect():
+        conn = fake_connection(fresh_connection_results)
+        opened.append(conn)
+        return conn
+
+    return database.ConnectionPool(connect=connect, **kwargs), opened
+
+
+def test_connections_are_reused(fake_connection):
+    pool, opened = make_pool(fake_connection, max_size=2)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    assert len(opened) == 1
+    stats = pool.stats()
+    assert stats["checkouts"] == 2
+    assert stats["connections_opened"] == 1
+    assert stats["in_use"] == 1
+
+
+def test_warm_opens_min_size(fake_connection):
+    pool, opened = make_pool(fake_connection, min_size=3, max_size=5)
+    pool.warm()
+    assert len(opened) == 3
+    assert pool.stats()["idle"] == 3
+
+
+def test_checkout_times_out_when_exhausted(fake_connection):
+    pool, _ = make_pool(fake_connection, max_size=1, timeout=0.01)
+    pool.getconn()
+    with pytest.raises(database.PoolTimeout):
+        pool.getconn()
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_open_transaction_is_rolled_back_on_release(fake_connection):
+    pool, _ = make_pool(fake_connection)
+    conn = pool.getconn()
+    conn.info.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+    pool.putconn(conn)
+    assert conn.rollbacks == 1
+    assert pool.stats()["idle"] == 1
+
+
+def test_expired_and_closed_connections_are_replaced(fake_connection):
+    pool, opened = make_pool(fake_connection, max_age=0)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert conn.closed
+    fresh = pool.getconn()
+    fresh.closed = 1
+    pool.putconn(fresh)
+    assert len(opened) == 2
+    assert pool.stats()["size"] == 0
@@ -0,0 +1,120 @@
+"""
+Test cases for group-committed transaction creates.
+"""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app import async_main, group_commit, schemas
+import asyncio
+import itertools
+import threading
+
+
+def create_results():
+    ids = itertools.count(1)
+
+    def handler(sql, params):
+        descriptions, amounts, dates, account_ids, types = params
+        if 0 in account_ids:
+            raise RuntimeError("unknown account")
+        return [(next(ids), *row) for row in zip(descriptions, amounts, dates, account_ids, types)]
+    return handler
+
+
+def group_sizes(conn):
+    return [len(params[0]) for _, params in conn.statements]
+
+
+def create(account_id, description="Sale"):
+    return schemas.TransactionCreate(description=description, amount=10.0, account_id=account_id,
+                                     transaction_type="Credit")
+
+
+def submit_concurrently(committer, transactions):
+    results = [None] * len(transactions)
+
+    def worker(index):
+        try:
+            results[index] = committer.submit(transactions[index])
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(len(transactions))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_creates_share_one_commit(fake_connection):
+    db = fake_connection(create_results())
+    committer = group_commit.GroupCommitter(lambda: db, lambda conn: None, window=0.2, max_rows=100)
+    results = submit_concurrently(committer, [create(1, f"Sale {n}") for n in range(10)])
+    assert group_sizes(db) == [10]
+    assert db.commits == 1
+    # Every caller gets back its own row.
+    assert sorted(result.description for result in results) == sorted(f"Sale {n}" for n in range(10))
+    assert len({result.id for result in results}) == 10
+    assert committer.stats() == {"groups": 1, "rows": 10}
+
+
+def test_groups_are_capped_at_max_rows(fake_connection):
+    db = fake_connection(create_results())
+    committer = group_commit.GroupCommitter(lambda: db, lambda conn: None, window=0.2, max_rows=4)
+    submit_concurrently(committer, [create(1) for _ in range(10)])
+    assert sum(group_sizes(db)) == 10
+    assert max(group_sizes(db)) <= 4
+
+
+def test_bad_row_fails_alone(fake_connection):
+    db = fake_connection(create_results())
+    committer = group_commit.GroupCommitter(lambda: db, lambda conn: None, window=0.2, max_rows=100)
+    results = submit_concurrently(committer, [create(1), create(0), create(2)])
+    assert isinstance(results[1], RuntimeError)
+    assert [result.account_id for result in (results[0], results[2])] == [1, 2]
+
+
+def test_async_creates_group_beyond_the_threadpool_size(fake_connection):
+    db = fake_connection(create_results())
+    committer = group_commit.GroupCommitter(lambda: db, lambda conn: None, window=0.5, max_rows=60)
+
+    async def submit_all():
+        return await asyncio.gather(*(committer.submit_async(create(1, f"Sale {n}")) for n in range(60)),
+                                    return_exceptions=True)
+
+    # All 60 wait on the event loop at once, more than the 40 threadpool workers a sync route could use.
+    results = asyncio.run(submit_all())
+    assert group_sizes(db) == [60]
+    assert sorted(result.description for result in results) == sorted(f"Sale {n}" for n in range(60))
+
+
+def test_async_bad_row_fails_alone(fake_connection):
+    db = fake_connection(create_results())
+    committer = group_commit.GroupCommitter(lambda: db, lambda conn: None, window=0.2, max_rows=100)
+
+    async def submit_all():
+        return await asyncio.gather(*(committer.submit_async(create(account_id)) for account_id in (1, 0, 2)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(submit_all())
+    assert isinstance(results[1], RuntimeError)
+    assert [result.account_id for result in (results[0], results[2])] == [1, 2]
+
+
+def test_router_replaces_create_route(monkeypatch, fake_connection):
+    db = fake_connection(create_results())
+    committer = group_commit.GroupCommitter(lambda: db, lambda conn: None, window=0)
+    monkeypatch.setattr(group_commit, "get_committer", lambda: committer)
+    app = FastAPI()
+
+    @app.post("/transactions/")
+    def direct_create_transaction():
+        raise AssertionError("direct route should have been replaced")
+
+    async_main.install(app, group_commit.router)
+    response = TestClient(app).post("/transactions/", json={
+        "description": "Grouped", "amount": 5.0, "account_id": 3, "transaction_type": "Debit"
+    })
+    assert response.status_code == 201
+    assert response.json()["id"] == 1
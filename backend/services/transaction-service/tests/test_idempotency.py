@@ -0,0 +1,138 @@
+"""
+Test cases for Idempotency-Key handling.
+"""
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+from app import idempotency
+import pytest
+
+
+class MemoryKeyStore:
+    def __init__(self):
+        self.rows = {}
+        self.stores = 0
+
+    def claim(self, key_hash, request_hash):
+        if key_hash not in self.rows:
+            self.rows[key_hash] = (request_hash, None, None, None)
+            return None
+        return self.rows[key_hash]
+
+    def store(self, key_hash, status_code, content_type, body):
+        self.stores += 1
+        self.rows[key_hash] = (self.rows[key_hash][0], status_code, content_type, body)
+
+    def release_claim(self, key_hash):
+        if self.rows.get(key_hash, (None, None))[1] is None:
+            self.rows.pop(key_hash, None)
+
+
+def make_client():
+    app = FastAPI()
+    calls = []
+
+    @app.post("/transactions/", status_code=201)
+    def create(payload: dict):
+        calls.append(payload)
+        if payload.get("fail"):
+            raise HTTPException(status_code=400, detail="failed")
+        return {"id": len(calls), **payload}
+
+    @app.post("/transactional/", status_code=201)
+    def create_transactional(payload: dict, request: Request):
+        calls.append(payload)
+        key_hash = idempotency.take_key(request)
+        if key_hash is not None:
+            # What store_response() writes in the endpoint's database transaction.
+            status_code, content_type, body, _, _ = idempotency._response_params(
+                key_hash, {"id": len(calls)}, 201
+            )
+            store.rows[key_hash] = (store.rows[key_hash][0], status_code, content_type, body)
+        return {"id": len(calls)}
+
+    store = MemoryKeyStore()
+    app.add_middleware(idempotency.IdempotencyMiddleware, routes={("POST", "/transactions/"), ("POST", "/transactional/")},
+                       store=store,
+                       scope_name="test-service")
+    return TestClient(app), calls, store
+
+
+def test_retry_replays_stored_response_without_rerunning():
+    client, calls, _ = make_client()
+    headers = {"Idempotency-Key": "abc-123"}
+    first = client.post("/transactions/", json={"amount": 5}, headers=headers)
+    second = client.post("/transactions/", json={"amount": 5}, headers=headers)
+    assert first.status_code == second.status_code == 201
+    assert second.json() == first.json() == {"id": 1, "amount": 5}
+    assert second.headers["idempotent-replayed"] == "true"
+    assert len(calls) == 1
+
+
+def test_requests_without_key_are_not_deduplicated():
+    client, calls, store = make_client()
+    client.post("/transactions/", json={"amount": 5})
+    client.post("/transactions/", json={"amount": 5})
+    assert len(calls) == 2
+    assert store.rows == {}
+
+
+def test_key_reused_for_different_body_is_rejected():
+    client, calls, _ = make_client()
+    headers = {"Idempotency-Key": "abc-123"}
+    client.post("/transactions/", json={"amount": 5}, headers=headers)
+    response = client.post("/transactions/", json={"amount": 6}, headers=headers)
+    assert response.status_code == 422
+    assert len(calls) == 1
+
+
+def test_in_progress_key_gets_conflict():
+    client, calls, store = make_client()
+    headers = {"Idempotency-Key": "abc-123"}
+    client.post("/transactions/", json={"amount": 5}, headers=headers)
+    # Put the key back in the state it has while the first attempt is running.
+    (key_hash, (request_hash, *_)), = store.rows.items()
+    store.rows[key_hash] = (request_hash, None, None, None)
+    response = client.post("/transactions/", json={"amount": 5}, headers=headers)
+    assert response.status_code == 409
+    assert len(calls) == 1
+
+
+def test_failed_request_releases_key():
+    client, calls, store = make_client()
+    headers = {"Idempotency-Key": "abc-123"}
+    assert client.post("/transactions/", json={"fail": True}, headers=headers).status_code == 400
+    assert store.rows == {}
+    assert client.post("/transactions/", json={"fail": True}, headers=headers).status_code == 400
+    assert len(calls) == 2
+
+
+def test_key_store_returns_connections_when_a_statement_fails(fake_connection):
+    def handler(sql, params):
+        raise RuntimeError("connection lost")
+
+    conn = fake_connection(handler)
+    released = []
+    store = idempotency.KeyStore(lambda: conn, released.append)
+    with pytest.raises(RuntimeError):
+        store.claim(b"k", b"r")
+    assert (conn.rollbacks, released) == (1, [conn])
+
+
+def test_endpoint_that_takes_the_key_stores_its_own_response():
+    client, calls, store = make_client()
+    headers = {"Idempotency-Key": "abc-123"}
+    first = client.post("/transactional/", json={"amount": 5}, headers=headers)
+    second = client.post("/transactional/", json={"amount": 5}, headers=headers)
+    assert first.status_code == second.status_code == 201
+    # The replay is byte-for-byte the response FastAPI rendered.
+    assert second.content == first.content
+    assert second.headers["idempotent-replayed"] == "true"
+    assert len(calls) == 1
+    assert store.stores == 0
+
+
+def test_take_key_without_claimed_key():
+    client, calls, store = make_client()
+    assert client.post("/transactional/", json={"amount": 5}).status_code == 201
+    assert store.rows == {}
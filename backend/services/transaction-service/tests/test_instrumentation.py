@@ -0,0 +1,168 @@
+"""
+Test cases for the request and query metrics.
+"""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app import instrumentation
+from app.main import app
+import pytest
+import threading
+import time
+
+
+@pytest.fixture
+def metrics_app(monkeypatch):
+    monkeypatch.setattr(instrumentation, "SLOW_QUERY_ENDPOINT", True)
+    instrumentation.registry.reset()
+    test_app = FastAPI()
+
+    @test_app.get("/items/{item_id}")
+    def read_item(item_id: int):
+        # Stand-in for two statements run through TimedCursor.
+        instrumentation.registry.observe_query(0.002)
+        instrumentation.registry.observe_query(0.003)
+        return {"id": item_id}
+
+    instrumentation.install(test_app, gauges=lambda: {"db_pool_size": 3})
+    yield TestClient(test_app)
+    instrumentation.registry.reset()
+
+
+def test_metrics_are_labelled_by_route_template(metrics_app):
+    metrics_app.get("/items/1")
+    metrics_app.get("/items/2")
+    metrics_app.get("/missing")
+    body = metrics_app.get("/metrics").text
+    assert 'http_requests_total{method="GET",route="/items/{item_id}",status="200"} 2' in body
+    assert 'http_requests_total{method="GET",route="<unmatched>",status="404"} 1' in body
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}"} 2' in body
+    assert 'db_queries_total{method="GET",route="/items/{item_id}"} 4' in body
+    assert 'db_request_time_seconds_bucket{method="GET",route="/items/{item_id}",le="0.0025"} 0' in body
+    assert 'db_request_time_seconds_bucket{method="GET",route="/items/{item_id}",le="0.01"} 2' in body
+    assert "db_pool_size 3" in body
+
+
+def test_queries_outside_requests_are_counted_separately():
+    instrumentation.registry.reset()
+    instrumentation.registry.observe_query(0.5)
+    body = instrumentation.registry.render()
+    assert "db_background_query_duration_seconds_count 1" in body
+
+
+def test_service_exposes_metrics_without_a_database():
+    response = TestClient(app).get("/metrics")
+    assert response.status_code == 200
+    assert "db_pool_in_use 0" in response.text
+
+
+class ExplainCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append((sql, params))
+
+    def fetchall(self):
+        return [("Seq Scan on transactions",), ("Buffers: shared hit=12",)]
+
+    def close(self):
+        pass
+
+
+class ExplainConnection:
+    closed = 0
+
+    def __init__(self):
+        self.statements = []
+        self.rollbacks = 0
+        self.explained = threading.Event()
+
+    def cursor(self, cursor_factory=None):
+        return ExplainCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.explained.set()
+
+
+def test_slow_query_log_keeps_slowest_and_explains_out_of_band():
+    conn = ExplainConnection()
+    log = instrumentation.SlowQueryLog(threshold_ms=0, size=2)
+    log.connect = lambda: conn
+    log.record("SELECT * FROM transactions WHERE account_id = %s;", (1,), 0.9)
+    assert conn.explained.wait(5)
+    log.record("SELECT 2;", None, 0.1, explainable=False)
+    log.record("SELECT 3;", None, 0.5, explainable=False)
+
+    entries = log.entries()
+    assert [entry["duration_ms"] for entry in entries] == [900.0, 500.0]
+    assert conn.statements[-1] == (
+        "EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM transactions WHERE account_id = %s", (1,)
+    )
+    assert conn.rollbacks == 1
+    for _ in range(100):
+        if log.entries()[0]["plan"]:
+            break
+        time.sleep(0.01)
+    assert log.entries()[0]["plan"] == "Seq Scan on transactions\nBuffers: shared hit=12"
+
+
+def test_slow_writes_are_not_analyzed():
+    conn = ExplainConnection()
+    log = instrumentation.SlowQueryLog(threshold_ms=0, size=5)
+    log.connect = lambda: conn
+    log.record("UPDATE accounts SET balance = balance + %s WHERE id = %s;", (5, 1), 1.0)
+    assert conn.explained.wait(5)
+    assert conn.statements[-1][0] == "EXPLAIN UPDATE accounts SET balance = balance + %s WHERE id = %s"
+
+
+def test_slow_queries_endpoint(metrics_app):
+    instrumentation.slow_queries.reset()
+    instrumentation.slow_queries.record("SELECT 1;", None, 2.0, explainable=False)
+    body = metrics_app.get("/admin/slow_queries").json()
+    assert body["queries"][0]["query"] == "SELECT 1;"
+    assert body["queries"][0]["duration_ms"] == 2000.0
+    instrumentation.slow_queries.reset()
+
+
+def test_slow_queries_endpoint_is_off_by_default():
+    test_app = FastAPI()
+    instrumentation.install(test_app)
+    assert TestClient(test_app).get("/admin/slow_queries").status_code == 404
+
+
+def test_slow_query_parameters_are_recorded_by_type_only(caplog):
+    log = instrumentation.SlowQueryLog(threshold_ms=0, size=5, explain=False)
+    log.record("SELECT id FROM users WHERE email = %s AND hashed_password = %s;",
+               ("alice@example.com", "$2b$12$secret"), 1.0)
+    log.record("INSERT INTO accounts (name) VALUES (%s);", [("Cash",)] * 50, 0.5, explainable=False)
+    slowest, batch = log.entries()
+    assert slowest["params"] == "(str, str)"
+    assert batch["params"] == "50 values"
+    assert "alice@example.com" not in caplog.text
+    assert "secret" not in caplog.text
+
+
+def test_plans_mask_quoted_literals():
+    plan = "Index Scan using users_email_key on users\n  Index Cond: ((email)::text = 'o''neil@example.com'::text)"
+    assert instrumentation._redact_plan(plan) == (
+        "Index Scan using users_email_key on users\n  Index Cond: ((email)::text = '?'::text)"
+    )
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT create_transaction_partitions(%s, %s);",
+    "SELECT nextval('transactions_id_seq') FROM generate_series(1, %s);",
+    "SELECT pg_advisory_lock(%s);",
+    "SELECT id FROM transactions WHERE id = %s FOR UPDATE;",
+    "SELECT id FROM transactions WHERE id = %s FOR KEY SHARE;",
+])
+def test_side_effecting_selects_are_not_analyzed(query):
+    assert not instrumentation._is_read_only(query)
+
+
+def test_plain_selects_are_analyzed():
+    assert instrumentation._is_read_only(
+        "SELECT account_id, COALESCE(SUM(amount), 0) FROM transactions WHERE id = ANY(%s) GROUP BY account_id;"
+    )
@@ -3,8 +3,11 @@ Test cases for the Transaction Service.
 """
 
 from fastapi.testclient import TestClient
-from app.main import app
+from app.main import app, get_db
 import datetime
+import decimal
+import gzip
+import json
 import pytest
 
 client = TestClient(app)
@@ -36,3 +39,280 @@ def test_create_transaction(mock_db):
     })
     assert response.status_code == 201
     assert response.json()["description"] == "Test Transaction"
+
+
+def test_async_engine_replaces_sync_routes():
+    from fastapi import FastAPI
+    from app import async_main, async_database
+
+    class FakeAsyncConnection:
+        async def fetchrow(self, sql, *params):
+            return (1, params[0], params[1], params[2], params[3], params[4])
+
+    async def fake_get_db():
+        yield FakeAsyncConnection()
+
+    async_app = FastAPI()
+
+    @async_app.post("/transactions/")
+    def sync_create_transaction():
+        raise AssertionError("sync route should have been replaced")
+
+    async_main.install(async_app)
+    async_app.dependency_overrides[async_database.get_db] = fake_get_db
+    response = TestClient(async_app).post("/transactions/", json={
+        "description": "Async Transaction",
+        "amount": 42.0,
+        "account_id": 1,
+        "transaction_type": "Credit"
+    })
+    assert response.status_code == 201
+    assert response.json()["description"] == "Async Transaction"
+
+
+def test_create_transaction_single_round_trip(recording_db):
+    recording_db.rows = [(7, "Rent", 1200.0, datetime.datetime(2024, 3, 1), 3, "Debit")]
+    response = client.post("/transactions/", json={
+        "description": "Rent",
+        "amount": 1200.0,
+        "account_id": 3,
+        "transaction_type": "Debit"
+    })
+    assert response.status_code == 201
+    # Every field comes from the statement's RETURNING row; nothing is read back.
+    assert response.json() == {"id": 7, "description": "Rent", "amount": 1200.0, "date": "2024-03-01T00:00:00",
+                               "account_id": 3, "transaction_type": "Debit"}
+    assert len(recording_db.queries) == 1
+
+
+def test_update_transaction_locks_row_then_updates_in_one_statement(recording_db):
+    recording_db.rows = [(7, "Rent", 1300.0, datetime.datetime(2024, 3, 1), 3, "Debit")]
+    response = client.put("/transactions/7", json={"amount": 1300.0})
+    assert response.status_code == 200
+    assert response.json()["amount"] == 1300.0
+    assert len(recording_db.queries) == 2
+    assert "FOR UPDATE" in recording_db.queries[0]
+    # The old amount is reversed and the new one applied in the same statement,
+    # which must not lock the row it modifies.
+    assert "FOR UPDATE" not in recording_db.queries[1]
+    assert "UPDATE accounts SET balance" in recording_db.queries[1]
+    assert "'updated'" in recording_db.queries[1]
+
+
+def test_delete_transaction_reverses_balance(recording_db):
+    recording_db.rows = [(1,)]
+    response = client.delete("/transactions/7")
+    assert response.status_code == 204
+    assert len(recording_db.queries) == 1
+    assert "UPDATE accounts SET balance = balance -" in recording_db.queries[0]
+    assert "'deleted'" in recording_db.queries[0]
+
+
+def test_bulk_import_ndjson_copies_valid_rows_and_reports_errors(copy_db):
+    body = "\n".join([
+        '{"description": "Card\\tpayment", "amount": 12.5, "account_id": 1, "transaction_type": "Debit"}',
+        '{"description": "Refund", "amount": "abc", "account_id": 1, "transaction_type": "Credit"}',
+        'not json',
+        '{"description": "Salary", "amount": 3000, "account_id": 2, "transaction_type": "Credit",'
+        ' "date": "2024-03-31T09:00:00"}',
+        '{"description": "Fee", "amount": 1, "account_id": 2, "transaction_type": "Other"}',
+    ])
+    response = client.post("/transactions/bulk", content=body,
+                           headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["received"], result["inserted"], result["failed"]) == (5, 2, 3)
+    assert [error["line"] for error in result["errors"]] == [2, 3, 5]
+    assert result["errors"][0]["errors"][0].startswith("amount")
+    assert "nextval" in copy_db.queries[0]
+    assert copy_db.queries[1].startswith("COPY transactions (id,")
+    rows = copy_db.copied[0].splitlines()
+    assert rows[0].startswith("101\tCard\\tpayment\t12.5\t")
+    assert rows[1] == "102\tSalary\t3000.0\t2024-03-31T09:00:00\t2\tCredit"
+    # A "created" outbox event is copied for every row.
+    assert copy_db.queries[2].startswith("COPY transaction_events")
+    events = [line.split("\t") for line in copy_db.copied[1].splitlines()]
+    assert [event[:2] for event in events] == [["created", "101"], ["created", "102"]]
+    assert json.loads(events[1][2])["new"]["amount"] == 3000.0
+    # Balance deltas are applied once per import, summed per account.
+    assert "unnest" in copy_db.queries[3]
+    assert copy_db.params[3] == ([1, 2], [decimal.Decimal("-12.5"), decimal.Decimal("3000.0")])
+    # After the commit, the imported months get their partitions.
+    assert len(copy_db.queries) == 5 and "create_transaction_partitions" in copy_db.queries[4]
+    assert datetime.date(2024, 3, 1) in copy_db.params[4][0]
+
+
+def test_bulk_import_csv_in_batches(copy_db, monkeypatch):
+    monkeypatch.setattr("app.crud.bulk_create_transactions.__defaults__", (2,))
+    lines = ["description,amount,account_id,transaction_type,date"]
+    lines += [f"Row {n},{n}.5,1,Credit," for n in range(5)]
+    response = client.post("/transactions/bulk", content="\n".join(lines) + "\n",
+                           headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200
+    assert response.json()["inserted"] == 5
+    assert len(copy_db.copied) == 6
+    assert copy_db.copied[4].startswith("105\t")
+
+
+def test_bulk_import_rejects_unknown_content_type(copy_db):
+    response = client.post("/transactions/bulk", content="x", headers={"Content-Type": "text/plain"})
+    assert response.status_code == 415
+
+
+def test_list_transactions_keyset_pagination(recording_db):
+    recording_db.rows = [
+        (9, "Rent", 1200.0, datetime.datetime(2024, 3, 2), 3, "Debit"),
+        (8, "Fee", 5.0, datetime.datetime(2024, 3, 1), 3, "Debit"),
+        (7, "Salary", 3000.0, datetime.datetime(2024, 3, 1), 3, "Credit"),
+    ]
+    response = client.get("/transactions/", params={"account_id": 3, "limit": 2})
+    assert response.status_code == 200
+    page = response.json()
+    assert [t["id"] for t in page["transactions"]] == [9, 8]
+    assert "ORDER BY date DESC, id DESC" in recording_db.queries[0]
+    assert "OFFSET" not in recording_db.queries[0]
+
+    recording_db.rows = [(7, "Salary", 3000.0, datetime.datetime(2024, 3, 1), 3, "Credit")]
+    response = client.get("/transactions/", params={"account_id": 3, "limit": 2,
+                                                     "cursor": page["next_cursor"]})
+    assert response.status_code == 200
+    assert response.json()["next_cursor"] is None
+    assert "(date, id) < (%s, %s)" in recording_db.queries[1]
+    assert "date <= %s" in recording_db.queries[1]
+
+
+def test_batch_get_single_query_in_requested_order(recording_db):
+    recording_db.rows = [
+        (3, "Fee", 5.0, datetime.datetime(2024, 3, 1), 1, "Debit"),
+        (9, "Rent", 1200.0, datetime.datetime(2024, 3, 2), 1, "Debit"),
+    ]
+    response = client.post("/transactions/batch_get", json={"ids": [9, 4, 3, 9]})
+    assert response.status_code == 200
+    result = response.json()
+    assert [t["id"] for t in result["transactions"]] == [9, 3]
+    assert result["missing"] == [4]
+    assert len(recording_db.queries) == 1
+    assert "id = ANY(%s)" in recording_db.queries[0]
+    assert recording_db.params[0] == ([9, 4, 3, 9],)
+
+
+def test_list_transactions_by_ids(recording_db):
+    recording_db.rows = [(5, "Fee", 5.0, datetime.datetime(2024, 3, 1), 1, "Debit")]
+    response = client.get("/transactions/", params={"ids": "6,5"})
+    assert response.status_code == 200
+    assert response.json()["missing"] == [6]
+    assert client.get("/transactions/", params={"ids": "1,x"}).status_code == 400
+
+
+def test_batch_get_rejects_too_many_ids(recording_db):
+    response = client.post("/transactions/batch_get", json={"ids": list(range(5001))})
+    assert response.status_code == 400
+    assert recording_db.queries == []
+
+
+def test_search_ranked_keyset_pagination(recording_db):
+    recording_db.rows = [
+        (9, "AWS invoice", 80.0, datetime.datetime(2024, 3, 2), 1, "Debit", 0.0607927),
+        (4, "AWS credits", 10.0, datetime.datetime(2024, 2, 1), 1, "Credit", 0.0607927),
+    ]
+    response = client.get("/transactions/search", params={"q": "aws", "limit": 1})
+    assert response.status_code == 200
+    page = response.json()
+    assert [t["id"] for t in page["transactions"]] == [9]
+    sql = recording_db.queries[0]
+    assert "description_tsv @@ websearch_to_tsquery('english', %s)" in sql
+    assert "ORDER BY rank DESC, date DESC, id DESC" in sql
+
+    recording_db.rows = []
+    response = client.get("/transactions/search", params={"q": "aws", "limit": 1,
+                                                          "cursor": page["next_cursor"]})
+    assert response.status_code == 200
+    assert "< (%s::real, %s, %s)" in recording_db.queries[1]
+    assert recording_db.params[1][-4:] == [0.0607927, datetime.datetime(2024, 3, 2), 9, 2]
+
+
+def test_search_substring_escapes_wildcards(recording_db):
+    response = client.get("/transactions/search", params={"q": "50%_off", "match": "substring"})
+    assert response.status_code == 200
+    assert "description ILIKE %s" in recording_db.queries[0]
+    assert "ORDER BY date DESC, id DESC" in recording_db.queries[0]
+    assert recording_db.params[0][0] == "%50\\%\\_off%"
+    assert client.get("/transactions/search", params={"q": "ab", "match": "substring"}).status_code == 400
+
+
+def test_list_transactions_rejects_bad_cursor(recording_db):
+    response = client.get("/transactions/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+    assert recording_db.queries == []
+
+
+class ServerSideCursor:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+        self.itersize = 2000
+
+    def execute(self, sql, params=None):
+        self.db.queries.append((self.name, sql))
+
+    def fetchmany(self, size):
+        self.db.fetch_sizes.append(size)
+        batch, self.db.rows = self.db.rows[:size], self.db.rows[size:]
+        return batch
+
+    def close(self):
+        self.db.closed_cursors += 1
+
+
+class ExportDB:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+        self.fetch_sizes = []
+        self.closed_cursors = 0
+        self.released = False
+
+    def cursor(self, name=None):
+        return ServerSideCursor(self, name)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+@pytest.fixture
+def export_db(monkeypatch):
+    db = ExportDB([
+        (n, f"Row {n}", decimal.Decimal("10.50"), datetime.datetime(2024, 1, n), 1, "Credit")
+        for n in range(1, 8)
+    ])
+    monkeypatch.setattr("app.database.get_connection", lambda: db)
+    monkeypatch.setattr("app.database.release_connection", lambda conn: setattr(conn, "released", True))
+    monkeypatch.setattr("app.crud.EXPORT_BATCH_SIZE", 3)
+    monkeypatch.setattr("app.crud.iter_transaction_batches.__defaults__", (3,))
+    return db
+
+
+def test_export_streams_csv_through_named_cursor(export_db):
+    response = client.get("/transactions/export", params={"account_id": 1})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.splitlines()
+    assert lines[0] == "id,description,amount,date,account_id,transaction_type"
+    assert lines[1] == "1,Row 1,10.50,2024-01-01T00:00:00,1,Credit"
+    assert len(lines) == 8
+    assert export_db.queries[0][0] == "transactions_export"
+    assert "ORDER BY date, id" in export_db.queries[0][1]
+    assert export_db.fetch_sizes == [3, 3, 3, 3]
+    assert export_db.closed_cursors == 1 and export_db.released
+
+
+def test_export_ndjson_gzip(export_db):
+    response = client.get("/transactions/export", params={"format": "ndjson", "gzip": "true"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    records = [json.loads(line) for line in gzip.decompress(response.content).decode().splitlines()]
+    assert len(records) == 7
+    assert records[0]["amount"] == 10.5 and records[-1]["id"] == 7
@@ -0,0 +1,45 @@
+"""
+Test cases for the schema migration runner.
+
+Applying and recording migrations runs against a real database in
+test_postgres.py.
+"""
+
+from app import migrate, models
+from app.migrate import Migration
+import pytest
+
+
+def test_failed_concurrent_migration_restores_autocommit_and_unlocks(fake_connection):
+    def handler(sql, params):
+        if sql.startswith("CREATE INDEX CONCURRENTLY"):
+            assert conn.autocommit
+            raise RuntimeError("boom")
+        return []
+
+    conn = fake_connection(handler)
+    with pytest.raises(RuntimeError):
+        migrate.apply_migrations(conn, "test-service", [
+            Migration(1, "index", ["CREATE INDEX CONCURRENTLY IF NOT EXISTS idx ON t (c);"], transactional=False),
+        ])
+    assert conn.autocommit is False
+    assert conn.statements[-1][0].startswith("SELECT pg_advisory_unlock")
+
+
+def test_duplicate_versions_are_rejected(fake_connection):
+    conn = fake_connection()
+    with pytest.raises(ValueError):
+        migrate.apply_migrations(conn, "test-service", [
+            Migration(1, "table", ["CREATE TABLE t (c INT);"]),
+            Migration(1, "column", ["ALTER TABLE t ADD COLUMN d INT;"]),
+        ])
+    assert conn.statements == []
+
+
+def test_service_migrations_are_well_formed():
+    versions = [migration.version for migration in models.MIGRATIONS]
+    assert versions == sorted(set(versions))
+    for migration in models.MIGRATIONS:
+        if not migration.transactional:
+            assert all("IF NOT EXISTS" in statement or "IF EXISTS" in statement
+                       for statement in migration.statements)
@@ -0,0 +1,62 @@
+"""
+Test cases for the transaction events outbox relay.
+
+Publishing order and batching run against a real database in test_postgres.py.
+"""
+
+from app import outbox
+import datetime
+import json
+import pytest
+
+EVENT = (1, "created", 101, {"old": None, "new": {"id": 101}}, datetime.datetime(2024, 3, 1))
+
+
+def relay_results(lock_free=True, events=()):
+    events = list(events)
+
+    def handler(sql, params):
+        if sql.startswith("SELECT pg_try_advisory_lock"):
+            return [(lock_free,)]
+        if "FROM transaction_events" in sql:
+            batch, events[:] = events[:params[0]], events[params[0]:]
+            return batch
+        return []
+    return handler
+
+
+def test_relay_yields_to_running_relay(fake_connection):
+    conn = fake_connection(relay_results(lock_free=False, events=[EVENT]))
+    broker = outbox.MemoryBroker()
+    assert outbox.relay(conn, broker, once=True) is None
+    assert broker.events == []
+
+
+def test_relay_releases_its_lock_when_publishing_fails(fake_connection):
+    class FailingBroker:
+        def publish(self, events):
+            raise RuntimeError("broker down")
+
+    conn = fake_connection(relay_results(events=[EVENT]))
+    with pytest.raises(RuntimeError):
+        outbox.relay(conn, FailingBroker(), once=True)
+    assert conn.rollbacks == 1
+    assert conn.statements[-1][0].startswith("SELECT pg_advisory_unlock")
+
+
+def test_events_carry_iso_timestamps(fake_connection):
+    conn = fake_connection(relay_results(events=[EVENT]))
+    broker = outbox.MemoryBroker()
+    assert outbox.relay(conn, broker, once=True) == 1
+    assert broker.events == [{
+        "id": 1, "type": "created", "transaction_id": 101,
+        "payload": {"old": None, "new": {"id": 101}}, "created_at": "2024-03-01T00:00:00",
+    }]
+
+
+def test_file_broker_appends_ndjson(tmp_path):
+    path = tmp_path / "events.ndjson"
+    broker = outbox.FileBroker(str(path))
+    broker.publish([{"id": 1}, {"id": 2}])
+    broker.publish([{"id": 3}])
+    assert [json.loads(line)["id"] for line in path.read_text().splitlines()] == [1, 2, 3]
@@ -0,0 +1,45 @@
+"""
+Test cases for the monthly transactions partition maintenance.
+
+What the partition statements do is tested against a real database in test_postgres.py.
+"""
+
+from app import database, partitions
+import pytest
+
+PARTITIONS = [
+    ("transactions_default", "DEFAULT"),
+    ("transactions_y2021m12", "FOR VALUES FROM ('2021-12-01') TO ('2022-01-01')"),
+]
+
+
+def test_ensure_future_partitions_once_is_throttled(monkeypatch, fake_connection):
+    conn = fake_connection(lambda sql, params: [(2,)])
+    monkeypatch.setattr(partitions, "_last_ensured", None)
+    monkeypatch.setattr(database, "get_connection", lambda: conn)
+    monkeypatch.setattr(database, "release_connection", lambda db: None)
+    partitions.ensure_future_partitions_once()
+    partitions.ensure_future_partitions_once()
+    assert len(conn.statements) == 1
+
+
+def test_ensure_future_partitions_once_logs_connection_failures(monkeypatch):
+    def refuse():
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(partitions, "_last_ensured", None)
+    monkeypatch.setattr(database, "get_connection", refuse)
+    partitions.ensure_future_partitions_once()
+
+
+def test_archive_year_rolls_back_on_failure(fake_connection):
+    def handler(sql, params):
+        if "DETACH" in sql:
+            raise RuntimeError("boom")
+        return PARTITIONS
+
+    conn = fake_connection(handler)
+    with pytest.raises(RuntimeError):
+        partitions.archive_year(conn, 2021)
+    assert conn.rollbacks == 1
+    assert conn.commits == 0
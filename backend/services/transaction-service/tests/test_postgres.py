@@ -0,0 +1,368 @@
+"""
+Test cases run against a real PostgreSQL database.
+
+The fake cursors used elsewhere cannot catch SQL behaviour, so these tests
+apply the service's migrations in a scratch schema and check what the
+statements actually do. They are skipped unless TEST_DB_NAME names a
+database the DB_HOST/DB_PORT/DB_USER/DB_PASSWORD credentials can create
+schemas in; the schema is dropped afterwards.
+"""
+
+from app import async_crud, balances, crud, idempotency, migrate, models, outbox, partitions, schemas
+from app.migrate import Migration
+import asyncio
+import asyncpg
+import datetime
+import json
+import os
+import psycopg2
+import pytest
+
+pytestmark = pytest.mark.skipif(not os.environ.get("TEST_DB_NAME"), reason="TEST_DB_NAME is not set")
+
+SCHEMA = f"transaction_service_test_{os.getpid()}"
+ARCHIVE_SCHEMA = f"{SCHEMA}_archive"
+
+
+def _connect():
+    return psycopg2.connect(
+        host=os.environ.get("DB_HOST"),
+        port=int(os.environ.get("DB_PORT", 5432)),
+        database=os.environ.get("TEST_DB_NAME"),
+        user=os.environ.get("DB_USER"),
+        password=os.environ.get("DB_PASSWORD"),
+        options=f"-c search_path={SCHEMA},public"
+    )
+
+
+@pytest.fixture(scope="module")
+def migrated():
+    conn = _connect()
+    cursor = conn.cursor()
+    cursor.execute(f'CREATE SCHEMA "{SCHEMA}";')
+    conn.commit()
+    try:
+        # accounts belongs to ledger-service, whose migrations run first in a
+        # deployment; this is the table as its migrations 1 and 3 leave it.
+        cursor.execute("""
+            CREATE TABLE accounts (
+                id SERIAL PRIMARY KEY, name VARCHAR(255) UNIQUE NOT NULL, type VARCHAR(50) NOT NULL,
+                balance NUMERIC(12, 2) DEFAULT 0.0, opening_balance NUMERIC(12, 2) NOT NULL DEFAULT 0
+            );
+        """)
+        conn.commit()
+        migrate.apply_migrations(conn, models.SERVICE, models.MIGRATIONS)
+        yield conn
+    finally:
+        conn.rollback()
+        cursor.execute(f'DROP SCHEMA IF EXISTS "{ARCHIVE_SCHEMA}" CASCADE;')
+        cursor.execute(f'DROP SCHEMA "{SCHEMA}" CASCADE;')
+        conn.commit()
+        conn.close()
+
+
+@pytest.fixture
+def db(migrated):
+    cursor = migrated.cursor()
+    cursor.execute("TRUNCATE transactions, transaction_events, accounts, idempotency_keys RESTART IDENTITY;")
+    cursor.execute("INSERT INTO accounts (name, type) VALUES ('Cash', 'Asset'), ('Bank', 'Asset');")
+    migrated.commit()
+    yield migrated
+    migrated.rollback()
+
+
+def _balances(db):
+    cursor = db.cursor()
+    cursor.execute("SELECT id, balance FROM accounts ORDER BY id;")
+    balances = {row[0]: float(row[1]) for row in cursor.fetchall()}
+    cursor.close()
+    db.commit()
+    return balances
+
+
+def _create(db, amount, account_id, transaction_type="Credit"):
+    return crud.create_transaction(db, schemas.TransactionCreate(
+        description="Test", amount=amount, account_id=account_id, transaction_type=transaction_type
+    ))
+
+
+def test_update_reverses_old_amount(db):
+    first = _create(db, 70, 2)
+    _create(db, 10, 2)
+    assert _balances(db)[2] == 80.0
+    crud.update_transaction(db, first.id, schemas.TransactionUpdate(amount=50))
+    assert _balances(db)[2] == 60.0
+
+
+def test_update_moves_balance_between_accounts(db):
+    _create(db, 5, 1)
+    moved = _create(db, 100.5, 1)
+    crud.update_transaction(db, moved.id, schemas.TransactionUpdate(amount=10, account_id=2))
+    assert _balances(db) == {1: 5.0, 2: 10.0}
+
+
+def test_async_update_reverses_old_amount(db):
+    first = _create(db, 70, 2)
+    _create(db, 10, 2)
+
+    async def update():
+        conn = await asyncpg.connect(
+            host=os.environ.get("DB_HOST"), port=int(os.environ.get("DB_PORT", 5432)),
+            database=os.environ.get("TEST_DB_NAME"), user=os.environ.get("DB_USER"),
+            password=os.environ.get("DB_PASSWORD"), server_settings={"search_path": f"{SCHEMA},public"}
+        )
+        try:
+            await async_crud.update_transaction(conn, first.id, schemas.TransactionUpdate(amount=50))
+        finally:
+            await conn.close()
+
+    asyncio.run(update())
+    assert _balances(db)[2] == 60.0
+
+
+def test_update_writes_updated_event(db):
+    created = _create(db, 70, 2)
+    crud.update_transaction(db, created.id, schemas.TransactionUpdate(amount=50, account_id=1))
+    cursor = db.cursor()
+    cursor.execute("SELECT event_type, transaction_id, payload FROM transaction_events ORDER BY id;")
+    events = cursor.fetchall()
+    cursor.close()
+    db.commit()
+    assert [(event_type, transaction_id) for event_type, transaction_id, _ in events] == [
+        ("created", created.id), ("updated", created.id)
+    ]
+    payload = events[1][2]
+    assert (float(payload["old"]["amount"]), payload["old"]["account_id"]) == (70.0, 2)
+    assert (float(payload["new"]["amount"]), payload["new"]["account_id"]) == (50.0, 1)
+
+
+def _execute(db, sql, params=None):
+    cursor = db.cursor()
+    cursor.execute(sql, params)
+    cursor.close()
+    db.commit()
+
+
+def test_rebuild_keeps_balances_set_through_ledger_service(db):
+    _create(db, 70, 2)
+    # ledger-service's update_account setting the balance directly.
+    _execute(db, "UPDATE accounts SET balance = %s, opening_balance = opening_balance + (%s - COALESCE(balance, 0)) "
+                 "WHERE id = 1;", (100, 100))
+    _execute(db, "UPDATE accounts SET balance = 0 WHERE id = 2;")
+    drifted = balances.rebuild_balances(db, archive_schema=ARCHIVE_SCHEMA)
+    assert [(account_id, float(stored), float(expected)) for account_id, stored, expected in drifted] == [(2, 0.0, 70.0)]
+    assert _balances(db) == {1: 100.0, 2: 70.0}
+
+
+def test_rebuild_reads_archived_years_and_refuses_after_a_drop(db):
+    _execute(db, "SELECT create_transaction_partitions(DATE '2020-01-01', DATE '2020-12-01');")
+    crud.create_transactions(db, [schemas.TransactionCreate(
+        description="Old", amount=40, account_id=1, transaction_type="Credit"
+    )], [datetime.datetime(2020, 5, 1)])
+    _create(db, 5, 1)
+    assert partitions.archive_year(db, 2020, archive_schema=ARCHIVE_SCHEMA)
+    try:
+        assert balances.rebuild_balances(db, archive_schema=ARCHIVE_SCHEMA) == []
+        assert _balances(db)[1] == 45.0
+
+        _execute(db, f'DROP SCHEMA "{ARCHIVE_SCHEMA}" CASCADE;')
+        with pytest.raises(balances.IncompleteHistoryError):
+            balances.rebuild_balances(db, archive_schema=ARCHIVE_SCHEMA)
+        assert _balances(db)[1] == 45.0
+    finally:
+        _execute(db, f'DROP SCHEMA IF EXISTS "{ARCHIVE_SCHEMA}" CASCADE;')
+
+
+def _partition_counts(db):
+    cursor = db.cursor()
+    cursor.execute("SELECT tableoid::regclass::text, COUNT(*) FROM transactions GROUP BY 1 ORDER BY 1;")
+    counts = dict(cursor.fetchall())
+    cursor.execute("SELECT SUM(transaction_count) FROM daily_account_totals;")
+    counted = cursor.fetchone()[0]
+    cursor.close()
+    db.commit()
+    return counts, counted
+
+
+def test_partition_creation_moves_rows_out_of_the_default_partition(db):
+    crud.create_transactions(db, [schemas.TransactionCreate(
+        description="Old", amount=40, account_id=1, transaction_type="Credit"
+    )] * 2, [datetime.datetime(2018, 2, 3), datetime.datetime(2018, 3, 4)])
+    assert _partition_counts(db) == ({"transactions_default": 2}, 2)
+
+    _execute(db, "SELECT create_transaction_partitions(DATE '2018-02-01', DATE '2018-02-01');")
+    # The moved row is not counted twice or lost by the rollup.
+    assert _partition_counts(db) == ({"transactions_default": 1, "transactions_y2018m02": 1}, 2)
+
+
+def test_bulk_import_creates_partitions_for_its_months(db):
+    inserted = crud.bulk_create_transactions(db, [schemas.TransactionImport(
+        description="Imported", amount=10, account_id=2, transaction_type="Credit",
+        date=datetime.datetime(2017, 7, 1, 12)
+    )])
+    assert inserted == 1
+    assert _partition_counts(db) == ({"transactions_y2017m07": 1}, 1)
+    assert _balances(db)[2] == 10.0
+
+
+def _create_with_key(db, key_hash):
+    return crud.create_transaction(db, schemas.TransactionCreate(
+        description="Keyed", amount=25, account_id=2, transaction_type="Credit"
+    ), idempotency_key=key_hash)
+
+
+def test_create_stores_idempotent_response_with_the_write(db):
+    store = idempotency.KeyStore(lambda: db, lambda conn: None)
+    assert store.claim(b"k" * 32, b"r" * 32) is None
+    try:
+        created = _create_with_key(db, b"k" * 32)
+        request_hash, status_code, content_type, body = store.claim(b"k" * 32, b"r" * 32)
+        assert (status_code, content_type) == (201, "application/json")
+        assert json.loads(body)["id"] == created.id
+
+        # A second attempt that got past the claim (its own claim expired) is rolled back.
+        with pytest.raises(idempotency.ClaimLost):
+            _create_with_key(db, b"k" * 32)
+        assert _partition_counts(db)[1] == 1
+        assert _balances(db)[2] == 25.0
+    finally:
+        _execute(db, "DELETE FROM idempotency_keys;")
+
+
+def test_check_only_reports_drift_without_fixing_it(db):
+    _create(db, 70, 2)
+    _execute(db, "UPDATE accounts SET balance = 5 WHERE id = 2;")
+    drifted = balances.rebuild_balances(db, check_only=True, archive_schema=ARCHIVE_SCHEMA)
+    assert [(account_id, float(stored), float(expected)) for account_id, stored, expected in drifted] == [(2, 5.0, 70.0)]
+    assert _balances(db)[2] == 5.0
+
+
+def _partition_names(db):
+    names = [name for name, _ in partitions.list_partitions(db)]
+    db.commit()
+    return names
+
+
+def test_ensure_future_partitions_covers_the_coming_months(db):
+    partitions.ensure_future_partitions(db, months_ahead=2)
+    today = datetime.datetime.utcnow().date().replace(day=1)
+    upcoming = [today]
+    for _ in range(2):
+        upcoming.append((upcoming[-1] + datetime.timedelta(days=32)).replace(day=1))
+    assert {f"transactions_y{month:%Y}m{month:%m}" for month in upcoming} <= set(_partition_names(db))
+    assert partitions.ensure_future_partitions(db, months_ahead=2) == 0
+
+
+def test_archive_year_moves_only_that_year(db):
+    _execute(db, "SELECT create_transaction_partitions(DATE '2015-11-01', DATE '2016-01-01');")
+    try:
+        assert partitions.archive_year(db, 2015, archive_schema=ARCHIVE_SCHEMA) == [
+            "transactions_y2015m11", "transactions_y2015m12"
+        ]
+        names = _partition_names(db)
+        assert "transactions_y2015m11" not in names and "transactions_y2016m01" in names
+        assert balances.archived_tables(db, ARCHIVE_SCHEMA) == [
+            f"{ARCHIVE_SCHEMA}.transactions_y2015m11", f"{ARCHIVE_SCHEMA}.transactions_y2015m12"
+        ]
+        assert partitions.archive_year(db, 2016, drop=True) == ["transactions_y2016m01"]
+        assert "transactions_y2016m01" not in _partition_names(db)
+    finally:
+        db.rollback()
+        _execute(db, f'DROP SCHEMA IF EXISTS "{ARCHIVE_SCHEMA}" CASCADE;')
+
+
+def test_outbox_relay_publishes_in_id_order_and_marks_events(db):
+    created = [_create(db, amount, 1) for amount in (1, 2, 3)]
+    broker = outbox.MemoryBroker()
+    batches = []
+    broker.subscribe(batches.append)
+    assert outbox.relay(db, broker, batch_size=2, once=True) == 3
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert [(event["type"], event["transaction_id"]) for event in broker.events] == [
+        ("created", transaction.id) for transaction in created
+    ]
+    assert outbox.relay(db, broker, once=True) == 0
+
+
+def test_outbox_failed_publish_leaves_events_unpublished(db):
+    class FailingBroker:
+        def publish(self, events):
+            raise RuntimeError("broker down")
+
+    _create(db, 1, 1)
+    with pytest.raises(RuntimeError):
+        outbox.relay_batch(db, FailingBroker())
+    broker = outbox.MemoryBroker()
+    assert outbox.relay_batch(db, broker) == 1
+
+
+def test_key_store_claims_replays_and_releases(db):
+    store = idempotency.KeyStore(lambda: db, lambda conn: None)
+    key, request = b"k" * 32, b"r" * 32
+    assert store.claim(key, request) is None
+    # While the first attempt runs, others see the claim without a response.
+    assert store.claim(key, request) == (request, None, None, None)
+    store.release_claim(key)
+    assert store.claim(key, request) is None
+    store.store(key, 201, "application/json", b"{}")
+    assert store.claim(key, request) == (request, 201, "application/json", b"{}")
+    # Releasing never removes a stored response.
+    store.release_claim(key)
+    assert store.claim(key, request)[1] == 201
+
+
+def test_key_store_takes_over_expired_claims(db):
+    store = idempotency.KeyStore(lambda: db, lambda conn: None)
+    assert store.claim(b"k" * 32, b"r" * 32) is None
+    _execute(db, "UPDATE idempotency_keys SET expires_at = expires_at - INTERVAL '1 day';")
+    assert store.claim(b"k" * 32, b"s" * 32) is None
+
+
+def test_migrations_apply_in_order_once(db):
+    service = "migrate-test"
+    migrations = [
+        Migration(3, "index", ["CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_migrate_test ON migrate_test (d);"],
+                  transactional=False),
+        Migration(1, "table", ["CREATE TABLE migrate_test (c INT);"]),
+        Migration(2, "column", ["ALTER TABLE migrate_test ADD COLUMN d INT;"]),
+    ]
+    try:
+        assert migrate.apply_migrations(db, service, migrations) == [1, 2, 3]
+        assert migrate.apply_migrations(db, service, migrations) == []
+        assert db.autocommit is False
+        assert migrate.applied_versions(db, service) == {1, 2, 3}
+        db.commit()
+    finally:
+        _execute(db, "DROP TABLE IF EXISTS migrate_test; DELETE FROM schema_migrations WHERE service = %s;",
+                 (service,))
+
+
+def test_failed_migration_is_rolled_back_and_not_recorded(db):
+    service = "migrate-test"
+    try:
+        with pytest.raises(psycopg2.Error):
+            migrate.apply_migrations(db, service, [
+                Migration(1, "table", ["CREATE TABLE migrate_test (c INT);"]),
+                Migration(2, "broken", ["ALTER TABLE migrate_test ADD COLUMN d INT;", "SELECT missing_column FROM migrate_test;"]),
+            ])
+        assert migrate.applied_versions(db, service) == {1}
+        cursor = db.cursor()
+        cursor.execute("SELECT column_name FROM information_schema.columns "
+                       "WHERE table_schema = current_schema() AND table_name = 'migrate_test';")
+        assert cursor.fetchall() == [("c",)]
+        cursor.close()
+        db.commit()
+    finally:
+        _execute(db, "DROP TABLE IF EXISTS migrate_test; DELETE FROM schema_migrations WHERE service = %s;",
+                 (service,))
+
+
+def test_opening_balance_backfill_requires_ledger_migrations(db):
+    cursor = db.cursor()
+    cursor.execute("ALTER TABLE accounts DROP COLUMN opening_balance;")
+    try:
+        with pytest.raises(psycopg2.errors.RaiseException, match="apply ledger-service migrations first"):
+            cursor.execute(models.account_opening_balances[0])
+    finally:
+        db.rollback()
+        cursor.close()
@@ -0,0 +1,78 @@
+"""
+Test cases for the sampled Lambda request logging.
+"""
+
+from app import request_logging
+import logging
+import logging.handlers
+import queue
+import time
+
+
+def test_truncate_payload_caps_large_bodies():
+    event = {"path": "/transactions/", "body": "x" * 100000}
+    text = request_logging.truncate_payload(event, limit=256)
+    assert len(text) < 300
+    assert text.endswith("chars>")
+
+
+def test_payloads_only_logged_when_sampled_or_failed(caplog):
+    logger = logging.getLogger("test_request_logging")
+    event = {"httpMethod": "GET", "path": "/transactions/1", "body": None}
+    with caplog.at_level(logging.INFO, logger="test_request_logging"):
+        request_logging.log_invocation(logger, event, {"statusCode": 200}, time.perf_counter(), False)
+        assert len(caplog.records) == 1
+        assert "GET /transactions/1 -> 200" in caplog.records[0].getMessage()
+
+        caplog.clear()
+        request_logging.log_invocation(logger, event, {"statusCode": 500}, time.perf_counter(), False)
+        assert len(caplog.records) == 3
+
+
+class SlowHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        time.sleep(0.05)
+        self.messages.append(record.getMessage())
+
+
+def test_flush_waits_for_queued_records(monkeypatch):
+    handler = SlowHandler()
+    log_queue = queue.SimpleQueue()
+    listener = request_logging._Listener(log_queue, handler)
+    monkeypatch.setattr(request_logging, "_listener", listener)
+    logger = logging.getLogger("test_request_logging_flush")
+    logger.propagate = False
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener.start()
+    try:
+        for n in range(3):
+            logger.error("record %s", n)
+        assert request_logging.flush(timeout=2)
+        assert handler.messages == ["record 0", "record 1", "record 2"]
+    finally:
+        listener.stop()
+        logger.handlers.clear()
+
+
+def test_flush_gives_up_after_the_timeout(monkeypatch):
+    handler = SlowHandler()
+    log_queue = queue.SimpleQueue()
+    listener = request_logging._Listener(log_queue, handler)
+    monkeypatch.setattr(request_logging, "_listener", listener)
+    monkeypatch.setattr(request_logging, "FLUSH_TIMEOUT", 0.01)
+    log_queue.put_nowait(logging.makeLogRecord({"msg": "slow record"}))
+    listener.start()
+    try:
+        assert not request_logging.flush()
+    finally:
+        listener.stop()
+    assert handler.messages == ["slow record"]
+
+
+def test_flush_without_listener_returns_immediately(monkeypatch):
+    monkeypatch.setattr(request_logging, "_listener", None)
+    assert request_logging.flush()
@@ -1,13 +1,15 @@
 """
 Authentication utilities using JWT.
+
+python-jose is imported inside the functions that need it to keep it off the
+Lambda cold-start path.
 """
 
 from datetime import datetime, timedelta
-from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from . import schemas, crud
-from .database import get_connection
+from .database import get_connection, release_connection
 import os
 
 SECRET_KEY = os.environ.get("SECRET_KEY", "your-secret-key")
@@ -20,6 +22,8 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     """
     Create a JWT access token.
     """
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -32,6 +36,8 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
     """
     Retrieve the current user based on the JWT token.
     """
+    from jose import JWTError, jwt
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -46,8 +52,10 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise credentials_exception
     db = get_connection()
-    user_schema, _ = crud.get_user_by_email(db, email=token_data.email)
-    db.close()
+    try:
+        user_schema, _ = crud.get_user_by_email(db, email=token_data.email)
+    finally:
+        release_connection(db)
     if user_schema is None:
         raise credentials_exception
     return user_schema
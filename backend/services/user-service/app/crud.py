@@ -7,6 +7,21 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+USER_COLUMNS = "id, email, full_name, is_active, is_superuser"
+
+
+def _row_to_user(row):
+    """
+    Map a row selected with USER_COLUMNS to a User schema.
+    """
+    return schemas.User(
+        id=row[0],
+        email=row[1],
+        full_name=row[2],
+        is_active=row[3],
+        is_superuser=row[4]
+    )
+
 
 def get_user_by_email(db, email: str):
     """
@@ -33,9 +48,9 @@ def create_user(db, user: schemas.UserCreate):
     Create a new user.
     """
     cursor = db.cursor()
-    sql = """
+    sql = f"""
         INSERT INTO users (email, full_name, hashed_password, is_active, is_superuser)
-        VALUES (%s, %s, %s, %s, %s) RETURNING id;
+        VALUES (%s, %s, %s, %s, %s) RETURNING {USER_COLUMNS};
     """
     params = (
         user.email,
@@ -45,10 +60,10 @@ def create_user(db, user: schemas.UserCreate):
         False
     )
     cursor.execute(sql, params)
-    user_id = cursor.fetchone()[0]
+    row = cursor.fetchone()
     db.commit()
     cursor.close()
-    return get_user(db, user_id)
+    return _row_to_user(row)
 
 
 def get_user(db, user_id: int):
@@ -56,18 +71,12 @@ def get_user(db, user_id: int):
     Retrieve a user by ID.
     """
     cursor = db.cursor()
-    sql = "SELECT id, email, full_name, is_active, is_superuser FROM users WHERE id = %s;"
+    sql = f"SELECT {USER_COLUMNS} FROM users WHERE id = %s;"
     cursor.execute(sql, (user_id,))
     row = cursor.fetchone()
     cursor.close()
     if row:
-        return schemas.User(
-            id=row[0],
-            email=row[1],
-            full_name=row[2],
-            is_active=row[3],
-            is_superuser=row[4]
-        )
+        return _row_to_user(row)
     return None
 
 
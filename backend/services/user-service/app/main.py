@@ -6,7 +6,7 @@ authentication, and user profile management.
 """
 
 from fastapi import FastAPI, Depends, HTTPException, status
-from . import schemas, crud, auth, database, utils
+from . import schemas, crud, auth, database, instrumentation, utils
 import logging
 from fastapi.security import OAuth2PasswordRequestForm
 
@@ -26,7 +26,19 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
+        database.release_connection(db)
+
+
+@app.on_event("startup")
+def warm_up():
+    """
+    Pre-open pooled database connections once per container.
+    """
+    database.warm_pool()
+
+
+# Per-route metrics on GET /metrics and the slow query log on GET /admin/slow_queries.
+instrumentation.install(app, gauges=database.pool_gauges, explain_connect=database.dedicated_connection)
 
 
 @app.post("/register", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
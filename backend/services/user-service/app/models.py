@@ -4,6 +4,8 @@ Database models for the User Service.
 Since we're using direct SQL queries, models.py can contain SQL statements for table creation.
 """
 
+from .migrate import Migration
+
 user_table_creation = """
 CREATE TABLE IF NOT EXISTS users (
     id SERIAL PRIMARY KEY,
@@ -14,3 +16,10 @@ CREATE TABLE IF NOT EXISTS users (
     is_superuser BOOLEAN DEFAULT FALSE
 );
 """
+
+SERVICE = "user-service"
+
+# Applied in order by `python -m app.migrate`; never edit a released migration, add a new one.
+MIGRATIONS = [
+    Migration(1, "create tables", [user_table_creation]),
+]
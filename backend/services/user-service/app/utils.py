@@ -1,19 +1,31 @@
 """
 Utility functions for password hashing and verification.
+
+passlib/bcrypt are imported on first use rather than at module import so they
+stay off the Lambda cold-start path for requests that never touch passwords.
 """
 
-from passlib.context import CryptContext
+_pwd_context = None
+
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def get_pwd_context():
+    """
+    Return the shared bcrypt CryptContext, creating it on first use.
+    """
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
 
 def get_password_hash(password):
     """
     Hash a plaintext password.
     """
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def verify_password(plain_password, hashed_password):
     """
     Verify a plaintext password against the hashed version.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)